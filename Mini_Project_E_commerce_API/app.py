@@ -1,25 +1,7 @@
-from flask import Flask
-from app.database import db
-from app.routes import customer_routes, customer_account_routes, product_routes, order_routes
-from flask_migrate import Migrate
-import os
+from app import create_app
 
-# Create the Flask app
-app = Flask(__name__)
-
-# Configuration setup (using environment variables or fallback values)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ecommerce.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize the Database and Flask-Migrate
-db.init_app(app)
-migrate = Migrate(app, db)
-
-# Register Blueprints for modular code structure
-app.register_blueprint(customer_routes)
-app.register_blueprint(customer_account_routes)
-app.register_blueprint(product_routes)
-app.register_blueprint(order_routes)
+# Create the Flask app using the profile named by APP_CONFIG (development by default)
+app = create_app()
 
 # Main entry point
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+# __init__.py
+import importlib
+import os
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from app.database import db
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# CLI commands as name: "package.module:attribute". They are imported on first use,
+# so a worker that never runs them does not load their modules.
+CLI_COMMANDS = {
+    # `flask index-audit` reports foreign keys and lookups without an index
+    'index-audit': 'app.index_audit:index_audit_command',
+    # `flask reports rebuild` recomputes the sales summary tables
+    'reports': 'app.reporting:reports_cli',
+    # `flask analytics ...` prints basket sizes, co-purchases and stock turnover
+    'analytics': 'app.analytics:analytics_cli',
+    # `flask stock shard|unshard|rebalance` manages sharded stock counters
+    'stock': 'app.inventory:stock_cli',
+    # `flask idempotency purge` deletes expired Idempotency-Key responses
+    'idempotency': 'app.idempotency:idempotency_cli',
+    # `flask tokens purge` deletes revocations of expired access tokens
+    'tokens': 'app.auth:tokens_cli',
+}
+
+# Function to import a blueprint (or CLI command) from a "package.module:attribute" path
+def load_blueprint(path):
+    module_name, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+# The app's command group; it imports the commands in CLI_COMMANDS when the CLI
+# lists or runs them
+class LazyAppGroup(AppGroup):
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(CLI_COMMANDS))
+
+    def get_command(self, ctx, name):
+        if name not in self.commands and name in CLI_COMMANDS:
+            self.add_command(load_blueprint(CLI_COMMANDS[name]), name)
+        return super().get_command(ctx, name)
+
+# Application factory: builds an app from a config class (or the profile named by
+# APP_CONFIG) and registers only the blueprints listed in its BLUEPRINTS setting
+def create_app(config_class=None):
+    if config_class is None:
+        from config import config_by_name
+        config_class = config_by_name[os.getenv('APP_CONFIG', 'development')]
+
+    # Root the app at the project directory so relative SQLite paths resolve there
+    app = Flask(__name__, root_path=PROJECT_ROOT)
+    app.cli = LazyAppGroup()
+    app.config.from_object(config_class)
+    db.init_app(app)
+    # Response encoding: orjson when installed, ISO 8601 datetimes everywhere
+    from app.serializers import init_serializers
+    init_serializers(app)
+
+    for path in app.config['BLUEPRINTS']:
+        app.register_blueprint(load_blueprint(path))
+
+    # Password hashing pool; its threads start on the first hash, after any fork
+    from app.passwords import init_passwords
+    init_passwords(app)
+    # Signed access tokens and the in-memory revocation list
+    from app.auth import init_auth
+    init_auth(app)
+
+    if app.config.get('METRICS_ENABLED'):
+        from app.metrics import init_metrics
+        init_metrics(app)
+
+    if app.config.get('RATE_LIMIT_ENABLED'):
+        from app.rate_limit import init_rate_limit
+        init_rate_limit(app)
+
+    if app.config.get('QUERY_DEBUG'):
+        from app.query_debug import init_query_debug
+        init_query_debug(app)
+
+    # Flask-Migrate pulls in Alembic, so only set it up when the app is loaded
+    # by the flask CLI (e.g. `flask db upgrade`), never in WSGI workers
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        # include_object keeps autogenerate away from the search index (app/search.py)
+        from app.search import include_object
+        Migrate(app, db, render_as_batch=True, include_object=include_object)
+
+    return app
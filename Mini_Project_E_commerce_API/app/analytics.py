@@ -0,0 +1,160 @@
+# analytics.py
+import json
+from collections import namedtuple
+from itertools import chain
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from app.models import OrderItem, Product, db
+from app.inventory import sharding_enabled, stock_expression
+
+# numpy is imported inside the functions that use it: this module is loaded by
+# create_app (for the CLI group) and the analytics blueprint, and workers that
+# never compute analytics should not pay for numpy at startup.
+
+# Rows fetched per round trip when loading columns
+DEFAULT_CHUNK_SIZE = 50000
+
+# Column arrays of order_items (one entry per item) and products (one per product)
+ItemColumns = namedtuple('ItemColumns', ['order_id', 'product_id', 'quantity'])
+ProductColumns = namedtuple('ProductColumns', ['id', 'stock_level'])
+
+# Function to read table columns into an int64 array (key column first) in
+# keyset-paginated chunks, so only one chunk of Python tuples exists at a time.
+# Rows are taken straight from the DBAPI cursor: building SQLAlchemy Row objects
+# would cost more than the whole vectorized computation.
+def _load_chunked(key_column, columns, chunk_size):
+    import numpy as np
+    chunk_size = chunk_size or current_app.config.get('ANALYTICS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    width = len(columns) + 1
+    connection = db.session.connection()
+    chunks = []
+    last = 0
+    while True:
+        result = connection.execute(select(key_column, *columns)
+                                    .where(key_column > last)
+                                    .order_by(key_column)
+                                    .limit(chunk_size))
+        try:
+            rows = result.cursor.fetchall()
+        finally:
+            result.close()
+        if not rows:
+            break
+        # fromiter over the flattened rows avoids building an object array first
+        flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width)
+        chunks.append(flat.reshape(len(rows), width))
+        last = int(chunks[-1][-1, 0])
+        if len(rows) < chunk_size:
+            break
+    if not chunks:
+        return np.empty((0, width), dtype=np.int64)
+    return np.concatenate(chunks)
+
+# Function to load every order item as column arrays
+def load_item_columns(chunk_size=None):
+    table = OrderItem.__table__
+    data = _load_chunked(table.c.id, (table.c.order_id, table.c.product_id, table.c.quantity), chunk_size)
+    return ItemColumns(data[:, 1], data[:, 2], data[:, 3])
+
+# Function to load every product's stock level as column arrays (summed over the
+# shards when stock is sharded)
+def load_product_columns(chunk_size=None):
+    stock = stock_expression() if sharding_enabled() else Product.__table__.c.stock_level
+    data = _load_chunked(Product.__table__.c.id, (stock,), chunk_size)
+    return ProductColumns(data[:, 0], data[:, 1])
+
+# Function to compute the distribution of units per order, with summary statistics
+def basket_size_distribution(items):
+    import numpy as np
+    if len(items.order_id) == 0:
+        return {'orders': 0, 'mean': None, 'median': None, 'p90': None, 'max': None, 'distribution': {}}
+    _, order_index = np.unique(items.order_id, return_inverse=True)
+    sizes = np.bincount(order_index, weights=items.quantity).astype(np.int64)
+    values, counts = np.unique(sizes, return_counts=True)
+    return {
+        'orders': int(len(sizes)),
+        'mean': float(sizes.mean()),
+        'median': float(np.median(sizes)),
+        'p90': float(np.percentile(sizes, 90)),
+        'max': int(sizes.max()),
+        'distribution': {int(value): int(count) for value, count in zip(values, counts)},
+    }
+
+# Function to count how many orders contain each pair of distinct products and
+# return the `top` most frequent pairs. Items are sorted by (order, product) and
+# every pair inside an order is reached by comparing the array with itself shifted
+# by 1, 2, ... positions, so the Python loop runs once per basket width, not per row.
+def co_purchase_counts(items, top=20):
+    import numpy as np
+    # Distinct (order, product) lines, sorted, via one 1-D unique on a combined key
+    span = int(items.product_id.max()) + 1 if len(items.product_id) else 1
+    lines = np.unique(items.order_id * span + items.product_id)
+    if len(lines) < 2:
+        return []
+    orders, products = lines // span, lines % span
+    product_ids, product_index = np.unique(products, return_inverse=True)
+    width = len(product_ids)
+    _, lines_per_order = np.unique(orders, return_counts=True)
+    codes = []
+    for shift in range(1, int(lines_per_order.max())):
+        same_order = orders[shift:] == orders[:-shift]
+        codes.append(product_index[:-shift][same_order] * width + product_index[shift:][same_order])
+    codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+    if len(codes) == 0:
+        return []
+    pair_codes, counts = np.unique(codes, return_counts=True)
+    if len(counts) > top:
+        keep = np.argpartition(-counts, top - 1)[:top]
+        pair_codes, counts = pair_codes[keep], counts[keep]
+    order = np.lexsort((pair_codes, -counts))
+    return [{'product_ids': [int(product_ids[code // width]), int(product_ids[code % width])], 'orders': int(count)}
+            for code, count in zip(pair_codes[order], counts[order])]
+
+# Function to compute units sold per product against its current stock.
+# turnover is units sold per unit in stock (None when out of stock); sell_through is
+# the share of all units (sold plus on hand) that has been sold.
+def stock_turnover(items, products, top=None):
+    import numpy as np
+    if len(products.id) == 0:
+        return []
+    position = np.searchsorted(products.id, items.product_id)
+    known = (position < len(products.id)) & (products.id[np.minimum(position, len(products.id) - 1)] == items.product_id)
+    sold = np.bincount(position[known], weights=items.quantity[known], minlength=len(products.id)).astype(np.int64)
+    stock = products.stock_level
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turnover = np.where(stock > 0, sold / np.maximum(stock, 1), np.nan)
+        sell_through = np.where(sold + stock > 0, sold / np.maximum(sold + stock, 1), np.nan)
+    ranking = np.lexsort((products.id, -sold))
+    if top is not None:
+        ranking = ranking[:top]
+    return [{
+        'product_id': int(products.id[i]),
+        'units_sold': int(sold[i]),
+        'stock_level': int(stock[i]),
+        'turnover': None if np.isnan(turnover[i]) else round(float(turnover[i]), 4),
+        'sell_through': None if np.isnan(sell_through[i]) else round(float(sell_through[i]), 4),
+    } for i in ranking]
+
+# CLI commands: `flask analytics basket-sizes|co-purchases|stock-turnover` print JSON
+@click.group('analytics', help='Order analytics computed over column arrays.')
+def analytics_cli():
+    pass
+
+@analytics_cli.command('basket-sizes', help='Distribution of units per order.')
+@with_appcontext
+def basket_sizes_command():
+    click.echo(json.dumps(basket_size_distribution(load_item_columns()), indent=2))
+
+@analytics_cli.command('co-purchases', help='Product pairs most often bought together.')
+@click.option('--top', default=20, show_default=True, help='Number of pairs to print.')
+@with_appcontext
+def co_purchases_command(top):
+    click.echo(json.dumps(co_purchase_counts(load_item_columns(), top), indent=2))
+
+@analytics_cli.command('stock-turnover', help='Units sold against current stock per product.')
+@click.option('--top', default=None, type=int, help='Only print the best-selling products.')
+@with_appcontext
+def stock_turnover_command(top):
+    click.echo(json.dumps(stock_turnover(load_item_columns(), load_product_columns(), top), indent=2))
@@ -0,0 +1,150 @@
+# auth.py
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app, g, jsonify, request
+from flask.cli import with_appcontext
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.models import RevokedToken, db
+
+# Defaults used when the app config does not set them
+DEFAULT_TOKEN_TTL = 3600
+DEFAULT_REVOCATION_REFRESH = 5
+
+# Salt separating access-token signatures from anything else signed with SECRET_KEY
+TOKEN_SALT = 'access-token'
+
+# Ids of revoked, unexpired tokens, kept in memory so checking a token needs no
+# query. The set is replaced (never mutated), so readers need no lock. It is
+# reloaded from revoked_tokens at most every `refresh_seconds`, by one thread at a
+# time, which is how a logout in another worker process reaches this one.
+class RevocationList:
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._revoked = frozenset()
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    # Function to reload the set when it is due. The first load blocks; later ones
+    # are skipped by threads that find another thread already reloading.
+    def refresh(self):
+        if time.monotonic() < self._next_refresh:
+            return
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if time.monotonic() >= self._next_refresh:
+                rows = db.session.execute(select(RevokedToken.token_id).where(
+                    RevokedToken.expires_at > datetime.utcnow())).scalars()
+                self._revoked = frozenset(rows)
+                self._loaded = True
+                self._next_refresh = time.monotonic() + self.refresh_seconds
+        finally:
+            self._lock.release()
+
+    def __contains__(self, token_id):
+        self.refresh()
+        return token_id in self._revoked
+
+    def add(self, token_id):
+        self._revoked = self._revoked | {token_id}
+
+# Issues and checks signed access tokens. A token carries the account id and a
+# random token id, signed (HMAC-SHA1 over SECRET_KEY, via itsdangerous) with its
+# issue time, so checking it is a constant-time signature comparison plus a set
+# lookup: no database round trip and no password hash.
+class TokenAuth:
+    def __init__(self, secret_key, ttl, refresh_seconds):
+        self.ttl = ttl
+        self.revoked = RevocationList(refresh_seconds)
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT) if secret_key else None
+
+    def _require_serializer(self):
+        if self._serializer is None:
+            raise RuntimeError('SECRET_KEY must be set to issue access tokens')
+        return self._serializer
+
+    # Function to issue a token for an account
+    def issue(self, account_id):
+        return self._require_serializer().dumps({'account_id': account_id, 'token_id': secrets.token_hex(16)})
+
+    # Function to check a token. Returns its claims, with the naive UTC time it
+    # expires at, or None when it is malformed, tampered with, expired or revoked.
+    def verify(self, token):
+        try:
+            claims, issued_at = self._require_serializer().loads(token, max_age=self.ttl, return_timestamp=True)
+        except BadSignature:
+            return None
+        if not isinstance(claims, dict) or claims.get('token_id') in self.revoked:
+            return None
+        claims['expires_at'] = issued_at.replace(tzinfo=None) + timedelta(seconds=self.ttl)
+        return claims
+
+    # Function to revoke a verified token until it expires, here at once and in
+    # other workers at their next refresh
+    def revoke(self, claims):
+        db.session.add(RevokedToken(token_id=claims['token_id'], expires_at=claims['expires_at']))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        self.revoked.add(claims['token_id'])
+
+# Function to set up token authentication on an app
+def init_auth(app):
+    app.extensions['auth'] = TokenAuth(app.config.get('SECRET_KEY'),
+                                       app.config.get('ACCESS_TOKEN_TTL', DEFAULT_TOKEN_TTL),
+                                       app.config.get('TOKEN_REVOCATION_REFRESH', DEFAULT_REVOCATION_REFRESH))
+
+# Functions to issue, check and revoke tokens with the current app's TokenAuth
+def issue_access_token(account_id):
+    return current_app.extensions['auth'].issue(account_id)
+
+def verify_access_token(token):
+    return current_app.extensions['auth'].verify(token)
+
+def revoke_access_token(claims):
+    current_app.extensions['auth'].revoke(claims)
+
+# Function to return the claims of the request's "Authorization: Bearer <token>"
+# header, or None when it is missing or the token is not valid
+def bearer_claims():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return verify_access_token(token.strip()) if scheme.lower() == 'bearer' else None
+
+# Decorator requiring an "Authorization: Bearer <token>" header with a valid access
+# token. The token's claims are available to the view as g.access_token.
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        claims = bearer_claims()
+        if claims is None:
+            response = jsonify({'error': 'Missing, invalid or expired access token'})
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response, 401
+        g.access_token = claims
+        return view(*args, **kwargs)
+    return wrapper
+
+# Function to delete revocations of tokens that have expired and return how many were removed
+def purge_revoked_tokens():
+    removed = (RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow())
+               .delete(synchronize_session=False))
+    db.session.commit()
+    return removed
+
+# CLI command: `flask tokens purge` deletes expired revocations; run it on a schedule
+@click.group('tokens', help='Access token revocation list.')
+def tokens_cli():
+    pass
+
+@tokens_cli.command('purge', help='Delete revocations of tokens that have expired.')
+@with_appcontext
+def purge_command():
+    click.echo(f'Removed {purge_revoked_tokens()} expired token revocation(s).')
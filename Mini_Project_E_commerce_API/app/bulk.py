@@ -0,0 +1,97 @@
+# bulk.py
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.database import db
+from app.cache import invalidate_namespace_on_commit
+
+# Maximum number of records accepted by a bulk endpoint and rows written per statement
+MAX_BULK_RECORDS = 5000
+UPSERT_CHUNK_SIZE = 500
+
+# Function to validate a list of records, returning (index, record) pairs that passed
+# and a per-row error list for those that did not. Records sharing a natural key are
+# rejected so each key is written at most once per request.
+def validate_records(records, key, validator):
+    if not isinstance(records, list) or not records:
+        raise ValueError('Request body must be a non-empty list of records')
+    if len(records) > MAX_BULK_RECORDS:
+        raise ValueError(f'At most {MAX_BULK_RECORDS} records can be written per request')
+    valid, errors, seen = [], [], set()
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('Each record must be an object')
+            validator(record)
+            if record[key] in seen:
+                raise ValueError(f'Duplicate {key} in request')
+            seen.add(record[key])
+            valid.append((index, record))
+        except (ValueError, TypeError) as e:
+            errors.append({'index': index, 'status': 400, 'error': str(e)})
+    return valid, errors
+
+# Function to collect the onupdate values of a table's columns (such as the row
+# version) that a native upsert's SET clause would otherwise skip
+def _onupdate_values(table, update_columns):
+    values = {}
+    for column in table.columns:
+        if column.onupdate is None or column.name in update_columns:
+            continue
+        values[column.name] = column.onupdate.arg if column.onupdate.is_clause_element else column.onupdate.arg(None)
+    return values
+
+# Function to build a native INSERT ... ON CONFLICT / ON DUPLICATE KEY statement.
+# Conflicting rows are always updated (rows that carry only the key set it to
+# itself) so the version bump marks every row that already existed.
+def _upsert_statement(dialect, table, key, update_columns):
+    update_columns = update_columns or [key]
+    values = _onupdate_values(table, update_columns)
+    if dialect == 'mysql':
+        statement = mysql.insert(table)
+        values.update({column: statement.inserted[column] for column in update_columns})
+        return statement.on_duplicate_key_update(values)
+    insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+    statement = insert(table)
+    values.update({column: statement.excluded[column] for column in update_columns})
+    return statement.on_conflict_do_update(index_elements=[key], set_=values)
+
+# Function to upsert rows into a model's table on a unique natural key.
+# Rows are grouped by the set of columns they carry so each group can be sent as
+# one executemany per chunk. Returns the natural keys that already existed.
+#
+# Which rows existed is read back after the write rather than looked up before it,
+# so a concurrent bulk call cannot change the answer in between: the upsert bumps
+# the version of every row it updates, and the rows stay locked by this
+# transaction, so a version of 1 means this call inserted the row.
+def upsert_rows(model, rows, key):
+    table = model.__table__
+    dialect = db.engine.dialect.name
+    key_column = table.c[key]
+    invalidate_namespace_on_commit(table.name)
+    existing = set()
+    shapes = {}
+    for row in rows:
+        shapes.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, shape_rows in shapes.items():
+        update_columns = [column for column in columns if column != key]
+        for start in range(0, len(shape_rows), UPSERT_CHUNK_SIZE):
+            chunk = shape_rows[start:start + UPSERT_CHUNK_SIZE]
+            keys = [row[key] for row in chunk]
+            if dialect in ('sqlite', 'mysql', 'postgresql'):
+                db.session.execute(_upsert_statement(dialect, table, key, update_columns), chunk)
+            else:
+                # Generic fallback: executemany INSERT for new keys and UPDATE for existing ones
+                found = {value for (value,) in db.session.execute(
+                    db.select(key_column).where(key_column.in_(keys)))}
+                new_rows = [row for row in chunk if row[key] not in found]
+                old_rows = [{f'_{column}': row[column] for column in columns} for row in chunk if row[key] in found]
+                if new_rows:
+                    db.session.execute(table.insert(), new_rows)
+                if old_rows:
+                    db.session.execute(
+                        table.update().where(key_column == bindparam(f'_{key}'))
+                        .values({column: bindparam(f'_{column}') for column in update_columns or [key]}),
+                        old_rows)
+            existing |= {value for (value,) in db.session.execute(
+                db.select(key_column).where(key_column.in_(keys), table.c.version > 1))}
+    return existing
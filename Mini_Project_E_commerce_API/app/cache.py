@@ -0,0 +1,315 @@
+# cache.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from app.database import db
+from app.metrics import CACHE_REQUESTS
+
+# Defaults used when the app config does not set CACHE_* values
+DEFAULT_CACHE_TTL = 30
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+DEFAULT_CACHE_SYNC_INTERVAL = 0.5
+
+# A cached row: the public payload plus the validators used for conditional GETs
+CachedRow = namedtuple('CachedRow', ['data', 'version', 'updated_at'])
+
+# Thread-safe in-process LRU cache whose entries expire after a fixed TTL.
+# Keys are (namespace, key) pairs; a whole namespace can be dropped in O(1)
+# by bumping its generation number, which orphans the old entries.
+#
+# Loads are guarded against invalidations that land while they run: begin_load
+# returns a token of the cache's generations, delete() and clear*() change them,
+# and set() with a stale token stores nothing. Otherwise a reader that loaded the
+# old row before a writer committed would put it back for a whole TTL.
+class TTLCache:
+    def __init__(self, max_entries=DEFAULT_CACHE_MAX_ENTRIES, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        # (namespace, key) -> [generation, loads in progress], only while loading
+        self._loads = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry_key = (namespace, self._generations.get(namespace, 0), key)
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[entry_key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+        CACHE_REQUESTS.inc(tier='local', namespace=namespace, result='miss' if entry is None else 'hit')
+        return None if entry is None else entry[1]
+
+    # Function to start loading a key; pass the token to set() and always call end_load()
+    def begin_load(self, namespace, key):
+        with self._lock:
+            load = self._loads.get((namespace, key))
+            if load is None:
+                load = self._loads[(namespace, key)] = [0, 0]
+            load[1] += 1
+            return self._epoch, self._generations.get(namespace, 0), load[0]
+
+    def end_load(self, namespace, key):
+        with self._lock:
+            load = self._loads[(namespace, key)]
+            load[1] -= 1
+            if not load[1]:
+                del self._loads[(namespace, key)]
+
+    # Function to store a value; with a token from begin_load, only if nothing was
+    # invalidated since. Returns whether the value was stored.
+    def set(self, namespace, key, value, token=None):
+        with self._lock:
+            generation = self._generations.get(namespace, 0)
+            if token is not None and token != (self._epoch, generation, self._loads[(namespace, key)][0]):
+                return False
+            entry_key = (namespace, generation, key)
+            self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._entries.pop((namespace, self._generations.get(namespace, 0), key), None)
+            load = self._loads.get((namespace, key))
+            if load is not None:
+                load[0] += 1
+
+    def clear_namespace(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+# Shared tier for several worker processes on one host, kept in a SQLite file (a
+# local stand-in for a networked cache such as Redis, like the rate limiter's
+# SQLiteStore). Values are pickled: the file is written only by this app, the
+# same trust as its database.
+#
+# Committed invalidations delete the shared entries and are appended to a log.
+# Each worker replays the log into its local tier at most every sync interval, so
+# another worker's stale copy lives for that long instead of a whole TTL. An
+# entry is only stored if its key was not invalidated after the worker's last sync.
+class SQLiteCacheStore:
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS cache_entries '
+        '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID',
+        'CREATE TABLE IF NOT EXISTS cache_invalidations '
+        '(seq INTEGER PRIMARY KEY AUTOINCREMENT, entry TEXT NOT NULL, namespace TEXT NOT NULL, key BLOB)',
+        'CREATE INDEX IF NOT EXISTS ix_cache_invalidations_entry ON cache_invalidations (entry, seq)',
+    )
+    GET = 'SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?'
+    SET = ('INSERT INTO cache_entries (key, value, expires_at) SELECT :key, :value, :expires_at '
+           'WHERE NOT EXISTS (SELECT 1 FROM cache_invalidations WHERE entry IN (:key, :prefix) AND seq > :seen) '
+           'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at')
+    DELETE = 'DELETE FROM cache_entries WHERE key = ?'
+    DELETE_NAMESPACE = 'DELETE FROM cache_entries WHERE key >= ? AND key < ?'
+    LOG = 'INSERT INTO cache_invalidations (entry, namespace, key) VALUES (?, ?, ?)'
+    CHANGES = 'SELECT seq, namespace, key FROM cache_invalidations WHERE seq > ? ORDER BY seq'
+    # Invalidations kept in the log, and sets between purges of expired entries
+    LOG_SIZE = 10000
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, ttl=DEFAULT_CACHE_TTL, sync_interval=DEFAULT_CACHE_SYNC_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._local = threading.local()
+        self._sets = 0
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        connection = self._connection()
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+        self._seen = connection.execute('SELECT coalesce(max(seq), 0) FROM cache_invalidations').fetchone()[0]
+
+    # One autocommit connection per thread; WAL lets readers run beside the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    # Shared keys sort by namespace, so a namespace is one key range
+    @staticmethod
+    def _prefix(namespace):
+        return f'{namespace}\x1f'
+
+    def _key(self, namespace, key):
+        return f'{self._prefix(namespace)}{key!r}'
+
+    def get(self, namespace, key):
+        row = self._connection().execute(self.GET, (self._key(namespace, key), time.time())).fetchone()
+        CACHE_REQUESTS.inc(tier='shared', namespace=namespace, result='miss' if row is None else 'hit')
+        return None if row is None else pickle.loads(row[0])
+
+    # Function to store a value loaded after the worker's last sync (see sync)
+    def set(self, namespace, key, value, seen):
+        connection = self._connection()
+        now = time.time()
+        connection.execute(self.SET, {'key': self._key(namespace, key), 'prefix': self._prefix(namespace),
+                                      'value': pickle.dumps(value), 'expires_at': now + self.ttl, 'seen': seen})
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+
+    # Function to apply committed invalidations, as (namespace, key) pairs where a
+    # key of None is the whole namespace, and log them for the other workers
+    def invalidate(self, pairs):
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for namespace, key in pairs:
+                if key is None:
+                    prefix = self._prefix(namespace)
+                    connection.execute(self.DELETE_NAMESPACE, (prefix, f'{namespace}\x20'))
+                    connection.execute(self.LOG, (prefix, namespace, None))
+                else:
+                    connection.execute(self.DELETE, (self._key(namespace, key),))
+                    connection.execute(self.LOG, (self._key(namespace, key), namespace, pickle.dumps(key)))
+            seq = connection.execute('SELECT last_insert_rowid()').fetchone()[0]
+            connection.execute('DELETE FROM cache_invalidations WHERE seq <= ?', (seq - self.LOG_SIZE,))
+
+    # Function to replay other workers' invalidations into a local tier when due.
+    # Returns the last log position applied, for set(). A worker that fell behind
+    # the trimmed log clears its local tier.
+    def sync(self, cache):
+        if time.monotonic() < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return self._seen
+        try:
+            rows = self._connection().execute(self.CHANGES, (self._seen,)).fetchall()
+            if rows and rows[0][0] > self._seen + 1 and self._seen:
+                cache.clear()
+            for seq, namespace, key in rows:
+                if key is None:
+                    cache.clear_namespace(namespace)
+                else:
+                    cache.delete(namespace, pickle.loads(key))
+            if rows:
+                self._seen = rows[-1][0]
+            self._next_sync = time.monotonic() + self.sync_interval
+            return self._seen
+        finally:
+            self._sync_lock.release()
+
+# Function to build the shared tier named by CACHE_SHARED_STORAGE: None (no shared
+# tier) or "sqlite:///<path>" (relative to the project root)
+def create_shared_store(app):
+    storage = app.config.get('CACHE_SHARED_STORAGE')
+    if not storage:
+        return None
+    if storage.startswith('sqlite:///'):
+        return SQLiteCacheStore(os.path.join(app.root_path, storage[len('sqlite:///'):]),
+                                app.config.get('CACHE_TTL', DEFAULT_CACHE_TTL),
+                                app.config.get('CACHE_SYNC_INTERVAL', DEFAULT_CACHE_SYNC_INTERVAL))
+    raise ValueError(f'Unknown CACHE_SHARED_STORAGE: {storage}')
+
+# Function to get the current app's shared tier (None when not configured)
+def get_shared_cache():
+    if 'shared_cache' not in current_app.extensions:
+        current_app.extensions['shared_cache'] = create_shared_store(current_app)
+    return current_app.extensions['shared_cache']
+
+# Function to get the current app's local cache, creating it from config on first
+# use. With a shared tier, other workers' invalidations are replayed into it first.
+def get_cache():
+    cache = current_app.extensions.get('cache')
+    if cache is None:
+        cache = current_app.extensions['cache'] = TTLCache(
+            current_app.config.get('CACHE_MAX_ENTRIES', DEFAULT_CACHE_MAX_ENTRIES),
+            current_app.config.get('CACHE_TTL', DEFAULT_CACHE_TTL))
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.sync(cache)
+    return cache
+
+# Function to read through the cache: return the cached value from the local tier,
+# then the shared tier, or call loader and store its result in both. Loaders
+# return a CachedRow, or None when the row is missing (misses are not cached).
+# A value whose key is invalidated while it loads is returned but not stored.
+def read_through(namespace, key, loader):
+    if not current_app.config.get('CACHE_ENABLED', True):
+        return loader()
+    cache = get_cache()
+    value = cache.get(namespace, key)
+    if value is not None:
+        return value
+    shared = get_shared_cache()
+    token = cache.begin_load(namespace, key)
+    try:
+        value = shared.get(namespace, key) if shared is not None else None
+        if value is None:
+            seen = shared.sync(cache) if shared is not None else None
+            value = loader()
+            if value is not None and shared is not None:
+                shared.set(namespace, key, value, seen)
+        if value is not None:
+            cache.set(namespace, key, value, token)
+    finally:
+        cache.end_load(namespace, key)
+    return value
+
+# Function to drop cached rows once the current transaction commits. Use it for
+# writes that bypass the ORM unit of work (bulk UPDATE/INSERT statements).
+def invalidate_on_commit(namespace, keys):
+    db.session.info.setdefault('cache_invalidations', set()).update((namespace, key) for key in keys)
+
+# Function to drop a whole namespace once the current transaction commits
+def invalidate_namespace_on_commit(namespace):
+    db.session.info.setdefault('cache_invalidations', set()).add((namespace, None))
+
+# Callbacks run with the applied (namespace, key) pairs after each commit; a key
+# of None means the whole namespace changed
+_invalidation_listeners = []
+
+# Function to register a callback for committed invalidations (e.g. search indexes)
+def add_invalidation_listener(callback):
+    _invalidation_listeners.append(callback)
+
+# Record every row the ORM inserts, updates or deletes during a flush, keyed by
+# its primary key (the id for single-column keys)
+@event.listens_for(db.session, 'after_flush')
+def _collect_flushed_rows(session, flush_context):
+    pending = session.info.setdefault('cache_invalidations', set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        key = inspect(instance).mapper.primary_key_from_instance(instance)
+        pending.add((instance.__tablename__, key[0] if len(key) == 1 else tuple(key)))
+
+# Apply the collected invalidations only after the data is durable
+@event.listens_for(db.session, 'after_commit')
+def _apply_invalidations(session):
+    pending = session.info.pop('cache_invalidations', None)
+    if not pending or not has_app_context():
+        return
+    cache = get_cache()
+    for namespace, key in pending:
+        if key is None:
+            cache.clear_namespace(namespace)
+        else:
+            cache.delete(namespace, key)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.invalidate(pending)
+    for callback in _invalidation_listeners:
+        callback(pending)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,87 @@
+# conditional.py
+import hashlib
+from datetime import timezone
+from flask import current_app, request
+from app.cache import CachedRow, get_cache, read_through
+from app.database import db
+
+# Function to build a strong ETag value from a resource's identity and row versions
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+# Function to build the ETag of a single versioned row; `fields` names the sparse
+# fieldset served, so each projection of a row has its own ETag
+def row_etag(model, id, version, fields=None):
+    if fields is None:
+        return make_etag(model.__tablename__, id, version)
+    return make_etag(model.__tablename__, id, version, fields)
+
+# Function to check the request's If-None-Match / If-Modified-Since headers.
+# If-None-Match wins when both are present and uses the weak comparison, as
+# required by RFC 7232 (a proxy may have weakened the ETag it passed on).
+def is_not_modified(etag, last_modified=None):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= request.if_modified_since
+    return False
+
+# Function to set the ETag and Last-Modified headers on a response
+def add_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return response
+
+# Function to build an empty 304 response carrying the current validators
+def not_modified_response(etag, last_modified=None):
+    return add_validators(current_app.response_class(status=304), etag, last_modified)
+
+# Function to fetch one versioned row for a conditional GET. The cached copy is
+# checked first; on a cache miss only the version columns are read, so a client
+# that already holds the current representation gets a 304 without the full row
+# being loaded or serialized. Returns (row, not_modified_response).
+# `extra` lists expressions that change without bumping the row's version (such
+# as sharded stock); their values join the version and Last-Modified is not used,
+# so the loader must cache them the same way (see cached_row).
+def fetch_conditional(model, id, loader, extra=()):
+    conditional = bool(request.if_none_match) or request.if_modified_since is not None
+    if conditional:
+        row = None
+        if current_app.config.get('CACHE_ENABLED', True):
+            row = get_cache().get(model.__tablename__, id)
+        if row is None:
+            validators = db.session.query(model.version, model.updated_at, *extra).filter(model.id == id).first()
+            if validators is not None:
+                version, updated_at = validators[0], validators[1]
+                if extra:
+                    version, updated_at = (version, *validators[2:]), None
+                etag = row_etag(model, id, version)
+                if is_not_modified(etag, updated_at):
+                    return None, not_modified_response(etag, updated_at)
+        elif is_not_modified(row_etag(model, id, row.version), row.updated_at):
+            return None, not_modified_response(row_etag(model, id, row.version), row.updated_at)
+    return read_through(model.__tablename__, id, loader), None
+
+# Function to fetch some fields of one versioned row, for a sparse fieldset
+# (`projection` is a ModelSerializer narrowed with project()). A cached full row
+# is narrowed in memory; otherwise only the projection's columns and the
+# validators are selected, and the narrow row is not cached. `overrides` replaces
+# field columns as in ModelSerializer.columns. Returns a CachedRow or None.
+def fetch_projection(model, id, projection, extra=(), **overrides):
+    if current_app.config.get('CACHE_ENABLED', True):
+        row = get_cache().get(model.__tablename__, id)
+        if row is not None:
+            return CachedRow(projection.pick(row.data), row.version, row.updated_at)
+    row = (db.session.query(*projection.columns(model.version, model.updated_at, *extra, **overrides))
+           .filter(model.id == id).first())
+    if row is None:
+        return None
+    return cached_row(row, projection.dump(row), tuple(row[len(projection.names) + 2:]))
+
+# Function to wrap a model instance's public payload with its validators for the
+# cache; `extra` holds the values of fetch_conditional's extra expressions
+def cached_row(instance, data, extra=()):
+    if extra:
+        return CachedRow(data, (instance.version, *extra), None)
+    return CachedRow(data, instance.version, instance.updated_at)
@@ -1,28 +1,56 @@
 # database.py
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-import os
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from functools import partial
+from app.metrics import POOL_CHECKOUT_WAIT, POOL_CHECKOUT_TIMEOUTS
+import time
 
-# Create Flask app instance
-app = Flask(__name__)
+# Queue pool that records how long each checkout waited for a free connection
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
 
-# Configure database connection
-# Using environment variables for security; falls back to SQLite if not provided
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ecommerce.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Function to apply the configured PRAGMAs to every new SQLite connection
+def apply_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
-# Initialize the SQLAlchemy and Flask-Migrate
-# SQLAlchemy is used for ORM, and Flask-Migrate is used to handle database migrations
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# SQLAlchemy extension that instruments queue pools and applies SQLITE_PRAGMAS.
+# Pool sizing itself comes from SQLALCHEMY_ENGINE_OPTIONS (see config.py).
+class TunedSQLAlchemy(SQLAlchemy):
+    def apply_driver_hacks(self, app, sa_url, options):
+        # Let the driver hacks see the configured pool size; Flask-SQLAlchemy only
+        # merges SQLALCHEMY_ENGINE_OPTIONS afterwards and would pick NullPool for SQLite
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        options.setdefault('poolclass', InstrumentedQueuePool)
+        return sa_url, options
 
-# Example model import statement to avoid circular imports (models should be imported after db is initialized)
-# from app.models import *
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite':
+            pragmas = self.get_app().config.get('SQLITE_PRAGMAS')
+            if pragmas:
+                event.listen(engine, 'connect', partial(apply_sqlite_pragmas, pragmas))
+        return engine
+
+# Single SQLAlchemy instance shared by every app built with create_app().
+# It is bound to an app by db.init_app(app) in the application factory.
+db = TunedSQLAlchemy()
 
 # Notes:
 # - Environment variables should be used to securely provide sensitive information like DATABASE_URL.
-# - To run migrations, use the following commands:
-#   flask db init      -> Initializes a new migrations directory
-#   flask db migrate   -> Creates a new migration script based on model changes
+# - To run migrations, use the following commands (Flask-Migrate is only loaded by the flask CLI):
+#   flask db migrate   -> Creates a new migration script in migrations/versions based on model changes
 #   flask db upgrade   -> Applies the migrations to the database
@@ -0,0 +1,183 @@
+# idempotency.py
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app, jsonify, make_response, request
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app.models import IdempotencyKey, db
+from app.query_debug import extend_query_budget
+
+# Request header carrying the client's key, and the header marking a replayed response
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Defaults used when the app config does not set IDEMPOTENCY_* values
+DEFAULT_TTL = 86400
+DEFAULT_WAIT = 5
+DEFAULT_LOCK_TIMEOUT = 30
+
+# Seconds before the first check for a concurrent duplicate running in another
+# process; the interval doubles after each check up to MAX_POLL_INTERVAL
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+# Keys claimed by requests running in this process, each with an event set once
+# its response is stored, so duplicates arriving at the same worker wait on the
+# event instead of polling the key table
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+# Responses that tell the client to retry are not stored, so a retry with the
+# same key runs again instead of replaying the failure
+RETRYABLE_STATUS_CODES = (409, 429)
+
+# Function to hash values into the fixed-width hex digests stored in the key table
+def _digest(*parts):
+    return hashlib.sha256(b'\0'.join(part.encode() if isinstance(part, str) else part for part in parts)).hexdigest()
+
+# Function to try to claim a key for the current request. Inserts an in-progress
+# row and commits it at once, so concurrent duplicates see it. Returns
+# (None, True) when the claim succeeded, otherwise (existing row, False); the row
+# is None if it was deleted in between.
+def claim_key(key_hash, fingerprint, now):
+    config = current_app.config
+    db.session.add(IdempotencyKey(
+        key_hash=key_hash, fingerprint=fingerprint,
+        locked_until=now + timedelta(seconds=config.get('IDEMPOTENCY_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)),
+        expires_at=now + timedelta(seconds=config.get('IDEMPOTENCY_TTL', DEFAULT_TTL))))
+    try:
+        db.session.commit()
+        return None, True
+    except IntegrityError:
+        db.session.rollback()
+    return IdempotencyKey.query.get(key_hash), False
+
+# Function to delete a key row that has expired, or whose request was abandoned
+# before storing a response. The condition is re-checked in the DELETE so only
+# one of several racing requests removes it.
+def release_stale_key(key_hash, now):
+    IdempotencyKey.query.filter(
+        IdempotencyKey.key_hash == key_hash,
+        or_(IdempotencyKey.expires_at < now,
+            IdempotencyKey.status_code.is_(None) & (IdempotencyKey.locked_until < now)),
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+# Function to build the replay of a stored response
+def replay_response(record):
+    response = current_app.response_class(record.response_body, status=record.status_code, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+# Function to store the handler's response under the claimed key, or drop the claim
+# when the response should not be replayed (server errors and retryable statuses)
+def store_response(key_hash, response):
+    db.session.rollback()
+    claimed = IdempotencyKey.query.filter_by(key_hash=key_hash)
+    if response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES:
+        claimed.delete(synchronize_session=False)
+    else:
+        claimed.update({IdempotencyKey.status_code: response.status_code,
+                        IdempotencyKey.response_body: response.get_data(as_text=True)},
+                       synchronize_session=False)
+    db.session.commit()
+
+# Function to wait for the request holding a key to finish: on its event when it
+# runs in this process, otherwise by sleeping `delay` seconds. Never past `deadline`.
+def wait_for_key(key_hash, delay, deadline):
+    with _in_flight_lock:
+        done = _in_flight.get(key_hash)
+    remaining = max(deadline - time.monotonic(), 0)
+    if done is not None:
+        done.wait(remaining)
+    else:
+        time.sleep(min(delay, remaining))
+
+# Decorator making a POST route idempotent for requests that send an
+# Idempotency-Key header. The first request claims the key and runs the handler;
+# its response is stored and replayed to later requests with the same key and
+# body, without running the handler again. A duplicate that arrives while the
+# first is still running waits for its response (up to IDEMPOTENCY_WAIT seconds,
+# then 409). Reusing a key with a different body is rejected with 422.
+# Requests without the header are handled as before.
+#
+# Route budgets count one claim and one store. The statements of waiting for a
+# duplicate or taking over a stale key extend the request's budget instead.
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        key_hash = _digest(request.endpoint, key)
+        fingerprint = _digest(request.get_data())
+        deadline = time.monotonic() + current_app.config.get('IDEMPOTENCY_WAIT', DEFAULT_WAIT)
+        delay = POLL_INTERVAL
+        record, claimed = claim_key(key_hash, fingerprint, datetime.utcnow())
+        while not claimed:
+            now = datetime.utcnow()
+            if record is None or record.expires_at < now or (record.status_code is None and record.locked_until < now):
+                if record is not None:
+                    extend_query_budget(1)
+                    release_stale_key(key_hash, now)
+                extend_query_budget(2)
+                record, claimed = claim_key(key_hash, fingerprint, now)
+                continue
+            if record.fingerprint != fingerprint:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'}), 422
+            if record.status_code is not None:
+                return replay_response(record)
+            if time.monotonic() >= deadline:
+                response = jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'})
+                response.headers['Retry-After'] = '1'
+                return response, 409
+            # Wait for the running request; ending the read transaction first lets
+            # the next read see its commit
+            db.session.rollback()
+            wait_for_key(key_hash, delay, deadline)
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+            extend_query_budget(1)
+            record = IdempotencyKey.query.get(key_hash)
+
+        done = threading.Event()
+        with _in_flight_lock:
+            _in_flight[key_hash] = done
+        try:
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                store_response(key_hash, current_app.response_class(status=500))
+                raise
+            store_response(key_hash, response)
+            return response
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(key_hash, None)
+            done.set()
+    return wrapper
+
+# Function to delete every expired key and return how many were removed
+def purge_expired_keys():
+    removed = (IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.utcnow())
+               .delete(synchronize_session=False))
+    db.session.commit()
+    return removed
+
+# CLI command: `flask idempotency purge` deletes expired keys; run it on a schedule
+@click.group('idempotency', help='Stored responses of Idempotency-Key requests.')
+def idempotency_cli():
+    pass
+
+@idempotency_cli.command('purge', help='Delete idempotency keys past their TTL.')
+@with_appcontext
+def purge_command():
+    click.echo(f'Removed {purge_expired_keys()} expired idempotency key(s).')
@@ -0,0 +1,68 @@
+# index_audit.py
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from app.database import db
+
+# Function to list the lookups the models rely on as (table, columns, reason).
+# Foreign keys are read by relationship loads and by the parent-side checks on
+# delete; declared indexes back the routes' filters, sorts and keyset pages.
+def access_patterns(metadata):
+    patterns = []
+    for table in metadata.sorted_tables:
+        for constraint in table.foreign_key_constraints:
+            columns = tuple(column.name for column in constraint.columns)
+            patterns.append((table.name, columns, f'foreign key to {constraint.referred_table.name}'))
+        for index in table.indexes:
+            patterns.append((table.name, tuple(column.name for column in index.columns), f'declared index {index.name}'))
+    return patterns
+
+# Function to read the column lists of every index the database actually has on a
+# table, counting the primary key and unique constraints as indexes
+def existing_indexes(inspector, table_name):
+    indexes = [tuple(inspector.get_pk_constraint(table_name)['constrained_columns'])]
+    indexes.extend(tuple(index['column_names']) for index in inspector.get_indexes(table_name))
+    indexes.extend(tuple(unique['column_names']) for unique in inspector.get_unique_constraints(table_name))
+    return indexes
+
+# An index can seek on a lookup when the lookup's columns are its leading columns
+def is_covered(columns, indexes):
+    return any(set(index[:len(columns)]) == set(columns) for index in indexes)
+
+# Function to compare the models' access patterns against the live schema.
+# Returns a list of (table, columns, reason) lookups that no index serves.
+def audit_indexes(engine, metadata):
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    gaps = []
+    indexes = {}
+    seen = set()
+    for table_name, columns, reason in access_patterns(metadata):
+        if (table_name, columns) in seen:
+            continue
+        seen.add((table_name, columns))
+        if table_name not in tables:
+            if (table_name, None) not in seen:
+                seen.add((table_name, None))
+                gaps.append((table_name, (), 'table missing; run flask db upgrade'))
+            continue
+        if table_name not in indexes:
+            indexes[table_name] = existing_indexes(inspector, table_name)
+        if not is_covered(columns, indexes[table_name]):
+            gaps.append((table_name, columns, reason))
+    return gaps
+
+# CLI command: `flask index-audit` prints unindexed lookups and exits non-zero when
+# there are any, so it can gate deploys after `flask db upgrade`
+@click.command('index-audit')
+@with_appcontext
+def index_audit_command():
+    gaps = audit_indexes(db.engine, db.metadata)
+    for table_name, columns, reason in gaps:
+        if not columns:
+            click.echo(f'{table_name}: {reason}')
+        else:
+            click.echo(f"{table_name}({', '.join(columns)}): no index ({reason})")
+    if gaps:
+        raise SystemExit(1)
+    click.echo('Every foreign key and declared lookup is backed by an index.')
@@ -0,0 +1,242 @@
+# inventory.py
+import random
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, select
+from app.models import Product, StockShard, db
+from app.cache import invalidate_on_commit
+from app.query_debug import extend_query_budget
+from app.validation import validate_required_fields, validate_positive_integer
+
+# Raised when an order references a product that does not exist
+class ProductNotFoundError(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Product with ID {product_id} not found')
+        self.product_id = product_id
+
+# Raised when a product does not have enough stock to cover an order
+class InsufficientStockError(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Insufficient stock for product ID {product_id}')
+        self.product_id = product_id
+
+# Function to validate order items and sum the requested quantity per product
+def collect_quantities(order_items):
+    if not isinstance(order_items, list) or not order_items:
+        raise ValueError('order_items must be a non-empty list')
+    quantities = {}
+    for item in order_items:
+        validate_required_fields(item, ['product_id', 'quantity'])
+        validate_positive_integer(item['product_id'], 'product_id')
+        validate_positive_integer(item['quantity'], 'quantity')
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+# Function to check whether sharded stock counters are enabled (STOCK_SHARDS > 0)
+def sharding_enabled():
+    return current_app.config.get('STOCK_SHARDS', 0) > 0
+
+# Function to build the expression for a product's available stock: its own
+# stock_level plus the sum of its shard counters (none for unsharded products)
+def stock_expression():
+    shards = (select(func.coalesce(func.sum(StockShard.quantity), 0))
+              .where(StockShard.product_id == Product.id)
+              .scalar_subquery())
+    return Product.stock_level + shards
+
+# Function to pick the stock column of product reads: the product row's level, or
+# with sharded stock the level summed over the shards, under the same name
+def stock_column():
+    return stock_expression().label('stock_level') if sharding_enabled() else Product.stock_level
+
+# Function to load the current stock level of every product in one IN query.
+# With for_update the rows are locked (SELECT ... FOR UPDATE) until commit, in
+# product id order so concurrent lockers always queue in the same order.
+def load_stock_levels(product_ids, for_update=False):
+    stock = stock_expression() if sharding_enabled() else Product.stock_level
+    query = db.session.query(Product.id, stock).filter(Product.id.in_(list(product_ids)))
+    if for_update:
+        query = query.order_by(Product.id).with_for_update()
+    return {product_id: stock_level for product_id, stock_level in query.all()}
+
+# Function to check requested quantities against a stock snapshot
+def check_stock(quantities, stock_levels):
+    for product_id, quantity in quantities.items():
+        if product_id not in stock_levels:
+            raise ProductNotFoundError(product_id)
+        if stock_levels[product_id] < quantity:
+            raise InsufficientStockError(product_id)
+
+# Function to compute the net stock change per product when an order's lines go
+# from `old` to `new` quantities. Positive deltas take stock, negative ones return it;
+# unchanged products are left out so their rows are not touched at all.
+def diff_quantities(old, new):
+    deltas = {}
+    for product_id in old.keys() | new.keys():
+        delta = new.get(product_id, 0) - old.get(product_id, 0)
+        if delta:
+            deltas[product_id] = delta
+    return deltas
+
+# Function to apply net stock deltas to several products in a single conditional
+# UPDATE. A row is only updated when it still holds enough stock for its delta
+# (always true for returns), so concurrent writers can never drive stock_level
+# below zero, and no stock is read into Python and written back. The database
+# locks the matched rows in primary key order, so two such statements cannot
+# deadlock on each other. Returns False when any row was skipped, in which case
+# the caller must roll back the transaction.
+# With sharding enabled, sharded products go through their shard counters instead:
+# one UPDATE per product, so concurrent checkouts lock different rows. Route
+# budgets are sized for the single-row path, so those statements (and the shard
+# count lookup) extend the request's budget.
+def apply_stock_deltas(deltas):
+    if not deltas:
+        return True
+    invalidate_on_commit(Product.__tablename__, deltas)
+    if sharding_enabled():
+        shard_counts = load_shard_counts(deltas)
+        extend_query_budget(1 + len(shard_counts))
+        for product_id in sorted(shard_counts):
+            if not apply_shard_delta(product_id, deltas[product_id], shard_counts[product_id]):
+                return False
+        deltas = {product_id: delta for product_id, delta in deltas.items() if product_id not in shard_counts}
+        if not deltas:
+            return True
+    delta = case(deltas, value=Product.id)
+    updated = (Product.query
+               .filter(Product.id.in_(sorted(deltas)), Product.stock_level >= delta)
+               .update({Product.stock_level: Product.stock_level - delta}, synchronize_session=False))
+    return updated == len(deltas)
+
+# Function to decrement stock for several products; see apply_stock_deltas
+def take_stock(quantities):
+    return apply_stock_deltas(quantities)
+
+# Function to return stock for several products in a single UPDATE
+def release_stock(quantities):
+    apply_stock_deltas({product_id: -quantity for product_id, quantity in quantities.items()})
+
+# Function to count the shards of the given products; unsharded ones are left out
+def load_shard_counts(product_ids):
+    return dict(db.session.query(StockShard.product_id, func.count())
+                .filter(StockShard.product_id.in_(list(product_ids)))
+                .group_by(StockShard.product_id)
+                .all())
+
+# Function to apply one product's stock delta to a random shard. Returns go there
+# unconditionally; takes use a conditional UPDATE like apply_stock_deltas. Only when
+# the chosen shard is short does the checkout fall back to rebalance_stock, which
+# locks every shard of the product (near sell-out this serializes checkouts again).
+def apply_shard_delta(product_id, delta, shard_count):
+    shard = StockShard.query.filter(StockShard.product_id == product_id,
+                                    StockShard.shard == random.randrange(shard_count))
+    if delta < 0:
+        shard.update({StockShard.quantity: StockShard.quantity - delta}, synchronize_session=False)
+        return True
+    updated = (shard.filter(StockShard.quantity >= delta)
+               .update({StockShard.quantity: StockShard.quantity - delta}, synchronize_session=False))
+    return updated == 1 or rebalance_stock(product_id, take=delta)
+
+# Function to take `take` units from a product's total stock (its row plus its
+# shards) and spread the rest evenly over the shards. Locks the shards in shard
+# order, then the product row. Returns False when the product is missing or the
+# total cannot cover `take`. Its four statements extend the request's query budget.
+def rebalance_stock(product_id, take=0):
+    extend_query_budget(4)
+    quantities = [quantity for (quantity,) in db.session.query(StockShard.quantity)
+                  .filter_by(product_id=product_id)
+                  .order_by(StockShard.shard)
+                  .with_for_update()]
+    stock_level = (db.session.query(Product.stock_level).filter_by(id=product_id)
+                   .with_for_update().scalar())
+    if stock_level is None:
+        return False
+    remaining = stock_level + sum(quantities) - take
+    if remaining < 0:
+        return False
+    if quantities:
+        count = len(quantities)
+        spread = {shard: remaining // count + (shard < remaining % count) for shard in range(count)}
+        (StockShard.query.filter_by(product_id=product_id)
+         .update({StockShard.quantity: case(spread, value=StockShard.shard)}, synchronize_session=False))
+        remaining = 0
+    Product.query.filter_by(id=product_id).update({Product.stock_level: remaining}, synchronize_session=False)
+    invalidate_on_commit(Product.__tablename__, [product_id])
+    return True
+
+# Function to empty the shards of products whose stock_level is being set directly,
+# so the new stock_level is the whole stock again. Call it before changing the
+# products so locks are taken shards first, as in rebalance_stock. `product_ids`
+# may be a list or a SELECT of ids.
+def reset_shards(product_ids):
+    if not sharding_enabled():
+        return
+    (StockShard.query.filter(StockShard.product_id.in_(product_ids), StockShard.quantity != 0)
+     .update({StockShard.quantity: 0}, synchronize_session=False))
+
+# Function to move a product's shard stock back into its row and drop the shards
+def unshard_stock(product_id):
+    quantities = [quantity for (quantity,) in db.session.query(StockShard.quantity)
+                  .filter_by(product_id=product_id)
+                  .with_for_update()]
+    if quantities:
+        (Product.query.filter_by(id=product_id)
+         .update({Product.stock_level: Product.stock_level + sum(quantities)}, synchronize_session=False))
+        StockShard.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+        invalidate_on_commit(Product.__tablename__, [product_id])
+
+# Function to split a product's stock over `shard_count` counters (resharding
+# products that already have shards)
+def shard_stock(product_id, shard_count):
+    unshard_stock(product_id)
+    db.session.bulk_insert_mappings(StockShard, [
+        {'product_id': product_id, 'shard': shard, 'quantity': 0} for shard in range(shard_count)
+    ])
+    return rebalance_stock(product_id)
+
+# Function to list the ids of every sharded product
+def sharded_product_ids():
+    return [product_id for (product_id,) in db.session.query(StockShard.product_id).distinct()]
+
+# CLI commands: `flask stock shard|unshard|rebalance` manage sharded stock counters
+@click.group('stock', help='Sharded stock counters for hot products.')
+def stock_cli():
+    pass
+
+@stock_cli.command('shard', help='Spread the stock of the given products over shard counters.')
+@click.argument('product_ids', nargs=-1, type=int, required=True)
+@click.option('--shards', type=int, default=None, help='Shards per product (default: STOCK_SHARDS).')
+@with_appcontext
+def shard_command(product_ids, shards):
+    shard_count = shards or current_app.config.get('STOCK_SHARDS', 0)
+    if shard_count < 1:
+        raise click.UsageError('Set STOCK_SHARDS or pass --shards.')
+    missing = [product_id for product_id in product_ids if not shard_stock(product_id, shard_count)]
+    if missing:
+        db.session.rollback()
+        raise click.ClickException(f"Products not found: {', '.join(map(str, missing))}")
+    db.session.commit()
+    click.echo(f'Sharded {len(product_ids)} product(s) over {shard_count} counters each.')
+
+@stock_cli.command('unshard', help='Move shard stock back into the products and drop the shards.')
+@click.argument('product_ids', nargs=-1, type=int)
+@click.option('--all', 'all_products', is_flag=True, help='Unshard every sharded product.')
+@with_appcontext
+def unshard_command(product_ids, all_products):
+    if all_products:
+        product_ids = sharded_product_ids()
+    for product_id in product_ids:
+        unshard_stock(product_id)
+    db.session.commit()
+    click.echo(f'Unsharded {len(product_ids)} product(s).')
+
+@stock_cli.command('rebalance', help='Even out the shards of the given (default: all sharded) products.')
+@click.argument('product_ids', nargs=-1, type=int)
+@with_appcontext
+def rebalance_command(product_ids):
+    product_ids = product_ids or sharded_product_ids()
+    for product_id in product_ids:
+        rebalance_stock(product_id)
+    db.session.commit()
+    click.echo(f'Rebalanced {len(product_ids)} product(s).')
@@ -0,0 +1,140 @@
+# metrics.py
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric created in this process, in registration order
+REGISTRY = []
+
+# Monotonic counter with optional labels
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return lines
+
+# Histogram with fixed upper bounds and optional labels
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (plus +Inf), running sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+# Function to format a label tuple as a Prometheus label set
+def _format_labels(key):
+    if not key:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in key)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+
+# Function to render every registered metric in the Prometheus text format
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Connection pool metrics, recorded by the instrumented pool in database.py
+POOL_CHECKOUT_WAIT = Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting to check out a pooled database connection')
+POOL_CHECKOUT_TIMEOUTS = Counter('db_pool_checkout_timeouts_total', 'Connection checkouts that gave up after pool_timeout')
+
+# Read-through cache lookups, recorded by the tiers in cache.py
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by tier, namespace and result (hit or miss)')
+
+# Request metrics, recorded by the hooks installed with init_metrics()
+HTTP_REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request latency by route and method')
+HTTP_REQUESTS = Counter('http_requests_total', 'Requests by route, method and status code')
+SQL_STATEMENTS_PER_REQUEST = Histogram('sql_statements_per_request', 'SQL statements issued while handling a request',
+                                       buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89))
+SQL_TIME_PER_REQUEST = Histogram('sql_time_per_request_seconds', 'Time spent executing SQL while handling a request')
+
+_sql_hooks_installed = False
+
+# Start timing a statement issued during a request
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+# Add the statement's count and duration to the current request's totals
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if starts and has_request_context():
+        g.sql_time = g.get('sql_time', 0.0) + (time.perf_counter() - starts.pop())
+        g.sql_count = g.get('sql_count', 0) + 1
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+
+def _record_request(response):
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    if route != '/metrics':
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - g.request_start, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        SQL_STATEMENTS_PER_REQUEST.observe(g.sql_count, route=route)
+        SQL_TIME_PER_REQUEST.observe(g.sql_time, route=route)
+    return response
+
+# Function to install the request latency and SQL instrumentation on an app
+def init_metrics(app):
+    global _sql_hooks_installed
+    if not _sql_hooks_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _sql_hooks_installed = True
+    app.before_request(_start_request)
+    app.after_request(_record_request)
@@ -1,10 +1,17 @@
 # models.py
 from app.database import db
-from sqlalchemy import ForeignKey, CheckConstraint
+from sqlalchemy import ForeignKey, CheckConstraint, text
 from datetime import datetime
 
+# Row version and last-modified columns used for ETag / Last-Modified headers.
+# The version is bumped by every UPDATE, including bulk UPDATE statements.
+class VersionedMixin:
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', onupdate=text('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.func.current_timestamp())
+
 # Customer model
-class Customer(db.Model):
+class Customer(VersionedMixin, db.Model):
     __tablename__ = 'customers'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
@@ -14,40 +21,109 @@ class Customer(db.Model):
     orders = db.relationship('Order', backref='customer', lazy=True)
 
 # CustomerAccount model
-class CustomerAccount(db.Model):
+class CustomerAccount(VersionedMixin, db.Model):
     __tablename__ = 'customer_accounts'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)  # Hash this in production
-    customer_id = db.Column(db.Integer, ForeignKey('customers.id'), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # scrypt / PBKDF2 hash string (app/passwords.py)
+    customer_id = db.Column(db.Integer, ForeignKey('customers.id'), nullable=False, index=True)
 
 # Product model
-class Product(db.Model):
+class Product(VersionedMixin, db.Model):
     __tablename__ = 'products'
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), unique=True, nullable=False)
     price = db.Column(db.Float, nullable=False)
     stock_level = db.Column(db.Integer, nullable=False, default=0)
     __table_args__ = (
         CheckConstraint('price >= 0', name='check_price_positive'),
         CheckConstraint('stock_level >= 0', name='check_stock_non_negative'),
+        # Composite indexes backing keyset pagination and sorting in list_products
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_stock_level_id', 'stock_level', 'id'),
+    )
+
+# Sharded stock counter of a hot product (see app/inventory.py). Checkouts take
+# stock from one random shard, so they lock different rows instead of all waiting
+# on the product's row. A product's stock is its stock_level plus all its shards.
+class StockShard(db.Model):
+    __tablename__ = 'stock_shards'
+    product_id = db.Column(db.Integer, ForeignKey('products.id'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        CheckConstraint('quantity >= 0', name='check_shard_quantity_non_negative'),
     )
 
 # Order model
-class Order(db.Model):
+class Order(VersionedMixin, db.Model):
     __tablename__ = 'orders'
     id = db.Column(db.Integer, primary_key=True)
     order_date = db.Column(db.DateTime, default=datetime.utcnow)
     customer_id = db.Column(db.Integer, ForeignKey('customers.id'), nullable=False)
     order_items = db.relationship('OrderItem', backref='order', lazy=True)
+    __table_args__ = (
+        # Backs keyset pagination of a customer's order history (newest first); as
+        # customer_id is its leading column it also serves Customer.orders loads
+        db.Index('ix_orders_customer_id_order_date_id', 'customer_id', 'order_date', 'id'),
+    )
 
 # OrderItem model
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, ForeignKey('orders.id'), nullable=False)
-    product_id = db.Column(db.Integer, ForeignKey('products.id'), nullable=False)
+    order_id = db.Column(db.Integer, ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, ForeignKey('products.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
+    # Product price when the item was ordered, so revenue does not move with later price changes
+    unit_price = db.Column(db.Float)
     __table_args__ = (
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
-    )
\ No newline at end of file
+    )
+
+# Reporting summary: units, revenue and orders per product per (UTC) day.
+# Maintained incrementally by app/reporting.py; never written by the API directly.
+class DailyProductSales(db.Model):
+    __tablename__ = 'daily_product_sales'
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, ForeignKey('products.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        # Serves one product's sales over a date range
+        db.Index('ix_daily_product_sales_product_id_day', 'product_id', 'day'),
+    )
+
+# Reporting summary: lifetime orders, units and revenue per customer
+class CustomerSales(db.Model):
+    __tablename__ = 'customer_sales'
+    customer_id = db.Column(db.Integer, ForeignKey('customers.id'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    __table_args__ = (
+        # Backs keyset pagination of customers by lifetime value
+        db.Index('ix_customer_sales_revenue_customer_id', 'revenue', 'customer_id'),
+    )
+
+# Stored outcome of a request sent with an Idempotency-Key header (see app/idempotency.py).
+# Keyed by a hash of the route and the client's key; status_code is NULL while the
+# first request is still running, and locked_until bounds how long that claim holds.
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    key_hash = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    locked_until = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+# Access tokens revoked before they expire (see app/auth.py), by the token's random
+# id. Rows are only needed until expires_at, after which the signature check
+# rejects the token anyway.
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    token_id = db.Column(db.String(32), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,90 @@
+# pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Function to parse the page size from the `limit` query parameter
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1 or limit > maximum:
+        raise ValueError(f'limit must be between 1 and {maximum}')
+    return limit
+
+# Function to encode the sort key of the last row on a page into an opaque cursor
+def encode_cursor(sort, values):
+    payload = json.dumps({'s': sort, 'v': list(values)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+# Types a sort key value can have in a cursor (bool is excluded, though it is an int)
+CURSOR_VALUE_TYPES = (str, int, float, type(None))
+
+# Function to decode a cursor produced by encode_cursor for the given sort. Cursors
+# come from clients, so the payload is checked to be a list of scalar values
+# before any of it reaches a query.
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['v']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or any(
+            isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES) for value in values):
+        raise ValueError('Invalid cursor')
+    if payload.get('s') != sort:
+        raise ValueError('Cursor does not match the requested sort order')
+    return values
+
+# Functions to convert sort key values to and from their JSON form in a cursor;
+# datetimes travel as ISO 8601 strings and are parsed back by column type
+def _dump_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _load_value(column, value):
+    if isinstance(column.type, DateTime) and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    return value
+
+# Function to build the "rows after this key" predicate for a keyset page.
+# The leading column is written as a plain range (col >= value) so the
+# composite index can be used as a seek on every database we support.
+def keyset_predicate(columns, values, descending=False):
+    if len(columns) != len(values):
+        raise ValueError('Invalid cursor')
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    leading = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+# Function to fetch one keyset page; returns the rows and the next cursor (or None)
+def fetch_page(query, sort, columns, limit, cursor=None, descending=False):
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        if len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        values = [_load_value(column, value) for column, value in zip(columns, values)]
+        query = query.filter(keyset_predicate(columns, values, descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [_dump_value(getattr(last, column.key)) for column in columns])
+    return rows, next_cursor
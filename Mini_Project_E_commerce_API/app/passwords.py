@@ -0,0 +1,142 @@
+# passwords.py
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+# Defaults used when the app config does not set PASSWORD_* values
+DEFAULT_ALGORITHM = 'scrypt'
+DEFAULT_SCRYPT_N = 2 ** 14
+DEFAULT_SCRYPT_R = 8
+DEFAULT_SCRYPT_P = 1
+DEFAULT_PBKDF2_ITERATIONS = 600000
+DEFAULT_QUEUE = 32
+DEFAULT_TIMEOUT = 5
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Number of cost parameters stored in each algorithm's hash string
+PARAMETER_COUNTS = {'scrypt': 3, 'pbkdf2_sha256': 1}
+
+# Raised when every pool slot stays taken for PASSWORD_HASH_TIMEOUT seconds
+class PasswordHasherBusy(Exception):
+    pass
+
+# Functions for unpadded base64, as stored in the hash strings
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4), validate=True)
+
+# Function to derive a key from a password. Runs on the pool's threads: hashlib's
+# scrypt and pbkdf2_hmac release the GIL, so request threads keep running meanwhile.
+def _derive(algorithm, params, password, salt):
+    if algorithm == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=KEY_BYTES)
+    if algorithm == 'pbkdf2_sha256':
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac('sha256', password, salt, iterations, KEY_BYTES)
+    raise ValueError(f'Unknown password hash algorithm: {algorithm}')
+
+# Function to parse a stored "algorithm$param...$salt$key" string. Returns
+# (algorithm, params, salt, key), or None for a value in no known format (a
+# plain-text password stored before hashing was added).
+def _decode(stored):
+    parts = stored.split('$')
+    count = PARAMETER_COUNTS.get(parts[0])
+    if count is None or len(parts) != count + 3:
+        return None
+    try:
+        return parts[0], tuple(int(part) for part in parts[1:count + 1]), _b64decode(parts[-2]), _b64decode(parts[-1])
+    except (ValueError, binascii.Error):
+        return None
+
+# Function to read the configured algorithm and its cost parameters
+def hash_parameters(config):
+    algorithm = config.get('PASSWORD_HASH_ALGORITHM', DEFAULT_ALGORITHM)
+    if algorithm == 'scrypt':
+        return algorithm, (config.get('PASSWORD_SCRYPT_N', DEFAULT_SCRYPT_N),
+                           config.get('PASSWORD_SCRYPT_R', DEFAULT_SCRYPT_R),
+                           config.get('PASSWORD_SCRYPT_P', DEFAULT_SCRYPT_P))
+    if algorithm == 'pbkdf2_sha256':
+        return algorithm, (config.get('PASSWORD_PBKDF2_ITERATIONS', DEFAULT_PBKDF2_ITERATIONS),)
+    raise ValueError(f'Unknown PASSWORD_HASH_ALGORITHM: {algorithm}')
+
+# Hashes and checks passwords on a bounded thread pool. At most `workers` hashes
+# run at once, so a burst of signups cannot take every core from other requests,
+# and at most `queue_size` more wait for a worker; a request that finds no free
+# slot within `timeout` seconds gets PasswordHasherBusy instead of piling up.
+class PasswordHasher:
+    def __init__(self, algorithm, params, workers, queue_size=DEFAULT_QUEUE, timeout=DEFAULT_TIMEOUT):
+        self.algorithm = algorithm
+        self.params = tuple(params)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    # Function to run one key derivation on the pool and wait for its result
+    def _run(self, algorithm, params, password, salt):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(_derive, algorithm, params, password, salt)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    # Function to hash a password with the current parameters and a fresh salt
+    def hash(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = self._run(self.algorithm, self.params, _encode_password(password), salt)
+        return '$'.join([self.algorithm, *map(str, self.params), _b64encode(salt), _b64encode(key)])
+
+    # Function to check a password against a stored hash. Returns (matches,
+    # needs_rehash); needs_rehash is set when the hash was made with other
+    # parameters (or the value is a legacy plain-text password).
+    def verify(self, stored, password):
+        decoded = _decode(stored)
+        if decoded is None:
+            return hmac.compare_digest(stored.encode(), _encode_password(password)), True
+        algorithm, params, salt, key = decoded
+        matches = hmac.compare_digest(self._run(algorithm, params, _encode_password(password), salt), key)
+        return matches, (algorithm, params) != (self.algorithm, self.params)
+
+    # Function to spend one hash's worth of time, so a login for an unknown
+    # username takes as long as one with a wrong password
+    def verify_dummy(self, password):
+        self._run(self.algorithm, self.params, _encode_password(password), b'\0' * SALT_BYTES)
+
+# Function to validate a password and encode it for hashing
+def _encode_password(password):
+    if not isinstance(password, str) or not password:
+        raise ValueError('Password must be a non-empty string')
+    return password.encode()
+
+# Function to build the app's password hasher from its PASSWORD_* settings
+def init_passwords(app):
+    algorithm, params = hash_parameters(app.config)
+    app.extensions['password_hasher'] = PasswordHasher(
+        algorithm, params,
+        workers=app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1,
+        queue_size=app.config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT))
+
+# Functions to hash and check passwords with the current app's hasher
+def hash_password(password):
+    return current_app.extensions['password_hasher'].hash(password)
+
+def verify_password(stored, password):
+    return current_app.extensions['password_hasher'].verify(stored, password)
+
+def verify_dummy_password(password):
+    current_app.extensions['password_hasher'].verify_dummy(password)
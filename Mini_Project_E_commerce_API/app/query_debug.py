@@ -0,0 +1,102 @@
+# query_debug.py
+import logging
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Raised after a request that issued more SQL statements than its route's budget
+class QueryBudgetExceeded(Exception):
+    pass
+
+# Decorator declaring the maximum number of SQL statements a route may issue.
+# Place it below the route decorator so the registered view carries the budget.
+def query_budget(max_statements):
+    def decorator(view):
+        view.query_budget = max_statements
+        return view
+    return decorator
+
+# Function to let the current request issue `statements` more SQL statements than
+# its route's budget. For code paths whose statement count grows with the work by
+# design, such as one UPDATE per sharded product; a no-op outside query debugging.
+def extend_query_budget(statements):
+    if has_request_context() and 'query_debug' in g:
+        g.query_budget_extra = g.get('query_budget_extra', 0) + statements
+
+_hooks_installed = False
+
+# Function to fetch the query plan of a slow statement on the connection that ran it
+def explain(conn, statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_debug' in g:
+        conn.info.setdefault('query_debug_start', []).append(time.perf_counter())
+
+# Count the statement for N+1 detection and log it when it is slow
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_debug_start')
+    if not starts or not has_request_context() or 'query_debug' not in g:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    statements = g.query_debug
+    statements[statement] = statements.get(statement, 0) + 1
+    if elapsed_ms < current_app.config['SLOW_QUERY_THRESHOLD_MS']:
+        return
+    plan = None
+    streaming = context is not None and context.execution_options.get('stream_results')
+    if not executemany and not streaming and statement.lstrip().upper().startswith('SELECT'):
+        try:
+            plan = explain(conn, statement, parameters)
+        except Exception as e:
+            plan = f'EXPLAIN failed: {e}'
+    logger.warning('Slow query (%.1f ms) in %s %s: %s | params=%r | plan=%r',
+                   elapsed_ms, request.method, request.path, statement, parameters, plan)
+
+def _start_request():
+    g.query_debug = {}
+    g.query_budget_extra = 0
+
+# Report repeated statements and enforce the route's query budget
+def _check_request(response):
+    statements = g.pop('query_debug', None)
+    if statements is None:
+        return response
+    threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+    for statement, count in statements.items():
+        if count >= threshold:
+            logger.warning('Possible N+1: statement ran %d times in %s %s: %s',
+                           count, request.method, request.path, statement)
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None:
+        budget += g.pop('query_budget_extra', 0)
+    total = sum(statements.values())
+    if budget is not None and total > budget:
+        message = f'{request.endpoint} issued {total} SQL statements, over its budget of {budget}'
+        if current_app.config.get('QUERY_BUDGET_ENFORCE'):
+            raise QueryBudgetExceeded(message)
+        logger.error(message)
+    return response
+
+# Function to install the slow-query log, N+1 detector and query budgets on an app.
+# Meant for development, staging and tests; enabled with QUERY_DEBUG.
+def init_query_debug(app):
+    global _hooks_installed
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 100)
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+    if not _hooks_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _hooks_installed = True
+    app.before_request(_start_request)
+    app.after_request(_check_request)
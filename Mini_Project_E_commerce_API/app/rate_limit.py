@@ -0,0 +1,154 @@
+# rate_limit.py
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, jsonify, request
+from app.auth import bearer_claims
+
+# Default limit as (requests per second, burst) when the app config sets none
+DEFAULT_LIMIT = (10, 20)
+
+# Endpoints that are never limited (the metrics scraper polls on its own schedule)
+EXEMPT_ENDPOINTS = ('metrics_routes.read_metrics', 'static')
+
+# A token bucket is kept as a single number, its "theoretical arrival time" (the
+# generic cell rate algorithm): the time at which the bucket would be full again.
+# Each request pushes it forward by one emission interval (1 / rate); a request is
+# allowed while that stays within `burst` intervals of now. One float per client
+# and route is all the state there is, and it can be updated without a lock.
+#
+# A store is any object with hit(key, now, interval, capacity), which records a
+# request against `key` and returns (allowed, tat): the stored arrival time after
+# an allowed request, or the current one if denied.
+
+# In-process store for single-worker deployments. Updates are a dict read and a
+# dict write with no lock: two threads racing on one key may both be allowed on the
+# same state, so a burst can overshoot by at most one request per racing thread.
+# Buckets are kept in least recently used order, and the least recently used one is
+# dropped once the store holds more than max_keys entries, so eviction is O(1).
+class MemoryStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+
+    def hit(self, key, now, interval, capacity):
+        tat = max(self._tats.get(key, now), now) + interval
+        if tat - now > capacity:
+            return False, tat - interval
+        # Re-inserting moves the key to the most recently used end
+        self._tats.pop(key, None)
+        self._tats[key] = tat
+        while len(self._tats) > self.max_keys:
+            try:
+                self._tats.popitem(last=False)
+            except KeyError:
+                break
+        return True, tat
+
+# Shared store for several worker processes on one host, kept in a SQLite file (a
+# local stand-in for a networked store such as Redis). Each hit is one atomic
+# UPSERT that only advances the arrival time when the request is allowed.
+class SQLiteStore:
+    SCHEMA = 'CREATE TABLE IF NOT EXISTS token_buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID'
+    HIT = ('INSERT INTO token_buckets (key, tat) VALUES (:key, :now + :interval) '
+           'ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval '
+           'WHERE max(tat, :now) + :interval - :now <= :capacity '
+           'RETURNING tat')
+    CURRENT = 'SELECT tat FROM token_buckets WHERE key = ?'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(self.SCHEMA)
+
+    # One autocommit connection per thread; WAL lets readers run beside the writer
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def hit(self, key, now, interval, capacity):
+        connection = self._connection()
+        row = connection.execute(self.HIT, {'key': key, 'now': now, 'interval': interval,
+                                            'capacity': capacity}).fetchone()
+        if row is not None:
+            return True, row[0]
+        row = connection.execute(self.CURRENT, (key,)).fetchone()
+        return False, row[0] if row else now
+
+# Function to build the store named by RATE_LIMIT_STORAGE: "memory", or
+# "sqlite:///<path>" for the shared file store (relative to the project root)
+def create_store(app):
+    storage = app.config.get('RATE_LIMIT_STORAGE', 'memory')
+    if storage == 'memory':
+        return MemoryStore()
+    if storage.startswith('sqlite:///'):
+        return SQLiteStore(os.path.join(app.root_path, storage[len('sqlite:///'):]))
+    raise ValueError(f'Unknown RATE_LIMIT_STORAGE: {storage}')
+
+# Function to check a request against a (rate, burst) limit. Returns
+# (allowed, limit, remaining, reset_seconds, retry_after_seconds).
+def check_limit(store, key, rate, burst, now=None):
+    now = time.time() if now is None else now
+    interval = 1.0 / rate
+    capacity = burst * interval
+    allowed, tat = store.hit(key, now, interval, capacity)
+    remaining = max(int((capacity - (tat - now)) / interval + 1e-9), 0)
+    reset = max(math.ceil(tat - now), 0)
+    retry_after = 0 if allowed else max(math.ceil(tat + interval - capacity - now), 1)
+    return allowed, burst, remaining, reset, retry_after
+
+# Function to pick the limit for the current endpoint
+def endpoint_limit(config, endpoint):
+    return config.get('RATE_LIMITS', {}).get(endpoint, config.get('RATE_LIMIT_DEFAULT', DEFAULT_LIMIT))
+
+# Function to identify the client of the current request: the account of a valid
+# access token, otherwise the remote address. Only a verified identity gets its own
+# bucket, so a client cannot reset its limit by sending a different header value.
+def client_key():
+    claims = bearer_claims()
+    if claims is not None:
+        return f"account:{claims['account_id']}"
+    return f'address:{request.remote_addr}'
+
+# Limit every request by client and endpoint before it reaches a view, answering
+# 429 once the client's bucket is empty
+def _limit_request():
+    endpoint = request.endpoint
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+        return None
+    rate, burst = endpoint_limit(current_app.config, endpoint)
+    client = client_key()
+    allowed, limit, remaining, reset, retry_after = check_limit(
+        current_app.extensions['rate_limit'], f'{client}|{endpoint}', rate, burst)
+    g.rate_limit = (limit, remaining, reset, burst / rate)
+    if not allowed:
+        response = jsonify({'error': 'Too many requests, please retry later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    return None
+
+# Add the RateLimit-* headers (IETF draft) to every limited response
+def _add_headers(response):
+    state = g.pop('rate_limit', None)
+    if state is not None:
+        limit, remaining, reset, window = state
+        response.headers['RateLimit-Limit'] = str(limit)
+        response.headers['RateLimit-Remaining'] = str(remaining)
+        response.headers['RateLimit-Reset'] = str(reset)
+        response.headers['RateLimit-Policy'] = f'{limit};w={window:g}'
+    return response
+
+# Function to install the rate limiter on an app
+def init_rate_limit(app):
+    app.extensions['rate_limit'] = create_store(app)
+    app.before_request(_limit_request)
+    app.after_request(_add_headers)
@@ -0,0 +1,101 @@
+# reporting.py
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, func, select, true
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.models import Order, OrderItem, Product, DailyProductSales, CustomerSales, db
+
+# Function to copy each product's current price onto order items that have none.
+# Called right after items are inserted, so it records the price at order time.
+def snapshot_unit_prices(order_ids=None):
+    price = select(Product.price).where(Product.id == OrderItem.product_id).scalar_subquery()
+    query = OrderItem.query.filter(OrderItem.unit_price.is_(None))
+    if order_ids is not None:
+        query = query.filter(OrderItem.order_id.in_(list(order_ids)))
+    query.update({OrderItem.unit_price: price}, synchronize_session=False)
+
+# Function to build the per product and day sales of some orders (all when
+# order_ids is None), multiplied by sign so removals can be subtracted
+def product_sales_query(order_ids=None, sign=1):
+    revenue = OrderItem.quantity * func.coalesce(OrderItem.unit_price, 0)
+    day = func.date(Order.order_date)
+    return (select(day.label('day'), OrderItem.product_id,
+                   (sign * func.sum(OrderItem.quantity)).label('quantity'),
+                   (sign * func.sum(revenue)).label('revenue'),
+                   (sign * func.count(func.distinct(OrderItem.order_id))).label('order_count'))
+            .select_from(OrderItem)
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(OrderItem.order_id.in_(list(order_ids)) if order_ids is not None else true())
+            .group_by(day, OrderItem.product_id))
+
+# Function to build the per customer sales of some orders, as above
+def customer_sales_query(order_ids=None, sign=1):
+    revenue = OrderItem.quantity * func.coalesce(OrderItem.unit_price, 0)
+    return (select(Order.customer_id,
+                   (sign * func.count(func.distinct(Order.id))).label('order_count'),
+                   (sign * func.sum(OrderItem.quantity)).label('item_count'),
+                   (sign * func.sum(revenue)).label('revenue'))
+            .select_from(Order)
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.id.in_(list(order_ids)) if order_ids is not None else true())
+            .group_by(Order.customer_id))
+
+# Function to build an INSERT ... SELECT that adds the selected values to existing
+# summary rows (col = col + excluded.col) and inserts the rest
+def _accumulate_statement(dialect, table, keys, columns, query):
+    if dialect == 'mysql':
+        statement = mysql.insert(table).from_select(keys + columns, query)
+        return statement.on_duplicate_key_update({column: table.c[column] + statement.inserted[column]
+                                                  for column in columns})
+    insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+    statement = insert(table).from_select(keys + columns, query)
+    return statement.on_conflict_do_update(index_elements=keys, set_={
+        column: table.c[column] + statement.excluded[column] for column in columns})
+
+# Function to add a sales query's rows to a summary table in a single statement
+# (one UPDATE or INSERT per row on databases without a native upsert)
+def accumulate(model, keys, query):
+    table = model.__table__
+    columns = [column for column in query.selected_columns.keys() if column not in keys]
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'mysql', 'postgresql'):
+        db.session.execute(_accumulate_statement(dialect, table, keys, columns, query))
+        return
+    for row in db.session.execute(query).mappings().all():
+        match = and_(*[table.c[key] == row[key] for key in keys])
+        updated = db.session.execute(table.update().where(match).values(
+            {column: table.c[column] + row[column] for column in columns}))
+        if updated.rowcount == 0:
+            db.session.execute(table.insert().values(dict(row)))
+
+# Function to add (sign=1) or subtract (sign=-1) the sales of some orders from the
+# summary tables, inside the caller's transaction. Subtract before deleting items
+# and add after inserting them. Does nothing when REPORTS_INLINE is off, in which
+# case `flask reports rebuild` keeps the tables current instead.
+def record_order_sales(order_ids, sign=1):
+    if not order_ids or not current_app.config.get('REPORTS_INLINE', True):
+        return
+    accumulate(DailyProductSales, ['day', 'product_id'], product_sales_query(order_ids, sign))
+    accumulate(CustomerSales, ['customer_id'], customer_sales_query(order_ids, sign))
+
+# Function to recompute both summary tables from the order history in one transaction
+def rebuild_reports():
+    snapshot_unit_prices()
+    db.session.execute(DailyProductSales.__table__.delete())
+    db.session.execute(CustomerSales.__table__.delete())
+    accumulate(DailyProductSales, ['day', 'product_id'], product_sales_query())
+    accumulate(CustomerSales, ['customer_id'], customer_sales_query())
+    db.session.commit()
+
+# CLI commands: `flask reports rebuild` backfills or repairs the summary tables
+@click.group('reports', help='Sales reporting summary tables.')
+def reports_cli():
+    pass
+
+@reports_cli.command('rebuild', help='Recompute the sales summary tables from all orders.')
+@with_appcontext
+def rebuild_command():
+    rebuild_reports()
+    click.echo(f'Rebuilt {DailyProductSales.query.count()} product/day rows '
+               f'and {CustomerSales.query.count()} customer rows.')
@@ -0,0 +1,62 @@
+# routes/analytics_routes.py
+from flask import Blueprint, request, jsonify
+from app.analytics import (load_item_columns, load_product_columns, basket_size_distribution,
+                           co_purchase_counts, stock_turnover)
+from app.cache import read_through
+from app.validation import parse_optional_number
+from sqlalchemy.exc import SQLAlchemyError
+
+analytics_routes = Blueprint('analytics_routes', __name__)
+
+# Largest `top` accepted by the ranking endpoints
+MAX_TOP = 1000
+
+# Function to parse the optional `top` query parameter
+def parse_top(args, default):
+    top = parse_optional_number(args, 'top', int)
+    if top is None:
+        return default
+    if top < 1 or top > MAX_TOP:
+        raise ValueError(f'top must be between 1 and {MAX_TOP}')
+    return top
+
+# Each result scans every order item, so it is cached for CACHE_TTL seconds under
+# the "analytics" namespace; results may lag the latest orders by that much.
+
+@analytics_routes.route('/analytics/basket-sizes', methods=['GET'])
+def basket_sizes():
+    try:
+        return jsonify(read_through('analytics', 'basket-sizes',
+                                    lambda: basket_size_distribution(load_item_columns())))
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_routes.route('/analytics/co-purchases', methods=['GET'])
+def co_purchases():
+    try:
+        top = parse_top(request.args, 20)
+        pairs = read_through('analytics', ('co-purchases', top),
+                             lambda: co_purchase_counts(load_item_columns(), top))
+        return jsonify({'pairs': pairs})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_routes.route('/analytics/stock-turnover', methods=['GET'])
+def stock_turnover_report():
+    try:
+        top = parse_top(request.args, 100)
+        products = read_through('analytics', ('stock-turnover', top),
+                                lambda: stock_turnover(load_item_columns(), load_product_columns(), top))
+        return jsonify({'products': products})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
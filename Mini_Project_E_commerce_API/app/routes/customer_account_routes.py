@@ -1,16 +1,37 @@
 # routes/customer_account_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, g, request, jsonify
 from app.models import CustomerAccount, Customer, db
 from app.validation import validate_required_fields
+from app.cache import read_through, invalidate_on_commit
+from app.auth import issue_access_token, login_required, revoke_access_token
+from app.passwords import PasswordHasherBusy, hash_password, verify_password, verify_dummy_password
+from app.query_debug import query_budget
+from app.conditional import cached_row, fetch_projection, make_etag, is_not_modified, add_validators, not_modified_response
+from app.routes.customer_routes import load_customer
+from app.serializers import ACCOUNT, CUSTOMER, json_response, parse_fields
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 customer_account_routes = Blueprint('customer_account_routes', __name__)
 
+# Fields of an account response for sparse fieldsets; `customer` stands for every
+# embedded customer field, `customer.<name>` for one of them
+ACCOUNT_CUSTOMER_FIELDS = ('name', 'email', 'phone_number')
+ACCOUNT_FIELDS = ('account_id', 'username', 'customer', *(f'customer.{name}' for name in ACCOUNT_CUSTOMER_FIELDS))
+
+# Function to build the response sent when the password hashing pool is full
+def hasher_busy_response():
+    response = jsonify({'error': 'Server busy, please retry later'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @customer_account_routes.route('/customer_account', methods=['POST'])
 def create_customer_account():
     try:
         data = request.json
         validate_required_fields(data, ['username', 'password', 'customer_id'])
+
+        # Hash first, so no database connection is held while the hash runs
+        password = hash_password(data['password'])
         
         # Verify that customer exists
         customer = Customer.query.get(data['customer_id'])
@@ -18,12 +39,14 @@ def create_customer_account():
             return jsonify({'error': 'Customer not found'}), 404
         
         # Create new customer account
-        account = CustomerAccount(username=data['username'], password=data['password'], customer_id=data['customer_id'])
+        account = CustomerAccount(username=data['username'], password=password, customer_id=data['customer_id'])
         db.session.add(account)
         db.session.commit()
         return jsonify({'message': 'Customer account created successfully', 'account_id': account.id}), 201
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    except PasswordHasherBusy:
+        return hasher_busy_response()
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'Username already exists or customer ID is invalid'}), 409
@@ -33,39 +56,88 @@ def create_customer_account():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Function to load a customer account as a cached row
+def load_customer_account(id):
+    row = (db.session.query(*ACCOUNT.columns(CustomerAccount.version, CustomerAccount.updated_at))
+           .filter(CustomerAccount.id == id).first())
+    if not row:
+        return None
+    return cached_row(row, ACCOUNT.dump(row))
+
 @customer_account_routes.route('/customer_account/<int:id>', methods=['GET'])
+@query_budget(2)
 def read_customer_account(id):
     try:
-        # Retrieve account details by ID
-        account = CustomerAccount.query.get(id)
+        names = parse_fields(request.args.get('fields'), ACCOUNT_FIELDS)
+        
+        # Retrieve account details by ID, served from the cache when possible
+        account = read_through(CustomerAccount.__tablename__, id, lambda: load_customer_account(id))
         if not account:
             return jsonify({'error': 'Customer account not found'}), 404
+        if names is not None:
+            return read_account_fields(id, account, names)
+        
+        # Retrieve the associated customer's information; it is cached separately so
+        # customer updates never leave a stale copy embedded in the account entry
+        customer_id = account.data['customer_id']
+        customer = read_through(Customer.__tablename__, customer_id, lambda: load_customer(customer_id))
         
-        # Retrieve the associated customer's information
-        customer = Customer.query.get(account.customer_id)
-        return jsonify({'account_id': account.id, 'username': account.username, 'customer': {'name': customer.name, 'email': customer.email, 'phone_number': customer.phone_number}})
+        # The ETag covers both rows since the response embeds the customer
+        etag = make_etag(CustomerAccount.__tablename__, id, account.version, customer.version)
+        last_modified = max(account.updated_at, customer.updated_at)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        customer = customer.data
+        return add_validators(json_response({'account_id': account.data['account_id'], 'username': account.data['username'], 'customer': {'name': customer['name'], 'email': customer['email'], 'phone_number': customer['phone_number']}}), etag, last_modified)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError:
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Function to answer read_customer_account for a sparse fieldset. The customer is
+# only read when one of its fields is requested, and then only those columns.
+def read_account_fields(id, account, names):
+    payload = {name: account.data[name] for name in ('account_id', 'username') if name in names}
+    customer_fields = tuple(field for field in ACCOUNT_CUSTOMER_FIELDS
+                            if 'customer' in names or f'customer.{field}' in names)
+    etag_parts, last_modified = [account.version], account.updated_at
+    if customer_fields:
+        customer = fetch_projection(Customer, account.data['customer_id'], CUSTOMER.project(customer_fields))
+        payload['customer'] = customer.data
+        etag_parts.append(customer.version)
+        last_modified = max(last_modified, customer.updated_at)
+    
+    etag = make_etag(CustomerAccount.__tablename__, id, *etag_parts, names)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return add_validators(json_response(payload), etag, last_modified)
+
 @customer_account_routes.route('/customer_account/<int:id>', methods=['PUT'])
 def update_customer_account(id):
     try:
+        # Hash a new password before touching the database
+        data = request.json
+        password = hash_password(data['password']) if 'password' in data else None
+
         # Retrieve the customer account to be updated
         account = CustomerAccount.query.get(id)
         if not account:
             return jsonify({'error': 'Customer account not found'}), 404
         
         # Update account fields based on user input
-        data = request.json
         if 'username' in data:
             account.username = data['username']
-        if 'password' in data:
-            account.password = data['password']  # Note: Hash the password in production for security purposes
+        if password is not None:
+            account.password = password
         
         db.session.commit()
         return jsonify({'message': 'Customer account updated successfully'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except PasswordHasherBusy:
+        return hasher_busy_response()
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'Username already exists or customer ID is invalid'}), 409
@@ -75,6 +147,74 @@ def update_customer_account(id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Function to store a fresh hash after a login that matched an outdated one. Only
+# the hash that was checked is replaced, so a concurrent password change wins.
+def rehash_password(account_id, checked, password):
+    CustomerAccount.query.filter_by(id=account_id, password=checked).update(
+        {CustomerAccount.password: hash_password(password)}, synchronize_session=False)
+    invalidate_on_commit(CustomerAccount.__tablename__, [account_id])
+    db.session.commit()
+
+@customer_account_routes.route('/customer_account/login', methods=['POST'])
+@query_budget(2)
+def login_customer_account():
+    try:
+        data = request.json
+        validate_required_fields(data, ['username', 'password'])
+        account = (db.session.query(CustomerAccount.id, CustomerAccount.password)
+                   .filter_by(username=data['username']).first())
+        # End the read so no connection is held while the hash runs
+        db.session.rollback()
+
+        # An unknown username costs a hash too, so response times do not reveal it
+        if account is None:
+            verify_dummy_password(data['password'])
+            return jsonify({'error': 'Invalid username or password'}), 401
+        matches, needs_rehash = verify_password(account.password, data['password'])
+        if not matches:
+            return jsonify({'error': 'Invalid username or password'}), 401
+
+        # Upgrade hashes made with older parameters; the login succeeds either way
+        if needs_rehash:
+            try:
+                rehash_password(account.id, account.password, data['password'])
+            except PasswordHasherBusy:
+                pass
+        return jsonify({'message': 'Login successful', 'account_id': account.id,
+                        'access_token': issue_access_token(account.id), 'token_type': 'Bearer',
+                        'expires_in': current_app.config['ACCESS_TOKEN_TTL']})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except PasswordHasherBusy:
+        return hasher_busy_response()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# The account of the access token's holder, served like GET /customer_account/<id>.
+# The token is checked in memory; the budget allows one reload of the revocation list.
+@customer_account_routes.route('/customer_account/me', methods=['GET'])
+@query_budget(3)
+@login_required
+def read_current_customer_account():
+    return read_customer_account(g.access_token['account_id'])
+
+@customer_account_routes.route('/customer_account/logout', methods=['POST'])
+@query_budget(2)
+@login_required
+def logout_customer_account():
+    try:
+        # Revoke the token used for this request until it expires
+        revoke_access_token(g.access_token)
+        return jsonify({'message': 'Logged out successfully'})
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @customer_account_routes.route('/customer_account/<int:id>', methods=['DELETE'])
 def delete_customer_account(id):
     try:
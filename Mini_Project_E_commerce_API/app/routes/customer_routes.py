@@ -1,12 +1,22 @@
 # routes/customer_routes.py
 from flask import Blueprint, request, jsonify
-from app.models import Customer, db
-from app.validation import validate_email, validate_phone_number, validate_required_fields
+from app.models import Customer, CustomerSales, db
+from app.validation import validate_email, validate_phone_number, validate_required_fields, validate_customer
+from app.bulk import validate_records, upsert_rows
+from app.query_debug import query_budget
+from app.idempotency import idempotent
+from app.conditional import (fetch_conditional, fetch_projection, cached_row, row_etag, add_validators,
+                             is_not_modified, not_modified_response)
+from app.serializers import CUSTOMER, json_response, parse_fields
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 customer_routes = Blueprint('customer_routes', __name__)
 
+# Columns a /customers/bulk record may set
+CUSTOMER_BULK_COLUMNS = ('name', 'email', 'phone_number')
+
 @customer_routes.route('/customer', methods=['POST'])
+@idempotent
 def create_customer():
     try:
         data = request.json
@@ -30,15 +40,66 @@ def create_customer():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@customer_routes.route('/customers/bulk', methods=['POST'])
+def upsert_customers_bulk():
+    try:
+        # Validate every record; invalid rows are reported and skipped
+        valid, results = validate_records(request.json, 'email', validate_customer)
+        rows = [{column: record[column] for column in CUSTOMER_BULK_COLUMNS} for _, record in valid]
+        
+        # Insert new customers and update existing ones matched by email
+        existing = upsert_rows(Customer, rows, 'email')
+        db.session.commit()
+        for index, record in valid:
+            status = 200 if record['email'] in existing else 201
+            results.append({'index': index, 'status': status, 'email': record['email']})
+        results.sort(key=lambda result: result['index'])
+        
+        updated = len(existing)
+        return jsonify({'created': len(valid) - updated, 'updated': updated, 'failed': len(results) - len(valid), 'results': results})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Data integrity issue occurred'}), 409
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Function to load a customer as the cached row served by read_customer
+def load_customer(id):
+    row = db.session.query(*CUSTOMER.columns(Customer.version, Customer.updated_at)).filter(Customer.id == id).first()
+    if not row:
+        return None
+    return cached_row(row, CUSTOMER.dump(row))
+
 @customer_routes.route('/customer/<int:id>', methods=['GET'])
+@query_budget(2)
 def read_customer(id):
     try:
-        # Retrieve customer details by ID
-        customer = Customer.query.get(id)
+        projection = CUSTOMER.project(parse_fields(request.args.get('fields'), CUSTOMER.names))
+        if projection is not CUSTOMER:
+            # A sparse fieldset selects only its columns, or narrows the cached row
+            customer = fetch_projection(Customer, id, projection)
+            if not customer:
+                return jsonify({'error': 'Customer not found'}), 404
+            etag = row_etag(Customer, id, customer.version, projection.names)
+            if is_not_modified(etag, customer.updated_at):
+                return not_modified_response(etag, customer.updated_at)
+            return add_validators(json_response(customer.data), etag, customer.updated_at)
+
+        # Retrieve customer details by ID, answering 304 when the client's copy is current
+        customer, not_modified = fetch_conditional(Customer, id, lambda: load_customer(id))
+        if not_modified:
+            return not_modified
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
-        return jsonify({'id': customer.id, 'name': customer.name, 'email': customer.email, 'phone_number': customer.phone_number})
+        return add_validators(json_response(customer.data), row_etag(Customer, id, customer.version), customer.updated_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError:
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
@@ -84,6 +145,8 @@ def delete_customer(id):
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
+        # The sales summary row references the customer, so it goes first
+        CustomerSales.query.filter_by(customer_id=id).delete(synchronize_session=False)
         db.session.delete(customer)
         db.session.commit()
         return jsonify({'message': 'Customer deleted successfully'})
@@ -0,0 +1,10 @@
+# routes/metrics_routes.py
+from flask import Blueprint, Response
+from app.metrics import render_prometheus
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+
+@metrics_routes.route('/metrics', methods=['GET'])
+def read_metrics():
+    # Expose every registered metric in the Prometheus text exposition format
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
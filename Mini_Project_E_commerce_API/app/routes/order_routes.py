@@ -1,46 +1,120 @@
 # routes/order_routes.py
 from flask import Blueprint, request, jsonify
 from app.models import Order, OrderItem, Product, Customer, db
-from app.validation import validate_required_fields
+from app.validation import validate_required_fields, validate_positive_integer
+from app.query_debug import query_budget
+from app.pagination import parse_limit, fetch_page
+from app.reporting import snapshot_unit_prices, record_order_sales
+from app.cache import read_through
+from app.idempotency import idempotent
+from app.routes.customer_routes import load_customer
+from app.conditional import make_etag, row_etag, is_not_modified, add_validators, not_modified_response
+from app.serializers import ORDER, ORDER_ITEM, json_response, parse_fields
+from app.inventory import (collect_quantities, load_stock_levels, check_stock, take_stock, release_stock,
+                           diff_quantities, apply_stock_deltas, ProductNotFoundError, InsufficientStockError)
+from sqlalchemy import func, insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import datetime
 
 order_routes = Blueprint('order_routes', __name__)
 
+# Maximum number of orders accepted by a single /orders/bulk request
+MAX_BULK_ORDERS = 1000
+
+# Values accepted by the `expand` query parameter of order reads
+EXPAND_OPTIONS = ('items.product',)
+
+# Function to load the items of several orders together with their products in
+# one query. Line totals and per-order totals are computed by the database (the
+# order total with a window function). Returns {order_id: (items, order_total)}
+# and the product versions seen, for building ETags.
+def load_expanded_items(order_ids):
+    line_total = (OrderItem.quantity * Product.price).label('line_total')
+    rows = (db.session.query(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity,
+                             Product.name, Product.price, Product.version, line_total,
+                             func.sum(OrderItem.quantity * Product.price)
+                             .over(partition_by=OrderItem.order_id).label('order_total'))
+            .join(Product, Product.id == OrderItem.product_id)
+            .filter(OrderItem.order_id.in_(list(order_ids)))
+            .order_by(OrderItem.order_id, OrderItem.id)
+            .all())
+    expanded = {order_id: ([], 0) for order_id in order_ids}
+    for row in rows:
+        items, _ = expanded[row.order_id]
+        items.append({
+            'product_id': row.product_id,
+            'quantity': row.quantity,
+            'product': {'id': row.product_id, 'name': row.name, 'price': row.price},
+            'line_total': row.line_total,
+        })
+        expanded[row.order_id] = (items, row.order_total)
+    return expanded, [(row.product_id, row.version) for row in rows]
+
+# Function to insert a batch of orders and return their ids in the same order.
+# Dialects with RETURNING get the ids from the INSERT itself. Elsewhere the rows go
+# in with one executemany and the ids above the previous maximum are read back with
+# one query; the caller already holds its write locks (SQLite admits one writer, and
+# InnoDB's consistent read hides other transactions' orders), so they are all ours.
+def insert_orders(order_rows):
+    if db.engine.dialect.full_returning:
+        result = db.session.execute(insert(Order).values(order_rows).returning(Order.id))
+        return sorted(order_id for order_id, in result)
+    previous = db.session.query(func.max(Order.id)).scalar() or 0
+    db.session.bulk_insert_mappings(Order, order_rows)
+    order_ids = [order_id for order_id, in db.session.query(Order.id).filter(Order.id > previous).order_by(Order.id)]
+    if len(order_ids) != len(order_rows):
+        raise SQLAlchemyError('Could not read back the ids of the inserted orders')
+    return order_ids
+
+# The budget includes claiming and storing an Idempotency-Key (two statements)
 @order_routes.route('/order', methods=['POST'])
+@query_budget(10)
+@idempotent
 def create_order():
     try:
         data = request.json
         validate_required_fields(data, ['customer_id', 'order_items'])
+        quantities = collect_quantities(data['order_items'])
         
         # Verify that customer exists
         customer = Customer.query.get(data['customer_id'])
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
+        # Load every product in the order with one IN query and check stock up front
+        check_stock(quantities, load_stock_levels(quantities))
+        
         # Create new order
         order = Order(order_date=datetime.utcnow(), customer_id=data['customer_id'])
         db.session.add(order)
         db.session.flush()  # Get order ID for order items
         
-        # Add order items
-        for item in data['order_items']:
-            validate_required_fields(item, ['product_id', 'quantity'])
-            product = Product.query.get(item['product_id'])
-            if not product:
-                db.session.rollback()
-                return jsonify({'error': f'Product with ID {item["product_id"]} not found'}), 404
-            if product.stock_level < item['quantity']:
-                db.session.rollback()
-                return jsonify({'error': f'Insufficient stock for product ID {item["product_id"]}'}), 400
-            
-            # Update product stock level
-            product.stock_level -= item['quantity']
-            order_item = OrderItem(order_id=order.id, product_id=item['product_id'], quantity=item['quantity'])
-            db.session.add(order_item)
+        # Take stock for all products in one conditional UPDATE
+        if not take_stock(quantities):
+            # Stock changed since the check above; report the current shortfall
+            db.session.rollback()
+            check_stock(quantities, load_stock_levels(quantities))
+            return jsonify({'error': 'Stock changed while placing the order, please retry'}), 409
+        
+        # Add order items in a single executemany INSERT
+        order_id = order.id
+        db.session.bulk_insert_mappings(OrderItem, [
+            {'order_id': order_id, 'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in quantities.items()
+        ])
+        
+        # Record the prices paid and add the order to the sales reports
+        snapshot_unit_prices([order_id])
+        record_order_sales([order_id])
         
         db.session.commit()
-        return jsonify({'message': 'Order created successfully', 'order_id': order.id}), 201
+        return jsonify({'message': 'Order created successfully', 'order_id': order_id}), 201
+    except ProductNotFoundError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except IntegrityError:
@@ -52,66 +126,250 @@ def create_order():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@order_routes.route('/orders/bulk', methods=['POST'])
+def create_orders_bulk():
+    try:
+        orders = request.json
+        if not isinstance(orders, list) or not orders:
+            return jsonify({'error': 'Request body must be a non-empty list of orders'}), 400
+        if len(orders) > MAX_BULK_ORDERS:
+            return jsonify({'error': f'At most {MAX_BULK_ORDERS} orders can be created per request'}), 400
+        
+        # Validate every order in one pass; invalid orders are reported and skipped
+        results = [None] * len(orders)
+        parsed = []
+        for index, data in enumerate(orders):
+            try:
+                validate_required_fields(data, ['customer_id', 'order_items'])
+                validate_positive_integer(data['customer_id'], 'customer_id')
+                parsed.append((index, data['customer_id'], collect_quantities(data['order_items'])))
+            except (ValueError, TypeError) as e:
+                results[index] = {'index': index, 'status': 400, 'error': str(e)}
+        
+        # Fetch every referenced customer and product with one IN query each
+        customer_ids = {customer_id for _, customer_id, _ in parsed}
+        existing_customers = {row.id for row in db.session.query(Customer.id).filter(Customer.id.in_(customer_ids))}
+        product_ids = {product_id for _, _, quantities in parsed for product_id in quantities}
+        remaining = load_stock_levels(product_ids, for_update=True)
+        
+        # Allocate stock to orders in request order against the locked snapshot
+        accepted = []
+        totals = {}
+        for index, customer_id, quantities in parsed:
+            if customer_id not in existing_customers:
+                results[index] = {'index': index, 'status': 404, 'error': 'Customer not found'}
+                continue
+            try:
+                check_stock(quantities, remaining)
+            except ProductNotFoundError as e:
+                results[index] = {'index': index, 'status': 404, 'error': str(e)}
+                continue
+            except InsufficientStockError as e:
+                results[index] = {'index': index, 'status': 400, 'error': str(e)}
+                continue
+            for product_id, quantity in quantities.items():
+                remaining[product_id] -= quantity
+                totals[product_id] = totals.get(product_id, 0) + quantity
+            accepted.append((index, customer_id, quantities))
+        
+        if accepted:
+            # Take stock for the whole batch in one conditional UPDATE
+            if not take_stock(totals):
+                db.session.rollback()
+                return jsonify({'error': 'Stock changed while placing the orders, please retry'}), 409
+            
+            # Insert orders and their items with bulk INSERTs
+            order_date = datetime.utcnow()
+            order_rows = [{'order_date': order_date, 'customer_id': customer_id} for _, customer_id, _ in accepted]
+            order_ids = insert_orders(order_rows)
+            db.session.bulk_insert_mappings(OrderItem, [
+                {'order_id': order_id, 'product_id': product_id, 'quantity': quantity}
+                for order_id, (_, _, quantities) in zip(order_ids, accepted)
+                for product_id, quantity in quantities.items()
+            ])
+            snapshot_unit_prices(order_ids)
+            record_order_sales(order_ids)
+            db.session.commit()
+            for order_id, (index, _, _) in zip(order_ids, accepted):
+                results[index] = {'index': index, 'status': 201, 'order_id': order_id}
+        else:
+            db.session.rollback()
+        
+        return jsonify({'created': len(accepted), 'failed': len(orders) - len(accepted), 'results': results})
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Data integrity issue occurred'}), 409
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @order_routes.route('/order/<int:id>', methods=['GET'])
+@query_budget(2)
 def read_order(id):
     try:
+        expand = request.args.get('expand')
+        if expand is not None and expand not in EXPAND_OPTIONS:
+            return jsonify({'error': f"expand must be one of: {', '.join(EXPAND_OPTIONS)}"}), 400
+        
+        # A sparse fieldset picks order columns, and whether the items (and with
+        # expand the total) are loaded at all
+        names = parse_fields(request.args.get('fields'),
+                             ORDER.names + (('order_items', 'order_total') if expand else ('order_items',)))
+        projection = ORDER.project(names)
+        with_items = names is None or 'order_items' in names
+        with_total = expand is not None and (names is None or 'order_total' in names)
+        
         # Retrieve order details by ID
-        order = Order.query.get(id)
+        order = db.session.query(*projection.columns(Order.version, Order.updated_at)).filter(Order.id == id).first()
         if not order:
             return jsonify({'error': 'Order not found'}), 404
+        payload = projection.dump(order)
+        
+        if expand == 'items.product' and (with_items or with_total):
+            # Embed product details and database-computed totals with one more query
+            expanded, product_versions = load_expanded_items([id])
+            order_items, order_total = expanded[id]
+            if with_items:
+                payload['order_items'] = order_items
+            if with_total:
+                payload['order_total'] = order_total
+            etag = make_etag(Order.__tablename__, id, order.version, expand, product_versions, names)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+            return add_validators(json_response(payload), etag)
+        
+        # Answer 304 before loading the items when the client's copy is current
+        etag = row_etag(Order, id, order.version, names)
+        if is_not_modified(etag, order.updated_at):
+            return not_modified_response(etag, order.updated_at)
         
         # Get order items
-        order_items = [
-            {
-                'product_id': item.product_id,
-                'quantity': item.quantity
-            } for item in order.order_items
-        ]
-        
-        return jsonify({
-            'order_id': order.id,
-            'order_date': order.order_date,
-            'customer_id': order.customer_id,
-            'order_items': order_items
-        })
+        if with_items:
+            payload['order_items'] = ORDER_ITEM.dump_all(
+                db.session.query(*ORDER_ITEM.columns()).filter(OrderItem.order_id == id).order_by(OrderItem.id))
+        return add_validators(json_response(payload), etag, order.updated_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError:
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@order_routes.route('/customer/<int:id>/orders', methods=['GET'])
+@query_budget(3)
+def list_customer_orders(id):
+    try:
+        args = request.args
+        limit = parse_limit(args.get('limit'))
+        expand = args.get('expand')
+        if expand is not None and expand not in EXPAND_OPTIONS:
+            return jsonify({'error': f"expand must be one of: {', '.join(EXPAND_OPTIONS)}"}), 400
+        
+        # Verify that customer exists (served from the cache when warm)
+        if read_through('customers', id, lambda: load_customer(id)) is None:
+            return jsonify({'error': 'Customer not found'}), 404
+        
+        # Newest orders first; the seek runs on ix_orders_customer_id_order_date_id
+        orders, next_cursor = fetch_page(db.session.query(*ORDER.columns()).filter(Order.customer_id == id), 'order_date',
+                                         (Order.order_date, Order.id), limit, args.get('cursor'), descending=True)
+        
+        order_list = ORDER.dump_all(orders)
+        if expand == 'items.product' and orders:
+            # Embed every order's items with one batched query for the whole page
+            expanded, _ = load_expanded_items([order.id for order in orders])
+            for entry in order_list:
+                entry['order_items'], entry['order_total'] = expanded[entry['order_id']]
+        
+        return json_response({'orders': order_list, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Function to lock an order against concurrent edits by touching it. The UPDATE
+# takes the row lock (SQLite: the write lock) before the order's items are read,
+# so two edits of the same order run one after the other and each sees the
+# other's lines. Also bumps the order's version for ETags. Returns False when
+# the order does not exist.
+def lock_order(order_id):
+    touched = (Order.query.filter_by(id=order_id)
+               .update({Order.updated_at: datetime.utcnow()}, synchronize_session=False))
+    return touched == 1
+
+# Function to load an order's lines as {product_id: quantity} and the price
+# snapshot of each product's first line
+def load_order_lines(order_id):
+    quantities, prices = {}, {}
+    rows = db.session.query(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price).filter_by(order_id=order_id)
+    for product_id, quantity, unit_price in rows:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+        prices.setdefault(product_id, unit_price)
+    return quantities, prices
+
 @order_routes.route('/order/<int:id>', methods=['PUT'])
+@query_budget(12)
 def update_order(id):
     try:
-        # Retrieve the order to be updated
-        order = Order.query.get(id)
-        if not order:
+        data = request.json
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        new_quantities = collect_quantities(data['order_items']) if 'order_items' in data else None
+        
+        # Lock the order before reading its lines
+        if not lock_order(id):
+            db.session.rollback()
             return jsonify({'error': 'Order not found'}), 404
         
-        # Update order fields based on user input
-        data = request.json
-        if 'order_items' in data:
-            # Remove existing order items
-            OrderItem.query.filter_by(order_id=order.id).delete()
+        if new_quantities is not None:
+            old_quantities, old_prices = load_order_lines(id)
+            deltas = diff_quantities(old_quantities, new_quantities)
+            
+            # Check that added products exist and that stock covers the extra quantities
+            growing = {product_id: delta for product_id, delta in deltas.items() if delta > 0}
+            if growing:
+                check_stock(growing, load_stock_levels(growing))
+            
+            # Take the old lines out of the sales reports while they still exist
+            record_order_sales([id], -1)
+            
+            # Apply only the net change per product in one conditional UPDATE: lines that
+            # shrank or were removed return stock, lines that grew take more
+            if not apply_stock_deltas(deltas):
+                db.session.rollback()
+                return jsonify({'error': 'Stock changed while updating the order, please retry'}), 409
             
-            # Add new order items
-            for item in data['order_items']:
-                validate_required_fields(item, ['product_id', 'quantity'])
-                product = Product.query.get(item['product_id'])
-                if not product:
-                    db.session.rollback()
-                    return jsonify({'error': f'Product with ID {item["product_id"]} not found'}), 404
-                if product.stock_level < item['quantity']:
-                    db.session.rollback()
-                    return jsonify({'error': f'Insufficient stock for product ID {item["product_id"]}'}), 400
-                
-                # Update product stock level
-                product.stock_level -= item['quantity']
-                order_item = OrderItem(order_id=order.id, product_id=item['product_id'], quantity=item['quantity'])
-                db.session.add(order_item)
+            # Rewrite only the lines that changed; a changed line keeps its price snapshot.
+            # Priced lines go first so the bulk INSERT needs at most two executemany calls.
+            changed = list(deltas)
+            if changed:
+                (OrderItem.query.filter(OrderItem.order_id == id, OrderItem.product_id.in_(changed))
+                 .delete(synchronize_session=False))
+                rewritten = sorted((product_id for product_id in changed if product_id in new_quantities),
+                                   key=lambda product_id: old_prices.get(product_id) is None)
+                db.session.bulk_insert_mappings(OrderItem, [
+                    {'order_id': id, 'product_id': product_id, 'quantity': new_quantities[product_id],
+                     'unit_price': old_prices.get(product_id)}
+                    for product_id in rewritten
+                ])
+            
+            # Record prices for new lines and count the order again in the sales reports
+            snapshot_unit_prices([id])
+            record_order_sales([id])
         
         db.session.commit()
         return jsonify({'message': 'Order updated successfully'})
+    except ProductNotFoundError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 400
     except IntegrityError:
         db.session.rollback()
@@ -120,22 +378,28 @@ def update_order(id):
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @order_routes.route('/order/<int:id>', methods=['DELETE'])
+@query_budget(7)
 def delete_order(id):
     try:
-        # Retrieve the order to be deleted
-        order = Order.query.get(id)
-        if not order:
+        # Lock the order so a concurrent delete or edit cannot restock it twice
+        if not lock_order(id):
+            db.session.rollback()
             return jsonify({'error': 'Order not found'}), 404
         
-        # Restock the products from the deleted order
-        for item in order.order_items:
-            product = Product.query.get(item.product_id)
-            product.stock_level += item.quantity
+        # Restock the products from the deleted order with one UPDATE
+        quantities, _ = load_order_lines(id)
+        release_stock(quantities)
+        
+        # Take the order out of the sales reports while its items still exist
+        record_order_sales([id], -1)
         
-        db.session.delete(order)
+        # Delete the order's items before the order itself
+        OrderItem.query.filter_by(order_id=id).delete(synchronize_session=False)
+        Order.query.filter_by(id=id).delete(synchronize_session=False)
         db.session.commit()
         return jsonify({'message': 'Order deleted successfully'})
     except SQLAlchemyError:
@@ -1,10 +1,75 @@
 # routes/product_routes.py
-from flask import Blueprint, request, jsonify
-from app.models import Product, db
-from app.validation import validate_required_fields
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.models import Product, StockShard, DailyProductSales, db
+from app.validation import validate_required_fields, validate_product, parse_optional_number
+from app.bulk import validate_records, upsert_rows
+from app.query_debug import query_budget
+from app.conditional import fetch_conditional, fetch_projection, cached_row, make_etag, row_etag, is_not_modified, add_validators, not_modified_response
+from app.pagination import parse_limit, fetch_page
+from app.search import search_products, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, MAX_QUERY_LENGTH
+from app.inventory import sharding_enabled, stock_expression, stock_column, reset_shards
+from app.serializers import PRODUCT, json_response, parse_fields
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+import csv
+import io
+import json
+import logging
 
 product_routes = Blueprint('product_routes', __name__)
+logger = logging.getLogger(__name__)
+
+# Sort keys accepted by list_products; each is backed by a (column, id) index
+PRODUCT_SORT_COLUMNS = {
+    'id': (Product.id,),
+    'name': (Product.name, Product.id),
+    'price': (Product.price, Product.id),
+    'stock_level': (Product.stock_level, Product.id),
+}
+
+# Columns a /products/bulk record may set
+PRODUCT_BULK_COLUMNS = ('name', 'price', 'stock_level')
+
+# Columns written by export_products and the number of rows fetched per round trip
+EXPORT_COLUMNS = ('id', 'name', 'price', 'stock_level')
+EXPORT_BATCH_SIZE = 1000
+
+# Function to encode one exported row as an NDJSON line
+def ndjson_line(row):
+    return json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+# Function to make a CSV line encoder; one writer and buffer serve the whole export
+def csv_encoder():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode(row):
+        writer.writerow(row)
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+    return encode
+
+# Function to stream encoded rows: the header and first row are sent at once so the
+# client gets its first byte without waiting for a batch, the rest in batches. The
+# response status is already sent when a row fails, so the stream ends with
+# `error_line` instead of being cut short silently.
+def stream_export(rows, encode, error_line, header=None):
+    batch = [] if header is None else [header]
+    count = 0
+    try:
+        for count, row in enumerate(rows, 1):
+            batch.append(encode(row))
+            if count == 1 or len(batch) >= EXPORT_BATCH_SIZE:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+    except Exception:
+        logger.exception('Product export failed after %d rows', count)
+        db.session.rollback()
+        yield error_line
 
 @product_routes.route('/product', methods=['POST'])
 def create_product():
@@ -30,15 +95,78 @@ def create_product():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@product_routes.route('/products/bulk', methods=['POST'])
+def upsert_products_bulk():
+    try:
+        # Validate every record; invalid rows are reported and skipped
+        valid, results = validate_records(request.json, 'name', validate_product)
+        rows = [{column: record[column] for column in PRODUCT_BULK_COLUMNS if column in record} for _, record in valid]
+        
+        # Records that set stock_level replace any sharded stock of those products
+        stocked = [row['name'] for row in rows if 'stock_level' in row]
+        if stocked:
+            reset_shards(select(Product.id).where(Product.name.in_(stocked)))
+        
+        # Insert new products and update existing ones matched by name
+        existing = upsert_rows(Product, rows, 'name')
+        db.session.commit()
+        for index, record in valid:
+            status = 200 if record['name'] in existing else 201
+            results.append({'index': index, 'status': status, 'name': record['name']})
+        results.sort(key=lambda result: result['index'])
+        
+        updated = len(existing)
+        return jsonify({'created': len(valid) - updated, 'updated': updated, 'failed': len(results) - len(valid), 'results': results})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Data integrity issue occurred'}), 409
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Function to load a product as the cached row served by read_product. With
+# sharded stock the stock level is summed over the shards in the same query and
+# is part of the row's version, as stock changes no longer touch the product row.
+def load_product(id):
+    stock = stock_column()
+    row = (db.session.query(*PRODUCT.columns(Product.version, Product.updated_at, stock_level=stock))
+           .filter(Product.id == id).first())
+    if not row:
+        return None
+    if stock is not Product.stock_level:
+        return cached_row(row, PRODUCT.dump(row), [row.stock_level])
+    return cached_row(row, PRODUCT.dump(row))
+
 @product_routes.route('/product/<int:id>', methods=['GET'])
+@query_budget(2)
 def read_product(id):
     try:
-        # Retrieve product details by ID
-        product = Product.query.get(id)
+        projection = PRODUCT.project(parse_fields(request.args.get('fields'), PRODUCT.names))
+        extra = [stock_expression()] if sharding_enabled() else []
+        if projection is not PRODUCT:
+            # A sparse fieldset selects only its columns, or narrows the cached row
+            product = fetch_projection(Product, id, projection, extra, stock_level=stock_column())
+            if not product:
+                return jsonify({'error': 'Product not found'}), 404
+            etag = row_etag(Product, id, product.version, projection.names)
+            if is_not_modified(etag, product.updated_at):
+                return not_modified_response(etag, product.updated_at)
+            return add_validators(json_response(product.data), etag, product.updated_at)
+
+        # Retrieve product details by ID, answering 304 when the client's copy is current
+        product, not_modified = fetch_conditional(Product, id, lambda: load_product(id), extra)
+        if not_modified:
+            return not_modified
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
-        return jsonify({'id': product.id, 'name': product.name, 'price': product.price, 'stock_level': product.stock_level})
+        return add_validators(json_response(product.data), row_etag(Product, id, product.version), product.updated_at)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except SQLAlchemyError:
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
@@ -63,6 +191,8 @@ def update_product(id):
         if 'stock_level' in data:
             if data['stock_level'] < 0:
                 return jsonify({'error': 'Stock level must be non-negative'}), 400
+            # The new level replaces any sharded stock (emptied before the product row is written)
+            reset_shards([id])
             product.stock_level = data['stock_level']
         
         db.session.commit()
@@ -84,6 +214,9 @@ def delete_product(id):
         if not product:
             return jsonify({'error': 'Product not found'}), 404
         
+        # Shard counters and daily sales summary rows reference the product, so they go first
+        StockShard.query.filter_by(product_id=id).delete(synchronize_session=False)
+        DailyProductSales.query.filter_by(product_id=id).delete(synchronize_session=False)
         db.session.delete(product)
         db.session.commit()
         return jsonify({'message': 'Product deleted successfully'})
@@ -94,12 +227,118 @@ def delete_product(id):
         return jsonify({'error': str(e)}), 500
 
 @product_routes.route('/products', methods=['GET'])
+@query_budget(1)
 def list_products():
     try:
-        # Retrieve all products
-        products = Product.query.all()
-        product_list = [{'id': p.id, 'name': p.name, 'price': p.price, 'stock_level': p.stock_level} for p in products]
-        return jsonify(product_list)
+        args = request.args
+        limit = parse_limit(args.get('limit'))
+        sort = args.get('sort', 'id')
+        descending = sort.startswith('-')
+        columns = PRODUCT_SORT_COLUMNS.get(sort.lstrip('-'))
+        if columns is None:
+            raise ValueError(f"Invalid sort key. Use one of: {', '.join(PRODUCT_SORT_COLUMNS)}")
+
+        projection = PRODUCT.project(parse_fields(args.get('fields'), PRODUCT.names))
+
+        # With sharded stock, stock filters, sorting and output use the summed stock
+        stock = stock_column()
+        sharded = stock is not Product.stock_level
+        if columns[0] is Product.stock_level:
+            columns = (stock, Product.id)
+
+        # Rows are plain tuples of the requested fields followed by the validators and
+        # any sort columns the fields leave out (the cursor is built from them)
+        selected = projection.columns(stock_level=stock)
+        missing = [column for column in columns if not any(column is field for field in selected)]
+        query = db.session.query(*selected, Product.version, Product.updated_at, *missing)
+        
+        # Apply the optional price and stock range filters
+        min_price = parse_optional_number(args, 'min_price')
+        max_price = parse_optional_number(args, 'max_price')
+        min_stock = parse_optional_number(args, 'min_stock', int)
+        max_stock = parse_optional_number(args, 'max_stock', int)
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+        if min_stock is not None:
+            query = query.filter(stock >= min_stock)
+        if max_stock is not None:
+            query = query.filter(stock <= max_stock)
+
+        # Retrieve one page of products after the cursor
+        products, next_cursor = fetch_page(query, sort, columns, limit, args.get('cursor'), descending)
+        
+        # The page ETag covers the query, each row's version and the next cursor (a
+        # full last page gains one when a product is added); skip serializing on a match.
+        # Sharded stock changes without touching the rows, so it joins the ETag instead.
+        if sharded:
+            etag = make_etag(request.query_string, next_cursor,
+                             [(p.id, p.version, getattr(p, 'stock_level', None)) for p in products])
+            last_modified = None
+        else:
+            etag = make_etag(request.query_string, next_cursor, [(p.id, p.version) for p in products])
+            last_modified = max((p.updated_at for p in products), default=None)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        return add_validators(json_response({'products': projection.dump_all(products), 'next_cursor': next_cursor}),
+                              etag, last_modified)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@product_routes.route('/products/search', methods=['GET'])
+@query_budget(4)
+def search_products_by_name():
+    try:
+        args = request.args
+        query = args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        if len(query) > MAX_QUERY_LENGTH:
+            return jsonify({'error': f'q must be at most {MAX_QUERY_LENGTH} characters'}), 400
+        limit = parse_limit(args.get('limit'), default=DEFAULT_SEARCH_LIMIT, maximum=MAX_SEARCH_LIMIT)
+        fuzzy = args.get('fuzzy', '1') != '0'
+
+        # Look the name up in the search index; typos are matched when fuzzy is on
+        return jsonify({'products': search_products(query, limit, fuzzy)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@product_routes.route('/products/export', methods=['GET'])
+def export_products():
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+        # Stream column tuples over a server-side cursor instead of loading ORM objects;
+        # with sharded stock the stock level is summed over the shards
+        columns = [stock_column() if column == 'stock_level' else getattr(Product, column)
+                   for column in EXPORT_COLUMNS]
+        rows = (Product.query
+                .with_entities(*columns)
+                .order_by(Product.id)
+                .execution_options(stream_results=True)
+                .yield_per(EXPORT_BATCH_SIZE))
+
+        if export_format == 'csv':
+            encode = csv_encoder()
+            stream = stream_export(rows, encode, encode(('error', 'Export failed')), header=encode(EXPORT_COLUMNS))
+            response = Response(stream_with_context(stream), mimetype='text/csv')
+            response.headers['Content-Disposition'] = 'attachment; filename=products.csv'
+        else:
+            stream = stream_export(rows, ndjson_line, json.dumps({'error': 'Export failed'}) + '\n')
+            response = Response(stream_with_context(stream), mimetype='application/x-ndjson')
+        return response
     except SQLAlchemyError:
         return jsonify({'error': 'Internal server error'}), 500
     except Exception as e:
@@ -0,0 +1,91 @@
+# routes/report_routes.py
+from flask import Blueprint, request, jsonify
+from app.models import DailyProductSales, CustomerSales
+from app.pagination import parse_limit, fetch_page
+from app.query_debug import query_budget
+from app.validation import parse_optional_number
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+
+report_routes = Blueprint('report_routes', __name__)
+
+# Default and maximum number of days covered by one product sales report
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 366
+
+# Function to parse an optional YYYY-MM-DD query parameter
+def parse_day(args, name, default):
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+
+@report_routes.route('/reports/product-sales', methods=['GET'])
+@query_budget(1)
+def product_sales_report():
+    try:
+        args = request.args
+        end = parse_day(args, 'end', datetime.utcnow().date())
+        start = parse_day(args, 'start', end - timedelta(days=DEFAULT_REPORT_DAYS - 1))
+        if start > end:
+            raise ValueError('start must not be after end')
+        if (end - start).days >= MAX_REPORT_DAYS:
+            raise ValueError(f'A report can cover at most {MAX_REPORT_DAYS} days')
+
+        # Read only the daily summary rows; no order tables are touched
+        query = DailyProductSales.query.filter(DailyProductSales.day >= start, DailyProductSales.day <= end,
+                                               DailyProductSales.order_count > 0)
+        product_id = parse_optional_number(args, 'product_id', int)
+        if product_id is not None:
+            query = query.filter(DailyProductSales.product_id == product_id)
+        rows = query.order_by(DailyProductSales.day, DailyProductSales.product_id).all()
+
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'rows': [{
+                'day': row.day.isoformat(),
+                'product_id': row.product_id,
+                'quantity': row.quantity,
+                'revenue': round(row.revenue, 2),
+                'order_count': row.order_count
+            } for row in rows],
+            'total_revenue': round(sum(row.revenue for row in rows), 2)
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@report_routes.route('/reports/customer-value', methods=['GET'])
+@query_budget(1)
+def customer_value_report():
+    try:
+        args = request.args
+        limit = parse_limit(args.get('limit'))
+
+        # Customers by lifetime revenue, highest first, keyset-paginated on the summary index
+        query = CustomerSales.query.filter(CustomerSales.order_count > 0)
+        rows, next_cursor = fetch_page(query, 'revenue', (CustomerSales.revenue, CustomerSales.customer_id),
+                                       limit, args.get('cursor'), descending=True)
+
+        return jsonify({
+            'customers': [{
+                'customer_id': row.customer_id,
+                'order_count': row.order_count,
+                'item_count': row.item_count,
+                'revenue': round(row.revenue, 2)
+            } for row in rows],
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError:
+        return jsonify({'error': 'Internal server error'}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,389 @@
+# search.py
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import lru_cache
+from heapq import nsmallest
+from itertools import islice
+from flask import current_app
+from sqlalchemy import bindparam, event, text
+from app.models import Product, db
+from app.cache import add_invalidation_listener
+from app.inventory import sharding_enabled, stock_column
+from app.query_debug import extend_query_budget
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+# Shortest word the trigram indexes can look up; shorter queries use a name prefix scan
+MIN_TRIGRAM_WORD = 3
+# Smallest share of trigrams (Jaccard) a fuzzy match must have in common with the query
+FUZZY_MIN_SIMILARITY = 0.3
+# How many ranked candidates per result slot a fuzzy lookup considers
+FUZZY_CANDIDATES = 4
+# Most candidates a substring lookup in the in-process index checks and ranks
+SUBSTRING_MAX_CANDIDATES = 2000
+# Fuzzy lookups use the query's rarest trigrams, up to about this many postings,
+# so a typo next to a very common trigram does not rank half the catalog
+FUZZY_MAX_POSTINGS = 5000
+
+# SQLite: external-content FTS5 table with the trigram tokenizer (substring and
+# typo-tolerant matching), kept in sync with products by triggers so every write
+# path, including bulk upserts, updates the index in the same transaction.
+# Note that an SQLite batch migration of `products` recreates the table and drops
+# these triggers; such a migration must call create_search_index() afterwards.
+FTS5_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, content='products', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    # Per-trigram document counts, used to pick selective trigrams for fuzzy lookups
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab USING fts5vocab(products_fts, 'row')",
+]
+FTS5_DROP = ['DROP TABLE IF EXISTS products_fts_vocab', 'DROP TABLE IF EXISTS products_fts']
+# SQLite: case-insensitive name index so typeahead prefixes are an index range scan
+SQLITE_PREFIX_INDEX = 'ix_products_name_nocase'
+SQLITE_PREFIX_DDL = f'CREATE INDEX IF NOT EXISTS {SQLITE_PREFIX_INDEX} ON products (name COLLATE NOCASE)'
+
+# MySQL: InnoDB FULLTEXT index, maintained by the server
+MYSQL_FULLTEXT_INDEX = 'ix_products_name_fulltext'
+MYSQL_FULLTEXT_DDL = f'CREATE FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ON products (name)'
+
+# Search statements select `{stock}`: the product row's stock_level, or with
+# sharded stock that level plus the sum of the product's shard counters
+SQLITE_PREFIX_SEARCH = (
+    'SELECT id, name, price, {stock} FROM products '
+    'WHERE name >= :low COLLATE NOCASE AND name < :high COLLATE NOCASE '
+    'ORDER BY name COLLATE NOCASE LIMIT :limit')
+FTS5_SUBSTRING_SEARCH = (
+    'SELECT p.id, p.name, p.price, {stock} FROM products_fts '
+    'JOIN products p ON p.id = products_fts.rowid '
+    'WHERE products_fts MATCH :match LIMIT :limit')
+FTS5_RANKED_SEARCH = (
+    'SELECT p.id, p.name, p.price, {stock} FROM products_fts '
+    'JOIN products p ON p.id = products_fts.rowid '
+    'WHERE products_fts MATCH :match ORDER BY products_fts.rank LIMIT :limit')
+FTS5_TERM_COUNTS = text(
+    'SELECT term, doc FROM products_fts_vocab WHERE term IN :terms').bindparams(bindparam('terms', expanding=True))
+MYSQL_SEARCH = (
+    'SELECT id, name, price, {stock} FROM products '
+    'WHERE MATCH(name) AGAINST (:match IN BOOLEAN MODE) LIMIT :limit')
+SHARDED_STOCK = ('{table}.stock_level + (SELECT COALESCE(SUM(s.quantity), 0) FROM stock_shards s '
+                 'WHERE s.product_id = {table}.id) AS stock_level')
+
+# Function to build a search statement for the current app's stock layout
+@lru_cache(maxsize=None)
+def _statement(template, sharded):
+    table = 'p' if 'products_fts' in template else 'products'
+    stock = SHARDED_STOCK.format(table=table) if sharded else f'{table}.stock_level'
+    return text(template.format(stock=stock))
+
+def search_statement(template):
+    return _statement(template, sharding_enabled())
+
+# Function to check whether an SQLite connection supports FTS5 with the trigram tokenizer
+def fts5_supported(connection):
+    if connection.dialect.name != 'sqlite' or sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    return bool(connection.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+# Function to create the database search index for the connection's dialect.
+# Runs after `products` is created by db.create_all() and from the migration.
+def create_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(SQLITE_PREFIX_DDL)
+    if fts5_supported(connection):
+        for statement in FTS5_DDL:
+            connection.exec_driver_sql(statement)
+    elif connection.dialect.name == 'mysql':
+        connection.exec_driver_sql(MYSQL_FULLTEXT_DDL)
+
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in FTS5_DROP:
+            connection.exec_driver_sql(statement)
+
+event.listen(Product.__table__, 'after_create', _create_search_index)
+event.listen(Product.__table__, 'before_drop', _drop_search_index)
+
+# Alembic include_object hook: the search index is managed here, not by autogenerate
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith('products_fts'):
+        return False
+    return not (type_ == 'index' and name in (MYSQL_FULLTEXT_INDEX, SQLITE_PREFIX_INDEX))
+
+# Function to split a query into lowercase words
+def query_words(query):
+    return re.findall(r'\w+', query.lower())
+
+# Function to list the distinct trigrams of a word
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+# Function to quote a string as an FTS5 phrase
+def _phrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+# Function to score how alike two names are by their shared trigrams (Jaccard)
+def similarity(query_grams, name):
+    name_grams = set().union(*(trigrams(word) for word in query_words(name)))
+    shared = len(query_grams & name_grams)
+    return shared / (len(query_grams) + len(name_grams) - shared) if shared else 0.0
+
+# In-process trigram and prefix index over product names, used when the database
+# has no full-text index. Each worker keeps its own copy: committed changes made
+# by this process are applied on the next search, and the whole index is reloaded
+# every SEARCH_INDEX_TTL seconds to pick up writes from other processes.
+class TrigramIndex:
+    def __init__(self):
+        self.names = {}
+        self.postings = {}
+        self.sorted_names = []
+        self.dirty = set()
+        self.stale = True
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def _add(self, product_id, name, keep_sorted=True):
+        lowered = name.lower()
+        self.names[product_id] = lowered
+        if keep_sorted:
+            insort(self.sorted_names, (lowered, product_id))
+        for gram in set().union(*(trigrams(word) for word in query_words(lowered))):
+            self.postings.setdefault(gram, set()).add(product_id)
+
+    def _remove(self, product_id):
+        lowered = self.names.pop(product_id, None)
+        if lowered is None:
+            return
+        position = bisect_left(self.sorted_names, (lowered, product_id))
+        del self.sorted_names[position]
+        for gram in set().union(*(trigrams(word) for word in query_words(lowered))):
+            ids = self.postings.get(gram)
+            ids.discard(product_id)
+            if not ids:
+                del self.postings[gram]
+
+    # Record committed changes; they are loaded lazily by the next search
+    def mark_dirty(self, product_ids):
+        with self.lock:
+            self.dirty.update(product_ids)
+
+    def mark_stale(self):
+        with self.lock:
+            self.stale = True
+
+    # Function to bring the index up to date with at most one query
+    def refresh(self, ttl):
+        if self.stale or time.monotonic() - self.loaded_at > ttl:
+            rows = db.session.query(Product.id, Product.name).all()
+            self.names, self.postings, self.sorted_names = {}, {}, []
+            for product_id, name in rows:
+                self._add(product_id, name, keep_sorted=False)
+            self.sorted_names = sorted((name, product_id) for product_id, name in self.names.items())
+            self.dirty.clear()
+            self.stale = False
+            self.loaded_at = time.monotonic()
+        elif self.dirty:
+            ids = list(self.dirty)
+            current = dict(db.session.query(Product.id, Product.name).filter(Product.id.in_(ids)))
+            for product_id in ids:
+                if self.names.get(product_id) != (current[product_id].lower() if product_id in current else None):
+                    self._remove(product_id)
+                    if product_id in current:
+                        self._add(product_id, current[product_id])
+            self.dirty.clear()
+
+    # Function to find product ids by name: names starting with the query first
+    # (from the sorted names), then names containing every query word (from the
+    # trigram postings), then, with fuzzy, names sharing enough trigrams
+    def search(self, prefix, words, limit, fuzzy=True):
+        start = bisect_left(self.sorted_names, (prefix,))
+        matches = []
+        for name, product_id in self.sorted_names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            matches.append(product_id)
+        long_words = [word for word in words if len(word) >= MIN_TRIGRAM_WORD]
+        if len(matches) < limit and long_words:
+            found = set(matches)
+            candidates = None
+            for gram in sorted(set().union(*(trigrams(word) for word in long_words)),
+                               key=lambda g: len(self.postings.get(g, ()))):
+                ids = self.postings.get(gram, set())
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    break
+            exact = (i for i in islice(candidates or (), SUBSTRING_MAX_CANDIDATES)
+                     if i not in found and all(word in self.names[i] for word in words))
+            matches += nsmallest(limit - len(matches), exact, key=lambda i: (len(self.names[i]), i))
+        if fuzzy and len(matches) < limit and long_words:
+            matches += self._fuzzy(long_words, limit - len(matches), set(matches))
+        return matches
+
+    def _fuzzy(self, words, limit, exclude):
+        query_grams = set().union(*(trigrams(word) for word in words))
+        counts = Counter()
+        for gram in selective_grams({gram: len(self.postings.get(gram, ())) for gram in query_grams}):
+            counts.update(islice(self.postings[gram], FUZZY_MAX_POSTINGS))
+        scored = []
+        for product_id, _ in counts.most_common(limit * FUZZY_CANDIDATES + len(exclude)):
+            if product_id in exclude:
+                continue
+            score = similarity(query_grams, self.names[product_id])
+            if score >= FUZZY_MIN_SIMILARITY:
+                scored.append((-score, product_id))
+        return [product_id for _, product_id in sorted(scored)[:limit]]
+
+# Function to choose the search backend: "fts5", "fulltext" or "memory".
+# With SEARCH_BACKEND=auto the database index is used when it exists. The check
+# runs once per worker, on its first search, so it extends that request's budget.
+def search_backend():
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+        if backend == 'auto':
+            dialect = db.engine.dialect.name
+            backend = 'memory'
+            if dialect in ('sqlite', 'mysql'):
+                extend_query_budget(1)
+            if dialect == 'sqlite' and db.session.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first():
+                backend = 'fts5'
+            elif dialect == 'mysql' and db.session.execute(
+                    text('SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() '
+                         'AND table_name = :table AND index_name = :index'),
+                    {'table': 'products', 'index': MYSQL_FULLTEXT_INDEX}).first():
+                backend = 'fulltext'
+        current_app.extensions['search_backend'] = backend
+    return backend
+
+# Function to get the current app's in-process index
+def get_trigram_index():
+    index = current_app.extensions.get('search_index')
+    if index is None:
+        index = current_app.extensions['search_index'] = TrigramIndex()
+    return index
+
+# Keep in-process indexes in step with committed product writes
+def _note_product_changes(pending):
+    index = current_app.extensions.get('search_index')
+    if index is None:
+        return
+    keys = [key for namespace, key in pending if namespace == Product.__tablename__]
+    if None in keys:
+        index.mark_stale()
+    elif keys:
+        index.mark_dirty(keys)
+
+add_invalidation_listener(_note_product_changes)
+
+def _product_dict(row):
+    return {'id': row.id, 'name': row.name, 'price': row.price, 'stock_level': row.stock_level}
+
+# Function to pick the query's rarest trigrams, taking postings up to FUZZY_MAX_POSTINGS
+def selective_grams(counts):
+    chosen, total = [], 0
+    for gram, docs in sorted(counts.items(), key=lambda item: (item[1], item[0])):
+        if not docs:
+            continue
+        if chosen and total + docs > FUZZY_MAX_POSTINGS:
+            break
+        chosen.append(gram)
+        total += docs
+    return chosen
+
+# Function to keep the fuzzy candidates similar enough to the query, best first
+def _best_fuzzy(candidates, query_grams, found, limit):
+    scored = sorted((-similarity(query_grams, row.name), row.id, row) for row in candidates if row.id not in found)
+    return [row for score, _, row in scored if -score >= FUZZY_MIN_SIMILARITY][:limit]
+
+# Function to load products whose names start with the query, in name order.
+# On SQLite this is a range scan of ix_products_name_nocase; MySQL's default
+# case-insensitive collation lets LIKE 'prefix%' use the unique name index.
+def _prefix_rows(prefix, limit):
+    if db.engine.dialect.name == 'sqlite':
+        high = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return db.session.execute(search_statement(SQLITE_PREFIX_SEARCH),
+                                  {'low': prefix, 'high': high, 'limit': limit}).all()
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return (db.session.query(Product.id, Product.name, Product.price, stock_column())
+            .filter(Product.name.like(escaped + '%', escape='\\'))
+            .order_by(Product.name).limit(limit).all())
+
+def _search_fts5(prefix, words, limit, fuzzy):
+    rows = _prefix_rows(prefix, limit)
+    long_words = [word for word in words if len(word) >= MIN_TRIGRAM_WORD]
+    if len(rows) < limit and long_words:
+        # Trigram phrases match substrings of at least three characters; short words are checked here
+        found = {row.id for row in rows}
+        candidates = db.session.execute(search_statement(FTS5_SUBSTRING_SEARCH), {
+            'match': ' '.join(_phrase(word) for word in long_words), 'limit': limit + len(found)}).all()
+        rows += [row for row in candidates
+                 if row.id not in found and all(word in row.name.lower() for word in words)][:limit - len(rows)]
+    if fuzzy and len(rows) < limit and long_words:
+        query_grams = set().union(*(trigrams(word) for word in long_words))
+        counts = dict(db.session.execute(FTS5_TERM_COUNTS, {'terms': sorted(query_grams)}).all())
+        grams = selective_grams(counts)
+        if grams:
+            found = {row.id for row in rows}
+            # Ranking sorts every match, so when even the rarest trigram is too common
+            # take candidates in index order instead
+            statement = FTS5_RANKED_SEARCH
+            if sum(counts[gram] for gram in grams) > FUZZY_MAX_POSTINGS:
+                statement = FTS5_SUBSTRING_SEARCH
+            candidates = db.session.execute(search_statement(statement), {
+                'match': ' OR '.join(_phrase(gram) for gram in grams),
+                'limit': limit * FUZZY_CANDIDATES + len(found)}).all()
+            rows += _best_fuzzy(candidates, query_grams, found, limit - len(rows))
+    return rows
+
+def _search_fulltext(prefix, words, limit):
+    rows = _prefix_rows(prefix, limit)
+    # InnoDB skips words shorter than innodb_ft_min_token_size (3 by default)
+    long_words = [word for word in words if len(word) >= MIN_TRIGRAM_WORD]
+    if len(rows) < limit and long_words:
+        found = {row.id for row in rows}
+        candidates = db.session.execute(search_statement(MYSQL_SEARCH), {
+            'match': ' '.join(f'+{word}*' for word in long_words), 'limit': limit + len(found)}).all()
+        rows += [row for row in candidates if row.id not in found][:limit - len(rows)]
+    return rows
+
+def _search_memory(prefix, words, limit, fuzzy):
+    index = get_trigram_index()
+    with index.lock:
+        index.refresh(current_app.config.get('SEARCH_INDEX_TTL', 300))
+        ids = index.search(prefix, words, limit, fuzzy)
+    if not ids:
+        return []
+    rows = {row.id: row for row in db.session.query(Product.id, Product.name, Product.price, stock_column())
+            .filter(Product.id.in_(ids))}
+    return [rows[product_id] for product_id in ids if product_id in rows]
+
+# Function to search products by name. Returns up to `limit` product dicts:
+# prefix matches first, then substring matches, then (with fuzzy) near misses.
+def search_products(query, limit=DEFAULT_SEARCH_LIMIT, fuzzy=True):
+    words = query_words(query)
+    if not words:
+        return []
+    prefix = ' '.join(query.lower().split())
+    backend = search_backend()
+    if backend == 'fts5':
+        rows = _search_fts5(prefix, words, limit, fuzzy)
+    elif backend == 'fulltext':
+        rows = _search_fulltext(prefix, words, limit)
+    else:
+        rows = _search_memory(prefix, words, limit, fuzzy)
+    return [_product_dict(row) for row in rows]
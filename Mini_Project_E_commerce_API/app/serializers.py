@@ -0,0 +1,123 @@
+# serializers.py
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from app.models import Customer, CustomerAccount, Order, OrderItem, Product
+
+# orjson is an optional dependency; without it responses are encoded by the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Function to convert the values the encoders do not handle themselves. Datetimes
+# are ISO 8601 strings (the database stores naive UTC), the same as orjson writes them.
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def _dumps_stdlib(payload):
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+def _dumps_orjson(payload):
+    return orjson.dumps(payload, default=_default)
+
+# Encoders selectable with JSON_ENCODER; "auto" uses orjson when it is installed
+ENCODERS = {'json': _dumps_stdlib}
+if orjson is not None:
+    ENCODERS['orjson'] = _dumps_orjson
+
+# Function to pick the encoder named by an app's JSON_ENCODER setting
+def select_encoder(config):
+    name = config.get('JSON_ENCODER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in ENCODERS:
+        raise ValueError(f'JSON_ENCODER {name!r} is not available; use one of: {", ".join(ENCODERS)}')
+    return ENCODERS[name]
+
+# Encoder used by jsonify for the responses that still go through it, so
+# datetimes are ISO 8601 there too instead of Flask's HTTP date format
+class JSONEncoder(FlaskJSONEncoder):
+    def default(self, value):
+        if isinstance(value, (datetime, date, Decimal)):
+            return _default(value)
+        return super().default(value)
+
+# Function to encode a payload with the app's encoder
+def dumps(payload):
+    return current_app.extensions['json_encoder'](payload)
+
+# Function to build a JSON response with the app's encoder; a drop-in for jsonify
+# on routes whose payloads are large
+def json_response(payload, status=200):
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+# Maps a model's output field names to the columns they are read from. Routes
+# select `columns` with Query.with_entities, so rows come back as plain tuples
+# instead of ORM objects, and turn them into dicts by position. Columns a route
+# needs besides the output fields (versions, timestamps) go after them and are
+# left out of the dicts.
+class ModelSerializer:
+    def __init__(self, **fields):
+        self.names = tuple(fields)
+        self.fields = fields
+        self._projections = {}
+
+    # Function to restrict the serializer to some of its fields (see parse_fields);
+    # names it does not map are ignored. None or every field returns the serializer
+    # itself; projections are built once and reused.
+    def project(self, names):
+        if names is None:
+            return self
+        names = tuple(name for name in self.names if name in names)
+        if names == self.names:
+            return self
+        projection = self._projections.get(names)
+        if projection is None:
+            projection = self._projections[names] = ModelSerializer(**{name: self.fields[name] for name in names})
+        return projection
+
+    # Function to list the columns to select, with some fields read from other
+    # expressions (such as sharded stock); extra columns follow the fields
+    def columns(self, *extra, **overrides):
+        return (*(overrides.get(name, column) for name, column in self.fields.items()), *extra)
+
+    def dump(self, row):
+        return dict(zip(self.names, row))
+
+    def dump_all(self, rows):
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    # Function to take this serializer's fields from a dict built by a wider one
+    def pick(self, data):
+        return {name: data[name] for name in self.names}
+
+# Function to parse a `fields` query parameter ("id,name,price") against the field
+# names a route serves. Returns the requested names in the route's order, or None
+# when the parameter is absent (every field).
+def parse_fields(value, allowed):
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(',')} - {''}
+    if not requested or not requested <= set(allowed):
+        raise ValueError(f"fields must be a comma-separated list of: {', '.join(allowed)}")
+    return tuple(name for name in allowed if name in requested)
+
+PRODUCT = ModelSerializer(id=Product.id, name=Product.name, price=Product.price, stock_level=Product.stock_level)
+CUSTOMER = ModelSerializer(id=Customer.id, name=Customer.name, email=Customer.email, phone_number=Customer.phone_number)
+ACCOUNT = ModelSerializer(account_id=CustomerAccount.id, username=CustomerAccount.username,
+                          customer_id=CustomerAccount.customer_id)
+ORDER = ModelSerializer(order_id=Order.id, order_date=Order.order_date, customer_id=Order.customer_id)
+ORDER_ITEM = ModelSerializer(product_id=OrderItem.product_id, quantity=OrderItem.quantity)
+
+# Function to set up an app's JSON encoding from its JSON_ENCODER setting
+def init_serializers(app):
+    app.extensions['json_encoder'] = select_encoder(app.config)
+    app.json_encoder = JSONEncoder
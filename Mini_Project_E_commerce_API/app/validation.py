@@ -25,4 +25,32 @@ def validate_positive_float(value, field_name):
 # Function to validate non-negative integer for fields like stock level
 def validate_non_negative_integer(value, field_name):
     if not isinstance(value, int) or value < 0:
-        raise ValueError(f"{field_name} must be a non-negative integer")
\ No newline at end of file
+        raise ValueError(f"{field_name} must be a non-negative integer")
+
+# Function to validate a strictly positive integer such as an order quantity
+def validate_positive_integer(value, field_name):
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise ValueError(f"{field_name} must be a positive integer")
+
+# Function to validate a full product record such as one row of a bulk upsert
+def validate_product(data):
+    validate_required_fields(data, ['name', 'price'])
+    validate_positive_float(data['price'], 'price')
+    if 'stock_level' in data:
+        validate_non_negative_integer(data['stock_level'], 'stock_level')
+
+# Function to validate a full customer record such as one row of a bulk upsert
+def validate_customer(data):
+    validate_required_fields(data, ['name', 'email', 'phone_number'])
+    validate_email(data['email'])
+    validate_phone_number(data['phone_number'])
+
+# Function to parse an optional numeric query parameter
+def parse_optional_number(args, name, cast=float):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a valid number")
\ No newline at end of file
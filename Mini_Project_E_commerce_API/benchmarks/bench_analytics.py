@@ -0,0 +1,82 @@
+# benchmarks/bench_analytics.py
+# Compares the NumPy analytics in app/analytics.py with the straightforward loop
+# over ORM OrderItem objects that they replace, on generated order data.
+#
+#   python benchmarks/bench_analytics.py [orders]
+import os
+import random
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import db
+from app.analytics import (load_item_columns, load_product_columns, basket_size_distribution,
+                           co_purchase_counts, stock_turnover)
+from app.models import Customer, Product, Order, OrderItem
+from config import TestingConfig
+from datetime import datetime
+
+PRODUCTS = 500
+
+# Function to insert `orders` orders of 1-6 random products each
+def populate(orders):
+    rng = random.Random(42)
+    db.session.bulk_insert_mappings(Customer, [{'name': 'Bench', 'email': 'bench@example.com', 'phone_number': '1'}])
+    db.session.bulk_insert_mappings(Product, [
+        {'name': f'Product {i}', 'price': 1.0, 'stock_level': rng.randint(0, 1000)} for i in range(PRODUCTS)])
+    db.session.bulk_insert_mappings(Order, [{'order_date': datetime.utcnow(), 'customer_id': 1}] * orders)
+    db.session.bulk_insert_mappings(OrderItem, [
+        {'order_id': order_id, 'product_id': product_id, 'quantity': rng.randint(1, 5)}
+        for order_id in range(1, orders + 1)
+        for product_id in rng.sample(range(1, PRODUCTS + 1), rng.randint(1, 6))])
+    db.session.commit()
+
+# The ORM-loop baseline: the same three metrics from OrderItem and Product objects
+def orm_loop():
+    items = OrderItem.query.all()
+    baskets, lines, sold = Counter(), {}, Counter()
+    for item in items:
+        baskets[item.order_id] += item.quantity
+        lines.setdefault(item.order_id, set()).add(item.product_id)
+        sold[item.product_id] += item.quantity
+    distribution = Counter(baskets.values())
+    pairs = Counter(pair for products in lines.values() for pair in combinations(sorted(products), 2))
+    turnover = {product.id: (sold[product.id], product.stock_level) for product in Product.query.all()}
+    return distribution, pairs.most_common(20), turnover
+
+# The vectorized version
+def vectorized():
+    items = load_item_columns()
+    products = load_product_columns()
+    return basket_size_distribution(items), co_purchase_counts(items, 20), stock_turnover(items, products)
+
+# Function to return the best of `repeat` timings of fn, in seconds
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == '__main__':
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = create_app(type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False}))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        populate(orders)
+        loop_time, (distribution, pairs, _) = best_of(orm_loop)
+        numpy_time, (baskets, top_pairs, _) = best_of(vectorized)
+        assert baskets['distribution'] == dict(distribution)
+        assert [row['orders'] for row in top_pairs] == [count for _, count in pairs]
+        print(f'{OrderItem.query.count()} order items in {orders} orders')
+        print(f'ORM loop: {loop_time * 1000:9.1f} ms')
+        print(f'NumPy:    {numpy_time * 1000:9.1f} ms  ({loop_time / numpy_time:.1f}x faster)')
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,54 @@
+# benchmarks/bench_auth.py
+# Cost of authenticating one request: checking a signed access token against the
+# in-memory revocation list, vs the naive alternative of loading the account and
+# checking its password hash on every request.
+#
+#   python benchmarks/bench_auth.py [checks]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.auth import issue_access_token, verify_access_token
+from app.database import db
+from app.models import Customer, CustomerAccount
+from app.passwords import hash_password, verify_password
+from config import Config, TestingConfig
+
+# Function to time `checks` calls of `check` and return microseconds per call
+def time_checks(check, checks):
+    start = time.perf_counter()
+    for _ in range(checks):
+        check()
+    return (time.perf_counter() - start) / checks * 1e6
+
+if __name__ == '__main__':
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # Production hashing parameters, so the naive path pays a real hash
+    app = create_app(type('BenchConfig', (TestingConfig,), {
+        'QUERY_DEBUG': False, 'METRICS_ENABLED': False, 'PASSWORD_SCRYPT_N': Config.PASSWORD_SCRYPT_N}))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        customer = Customer(name='Bench Customer', email='bench@example.com', phone_number='+1234567890')
+        db.session.add(customer)
+        db.session.commit()
+        db.session.add(CustomerAccount(username='bench', password=hash_password('password'), customer_id=customer.id))
+        db.session.commit()
+        token = issue_access_token(1)
+
+        def lookup():
+            password = CustomerAccount.query.filter_by(username='bench').one().password
+            db.session.rollback()
+            return password
+
+        def lookup_and_hash():
+            verify_password(lookup(), 'password')
+
+        print(f'signed token:             {time_checks(lambda: verify_access_token(token), checks):9.1f} us/request')
+        print(f'account lookup only:      {time_checks(lookup, checks // 10):9.1f} us/request')
+        print(f'account lookup + scrypt:  {time_checks(lookup_and_hash, 20):9.1f} us/request')
+        db.session.remove()
+        db.drop_all()
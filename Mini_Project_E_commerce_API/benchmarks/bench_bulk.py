@@ -0,0 +1,79 @@
+# benchmarks/bench_bulk.py
+# Throughput of the bulk upsert endpoints against the per-row path they replace:
+# `records` customers and products created with one POST /customer or POST /product
+# each (a request and a commit per row), then updated with one PUT each, against
+# the same records sent to POST /customers/bulk and POST /products/bulk in batches
+# of MAX_BULK_RECORDS.
+#
+#   python benchmarks/bench_bulk.py [records]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.bulk import MAX_BULK_RECORDS
+from app.database import db
+from config import TestingConfig
+
+# Function to build the customer and product records of one run; `tag` changes
+# the updated fields so the second pass really updates every row
+def make_records(records, tag):
+    customers = [{'name': f'Customer {i} {tag}', 'email': f'customer{i}@example.com', 'phone_number': '+1234567890'}
+                 for i in range(records)]
+    products = [{'name': f'Product {i}', 'price': i + 0.99, 'stock_level': len(tag)} for i in range(records)]
+    return customers, products
+
+# Function to time a callable once and return records per second
+def throughput(run, records):
+    start = time.perf_counter()
+    run()
+    return records / (time.perf_counter() - start)
+
+# Function to send every record with its own request; returns the created ids
+def per_row_create(client, url, records, id_key):
+    return [client.post(url, json=record).get_json()[id_key] for record in records]
+
+def per_row_update(client, url, ids, records):
+    for id, record in zip(ids, records):
+        client.put(f'{url}/{id}', json=record)
+
+# Function to send the records to a bulk endpoint in batches of MAX_BULK_RECORDS
+def bulk(client, url, records):
+    for start in range(0, len(records), MAX_BULK_RECORDS):
+        client.post(url, json=records[start:start + MAX_BULK_RECORDS])
+
+if __name__ == '__main__':
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = create_app(type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False}))
+    client = app.test_client()
+    created, updated = make_records(records, 'a'), make_records(records, 'bb')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        ids = {}
+        per_row = {
+            'customers create': throughput(lambda: ids.update(customers=per_row_create(
+                client, '/customer', created[0], 'customer_id')), records),
+            'products create': throughput(lambda: ids.update(products=per_row_create(
+                client, '/product', created[1], 'product_id')), records),
+            'customers update': throughput(lambda: per_row_update(client, '/customer', ids['customers'], updated[0]), records),
+            'products update': throughput(lambda: per_row_update(client, '/product', ids['products'], updated[1]), records),
+        }
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        batched = {
+            'customers create': throughput(lambda: bulk(client, '/customers/bulk', created[0]), records),
+            'products create': throughput(lambda: bulk(client, '/products/bulk', created[1]), records),
+            'customers update': throughput(lambda: bulk(client, '/customers/bulk', updated[0]), records),
+            'products update': throughput(lambda: bulk(client, '/products/bulk', updated[1]), records),
+        }
+        db.session.remove()
+        db.drop_all()
+
+    for name in per_row:
+        print(f'{name:17s} per row {per_row[name]:9.0f} rows/s  | bulk {batched[name]:9.0f} rows/s'
+              f'  ({batched[name] / per_row[name]:.0f}x)')
@@ -0,0 +1,65 @@
+# benchmarks/bench_fields.py
+# Sparse fieldsets: latency, payload size and SQL statements of full reads against
+# `fields=` reads, for a 500-product page, an order with 500 items and a cold
+# account read (caching off, so every request reaches the database).
+#
+#   python benchmarks/bench_fields.py [rounds]
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app
+from app.database import db
+from app.models import Customer, CustomerAccount, Order, OrderItem, Product
+from config import TestingConfig
+
+ROWS = 500
+
+URLS = (
+    (f'/products?limit={ROWS}', f'/products?limit={ROWS}&fields=id,name,price'),
+    ('/order/1', '/order/1?fields=order_id,order_date'),
+    ('/customer_account/1', '/customer_account/1?fields=username'),
+)
+
+# Function to time `rounds` GETs of `url`; returns (ms per request, response bytes, statements)
+def measure(app, client, url, rounds):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    size = len(client.get(url).data)
+    event.remove(db.engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        client.get(url)
+    return (time.perf_counter() - start) / rounds * 1000, size, len(statements)
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    app = create_app(type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False,
+                                                            'CACHE_ENABLED': False}))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        customer = Customer(name='Bench Customer', email='bench@example.com', phone_number='+1234567890')
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add(CustomerAccount(username='bench', password='password', customer_id=customer.id))
+        db.session.bulk_insert_mappings(Product, [{'name': f'Product {i}', 'price': i + 0.99, 'stock_level': 100}
+                                                  for i in range(ROWS)])
+        db.session.add(Order(order_date=datetime.utcnow(), customer_id=customer.id))
+        db.session.flush()
+        db.session.bulk_insert_mappings(OrderItem, [{'order_id': 1, 'product_id': i + 1, 'quantity': 1}
+                                                    for i in range(ROWS)])
+        db.session.commit()
+
+        client = app.test_client()
+        for full_url, sparse_url in URLS:
+            for url in (full_url, sparse_url):
+                ms, size, statements = measure(app, client, url, rounds)
+                print(f'GET {url:50s} {ms:6.2f} ms  {size:6d} bytes  {statements} statement(s)')
+        db.session.remove()
+        db.drop_all()
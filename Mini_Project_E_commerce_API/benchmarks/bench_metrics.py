@@ -0,0 +1,45 @@
+# benchmarks/bench_metrics.py
+# Measures the per-request cost of the /metrics instrumentation by timing the same
+# request against an app with METRICS_ENABLED on and off.
+#
+#   python benchmarks/bench_metrics.py [requests]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import db
+from app.models import Product
+from config import TestingConfig
+
+# Function to time `requests` GETs of one product and return microseconds per request
+def time_requests(app, requests):
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        product = Product(name='Benchmark Product', price=1.0, stock_level=1)
+        db.session.add(product)
+        db.session.commit()
+        url = f'/product/{product.id}'
+    for _ in range(200):
+        client.get(url)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+    return elapsed / requests * 1e6
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    # Cache disabled so every request issues SQL through the instrumented hooks
+    config = type('BenchConfig', (TestingConfig,), {'CACHE_ENABLED': False, 'METRICS_ENABLED': False})
+    baseline = time_requests(create_app(config), requests)
+    config.METRICS_ENABLED = True
+    instrumented = time_requests(create_app(config), requests)
+    print(f'metrics off: {baseline:8.1f} us/request')
+    print(f'metrics on:  {instrumented:8.1f} us/request  (+{instrumented - baseline:.1f} us)')
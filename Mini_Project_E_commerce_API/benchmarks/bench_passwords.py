@@ -0,0 +1,85 @@
+# benchmarks/bench_passwords.py
+# Burst signups: `clients` request threads each hash one password at a time, either
+# inline on the request thread or through the bounded hashing pool. Reports hashes
+# per second, CPU time spent on the request threads, and the latency of a small
+# pure-Python task (standing in for a cheap request such as a cached product read)
+# run alongside the burst. scrypt needs 128 * n * r bytes per running hash (16 MiB
+# with the defaults), so the process's peak RSS after each run is printed too; the
+# pool runs first because the peak only ever grows.
+#
+#   python benchmarks/bench_passwords.py [seconds] [clients]
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.passwords import PasswordHasher, _derive, hash_parameters
+from config import Config
+
+# Function to spend about a millisecond of CPU in Python, holding the GIL
+def cheap_request():
+    total = 0
+    for i in range(20000):
+        total += i
+    return total
+
+# Function to run the burst for `seconds` and return (hashes per second, request-thread
+# CPU ms per hash, median and p99 cheap-task latency in ms)
+def run_burst(hash_one, clients, seconds):
+    counts, cpu = [], []
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        count, start_cpu = 0, time.thread_time()
+        while time.perf_counter() < deadline:
+            hash_one()
+            count += 1
+        cpu.append(time.thread_time() - start_cpu)
+        counts.append(count)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        cheap_request()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    hashes = sum(counts)
+    return (hashes / seconds, sum(cpu) / max(hashes, 1) * 1000,
+            latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)])
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    config = {key: getattr(Config, key) for key in dir(Config) if key.startswith('PASSWORD_')}
+    algorithm, params = hash_parameters(config)
+    salt = b'\0' * 16
+
+    start = time.perf_counter()
+    _derive(algorithm, params, b'password', salt)
+    print(f'{algorithm} {params}: {(time.perf_counter() - start) * 1000:.1f} ms per hash, {os.cpu_count()} CPU(s)')
+
+    start = time.perf_counter()
+    for _ in range(50):
+        cheap_request()
+    print(f'cheap task alone: {(time.perf_counter() - start) / 50 * 1000:.2f} ms')
+
+    print(f'{clients} clients for {seconds:g}s:')
+    results = []
+    for workers in sorted({1, os.cpu_count() or 1}):
+        hasher = PasswordHasher(algorithm, params, workers=workers, queue_size=clients, timeout=60)
+        results.append((f'pool of {workers}', lambda hasher=hasher: hasher.hash('password')))
+    results.append(('inline', lambda: _derive(algorithm, params, b'password', salt)))
+    for name, hash_one in results:
+        rate, cpu_ms, p50, p99 = run_burst(hash_one, clients, seconds)
+        print(f'  {name:10s} {rate:7.1f} hashes/s  request-thread CPU {cpu_ms:6.2f} ms/hash  '
+              f'cheap task p50 {p50:6.2f} ms  p99 {p99:7.2f} ms  '
+              f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:6.1f} MiB')
@@ -0,0 +1,68 @@
+# benchmarks/bench_rate_limit.py
+# Measures the cost of the rate limiter: one token bucket check against each store,
+# and the per-request overhead of the limiter on a cached product read.
+#
+#   python benchmarks/bench_rate_limit.py [checks] [requests]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import db
+from app.models import Product
+from app.rate_limit import MemoryStore, SQLiteStore, check_limit
+from config import TestingConfig
+
+# Function to time `checks` bucket checks spread over `keys` clients; microseconds per check
+def time_checks(store, checks, keys):
+    names = [f'client-{i}|product_routes.read_product' for i in range(keys)]
+    start = time.perf_counter()
+    for i in range(checks):
+        check_limit(store, names[i % keys], 1e9, 1e9)
+    return (time.perf_counter() - start) / checks * 1e6
+
+# Function to time GETs of one product through each app in alternating rounds of
+# `requests` and return the best round of each in microseconds per request, so
+# drift in the machine's speed affects both apps alike
+def time_requests(apps, requests, rounds=5):
+    with apps[0].app_context():
+        db.create_all()
+        product = Product(name='Benchmark Product', price=1.0, stock_level=1)
+        db.session.add(product)
+        db.session.commit()
+        url = f'/product/{product.id}'
+    clients = [app.test_client() for app in apps]
+    best = [float('inf')] * len(apps)
+    for _ in range(rounds):
+        for i, client in enumerate(clients):
+            for _ in range(200):
+                client.get(url)
+            start = time.perf_counter()
+            for _ in range(requests):
+                client.get(url)
+            best[i] = min(best[i], (time.perf_counter() - start) / requests * 1e6)
+    with apps[0].app_context():
+        db.session.remove()
+        db.drop_all()
+    return best
+
+if __name__ == '__main__':
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_store = SQLiteStore(os.path.join(directory, 'rate_limits.db'))
+        for keys in (1, 10000):
+            print(f'memory store, {keys:5d} keys: {time_checks(MemoryStore(), checks, keys):6.2f} us/check')
+            print(f'sqlite store, {keys:5d} keys: {time_checks(sqlite_store, checks // 10, keys):6.2f} us/check')
+        sqlite_store._connection().close()
+
+    # The limits are high enough that no request is refused
+    config = type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False,
+                                                    'RATE_LIMIT_DEFAULT': (1e9, 1e9)})
+    limited_config = type('LimitedBenchConfig', (config,), {'RATE_LIMIT_ENABLED': True})
+    baseline, limited = time_requests([create_app(config), create_app(limited_config)], requests)
+    print(f'limiter off: {baseline:8.1f} us/request')
+    print(f'limiter on:  {limited:8.1f} us/request  (+{limited - baseline:.1f} us)')
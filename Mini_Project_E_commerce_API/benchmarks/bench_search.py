@@ -0,0 +1,78 @@
+# benchmarks/bench_search.py
+# Times typeahead queries against /products/search's backends (SQLite FTS5 and the
+# in-process trigram index) over generated product names.
+#
+#   python benchmarks/bench_search.py [products] [queries]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import db
+from app.models import Product
+from app.search import search_products
+from config import TestingConfig
+
+ADJECTIVES = ['Red', 'Blue', 'Green', 'Black', 'White', 'Silver', 'Classic', 'Ultra', 'Compact', 'Deluxe',
+              'Wireless', 'Organic', 'Vintage', 'Smart', 'Portable', 'Heavy', 'Light', 'Premium', 'Eco', 'Pro']
+NOUNS = ['Shoes', 'Shirt', 'Laptop', 'Stand', 'Lamp', 'Kettle', 'Backpack', 'Headphones', 'Keyboard', 'Mouse',
+         'Bottle', 'Jacket', 'Camera', 'Speaker', 'Charger', 'Blender', 'Notebook', 'Watch', 'Chair', 'Desk']
+
+# Function to insert `count` products with distinct generated names
+def populate(count, rng):
+    table = Product.__table__
+    for start in range(0, count, 50000):
+        db.session.execute(table.insert(), [
+            {'name': f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(NOUNS)} {i}',
+             'price': 1.0, 'stock_level': 1, 'version': 1}
+            for i in range(start, min(start + 50000, count))])
+    db.session.commit()
+
+# Function to build typeahead queries (3-8 character prefixes of real names) and
+# the same prefixes with two adjacent letters swapped
+def make_queries(count, rng):
+    names = [name for (name,) in db.session.query(Product.name).order_by(db.func.random()).limit(count)]
+    prefixes = [name[:rng.randint(3, 8)] for name in names]
+    typos = []
+    for prefix in prefixes:
+        i = rng.randrange(1, len(prefix) - 1)
+        typos.append(prefix[:i] + prefix[i + 1] + prefix[i] + prefix[i + 2:])
+    return prefixes, typos
+
+# Function to return p50, p99 and max latency in milliseconds
+def time_queries(queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search_products(query, 10)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)], timings[-1]
+
+if __name__ == '__main__':
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(7)
+    base = type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False})
+    fts_app = create_app(base)
+    memory_app = create_app(type('MemoryBenchConfig', (base,), {'SEARCH_BACKEND': 'memory'}))
+    with fts_app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        populate(products, rng)
+        print(f'{products} products inserted and indexed in {time.perf_counter() - start:.1f} s')
+        prefixes, typos = make_queries(count, rng)
+        print('fts5 typeahead:   p50 %6.2f ms  p99 %6.2f ms  max %6.2f ms' % time_queries(prefixes))
+        print('fts5 typos:       p50 %6.2f ms  p99 %6.2f ms  max %6.2f ms' % time_queries(typos))
+    with memory_app.app_context():
+        start = time.perf_counter()
+        search_products('warm up', 10)
+        print(f'memory index built in {time.perf_counter() - start:.1f} s')
+        print('memory typeahead: p50 %6.2f ms  p99 %6.2f ms  max %6.2f ms' % time_queries(prefixes))
+        print('memory typos:     p50 %6.2f ms  p99 %6.2f ms  max %6.2f ms' % time_queries(typos))
+        db.session.remove()
+        db.drop_all()
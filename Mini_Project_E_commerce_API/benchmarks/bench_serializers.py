@@ -0,0 +1,105 @@
+# benchmarks/bench_serializers.py
+# Building and encoding large responses: the previous path (full ORM objects, a
+# hand-built dict per row, jsonify) against the serializer module (column tuples
+# via with_entities, ModelSerializer.dump_all, json_response) with each available
+# encoder. Measures a 500-product page of GET /products and an order with 500
+# items as served by GET /order/<id>, then both routes end to end.
+#
+#   python benchmarks/bench_serializers.py [rounds]
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from app import create_app
+from app.database import db
+from app.models import Customer, Order, OrderItem, Product
+from app.serializers import ENCODERS, ORDER_ITEM, PRODUCT, json_response
+from config import TestingConfig
+
+ROWS = 500
+
+# Function to time `rounds` calls of `build` and return milliseconds per call (best of three)
+def time_build(build, rounds):
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            build()
+            db.session.rollback()
+        best = min(best, (time.perf_counter() - start) / rounds * 1000)
+    return best
+
+# The previous list_products and read_order bodies
+def products_before():
+    products = Product.query.order_by(Product.id).limit(ROWS).all()
+    product_list = [{'id': p.id, 'name': p.name, 'price': p.price, 'stock_level': p.stock_level} for p in products]
+    return jsonify({'products': product_list, 'next_cursor': None})
+
+def order_before():
+    order = Order.query.get(1)
+    order_items = [{'product_id': item.product_id, 'quantity': item.quantity} for item in order.order_items]
+    return jsonify({'order_id': order.id, 'order_date': order.order_date, 'customer_id': order.customer_id,
+                    'order_items': order_items})
+
+# The same payloads through the serializer module
+def products_after():
+    rows = (db.session.query(*PRODUCT.columns(Product.version, Product.updated_at))
+            .order_by(Product.id).limit(ROWS).all())
+    return json_response({'products': PRODUCT.dump_all(rows), 'next_cursor': None})
+
+def order_after():
+    order = db.session.query(Order.id, Order.order_date, Order.customer_id, Order.version).filter(Order.id == 1).first()
+    items = ORDER_ITEM.dump_all(db.session.query(*ORDER_ITEM.columns()).filter(OrderItem.order_id == 1).order_by(OrderItem.id))
+    return json_response({'order_id': order.id, 'order_date': order.order_date, 'customer_id': order.customer_id,
+                          'order_items': items})
+
+# Function to time GETs of `url` through an app's test client; milliseconds per request
+def time_route(app, url, rounds):
+    client = app.test_client()
+    client.get(url)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        client.get(url)
+    return (time.perf_counter() - start) / rounds * 1000
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    config = type('BenchConfig', (TestingConfig,), {'QUERY_DEBUG': False, 'METRICS_ENABLED': False,
+                                                    'CACHE_ENABLED': False})
+    apps = {name: create_app(type(f'{name}Config', (config,), {'JSON_ENCODER': name})) for name in ENCODERS}
+    app = apps['json']
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        customer = Customer(name='Bench Customer', email='bench@example.com', phone_number='+1234567890')
+        db.session.add(customer)
+        db.session.bulk_insert_mappings(Product, [{'name': f'Product {i}', 'price': i + 0.99, 'stock_level': 100}
+                                                  for i in range(ROWS)])
+        db.session.flush()
+        db.session.add(Order(order_date=datetime.utcnow(), customer_id=customer.id))
+        db.session.flush()
+        db.session.bulk_insert_mappings(OrderItem, [{'order_id': 1, 'product_id': i + 1, 'quantity': 1}
+                                                    for i in range(ROWS)])
+        db.session.commit()
+
+    for label, before, after in (('products page', products_before, products_after),
+                                 ('order items  ', order_before, order_after)):
+        with app.test_request_context():
+            print(f'{label} ({ROWS} rows): ORM + jsonify {time_build(before, rounds):6.2f} ms', end='')
+        for name, encoder_app in apps.items():
+            with encoder_app.test_request_context():
+                print(f'  | tuples + {name} {time_build(after, rounds):6.2f} ms', end='')
+        print()
+
+    for url in (f'/products?limit={ROWS}', '/order/1'):
+        timings = '  '.join(f'{name} {time_route(encoder_app, url, rounds):6.2f} ms'
+                            for name, encoder_app in apps.items())
+        print(f'GET {url:18s} end to end: {timings}')
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
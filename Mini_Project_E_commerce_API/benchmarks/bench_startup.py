@@ -0,0 +1,46 @@
+# benchmarks/bench_startup.py
+# Measures cold-start time and memory of a worker building the app with create_app().
+# Each sample runs in a fresh interpreter, like a newly forked prefork worker.
+#
+#   python benchmarks/bench_startup.py [runs]
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Script run in each child interpreter; reports its own import/build time and peak RSS
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+built = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (built - imported) * 1000,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'alembic_loaded': 'alembic' in sys.modules,
+    'numpy_loaded': 'numpy' in sys.modules,
+}))
+"""
+
+def run(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', CHILD], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+    return samples
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    samples = run(runs)
+    for key in ('import_ms', 'create_app_ms', 'max_rss_kb'):
+        values = [sample[key] for sample in samples]
+        print(f'{key:>14}: median {statistics.median(values):9.1f}   min {min(values):9.1f}   max {max(values):9.1f}')
+    print(f"alembic loaded in worker: {any(sample['alembic_loaded'] for sample in samples)}")
+    print(f"numpy loaded in worker: {any(sample['numpy_loaded'] for sample in samples)}")
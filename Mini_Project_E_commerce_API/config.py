@@ -1,12 +1,142 @@
 import os
 
+# Function to build the SQLAlchemy engine options for a database URI.
+# MySQL gets a sized, pre-pinged and recycled QueuePool; file-based SQLite gets a
+# small QueuePool so the connect-time PRAGMAs below run once per connection.
+def engine_options(uri, pool_size=10, max_overflow=20):
+    if uri.startswith('mysql'):
+        return {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', pool_size)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max_overflow)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+        }
+    if uri.startswith('sqlite') and ':memory:' not in uri and uri != 'sqlite://':
+        return {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'connect_args': {'check_same_thread': False},
+        }
+    return {}
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///ecommerce.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Applied to every new SQLite connection: WAL lets readers run alongside a writer
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,
+        'busy_timeout': 5000,
+    }
+    # Blueprints registered by create_app(), as "module:attribute" import paths
+    BLUEPRINTS = [
+        'app.routes.customer_routes:customer_routes',
+        'app.routes.customer_account_routes:customer_account_routes',
+        'app.routes.product_routes:product_routes',
+        'app.routes.order_routes:order_routes',
+        'app.routes.report_routes:report_routes',
+        'app.routes.analytics_routes:analytics_routes',
+        'app.routes.metrics_routes:metrics_routes',
+    ]
+    # JSON encoder for large responses (see app/serializers.py): "auto" uses orjson
+    # when it is installed, "json" forces the standard library
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    # Per-route latency, status and SQL statement metrics, served at /metrics
+    METRICS_ENABLED = True
+    # Slow-query log, N+1 detector and per-route query budgets (see app/query_debug.py)
+    QUERY_DEBUG = False
+    SLOW_QUERY_THRESHOLD_MS = 100
+    N_PLUS_ONE_THRESHOLD = 5
+    QUERY_BUDGET_ENFORCE = False
+    # In-process read-through cache for customer, product and account lookups
+    CACHE_ENABLED = True
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 30))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    # Optional cache tier shared by the worker processes of one host: None, or
+    # "sqlite:///<file>". Each worker replays the others' invalidations into its
+    # in-process tier every CACHE_SYNC_INTERVAL seconds.
+    CACHE_SHARED_STORAGE = os.getenv('CACHE_SHARED_STORAGE')
+    CACHE_SYNC_INTERVAL = float(os.getenv('CACHE_SYNC_INTERVAL', 0.5))
+    # Update the sales summary tables in the same transaction as each order write.
+    # When off, run `flask reports rebuild` on a schedule instead.
+    REPORTS_INLINE = os.getenv('REPORTS_INLINE', '1') == '1'
+    # Rows fetched per query when loading order data into arrays for analytics
+    ANALYTICS_CHUNK_SIZE = int(os.getenv('ANALYTICS_CHUNK_SIZE', 50000))
+    # Product search: "auto" uses SQLite FTS5 or MySQL FULLTEXT when the index exists,
+    # otherwise an in-process trigram index reloaded every SEARCH_INDEX_TTL seconds
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 300))
+    # Sharded stock counters for hot products: 0 keeps stock in products.stock_level
+    # only; N > 0 enables the mode and is the shard count used by `flask stock shard`
+    STOCK_SHARDS = int(os.getenv('STOCK_SHARDS', 0))
+    # Idempotency-Key support on POST /order and POST /customer: stored responses are
+    # replayed for IDEMPOTENCY_TTL seconds; a duplicate of a request still running
+    # waits up to IDEMPOTENCY_WAIT seconds, and a claim older than
+    # IDEMPOTENCY_LOCK_TIMEOUT seconds is treated as abandoned
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 5))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+    # Per-client token bucket rate limits (see app/rate_limit.py): (requests per
+    # second, burst) per endpoint, keyed by the account of a valid access token or the remote address.
+    # RATE_LIMIT_STORAGE is "memory" (one worker) or "sqlite:///<file>" (shared by
+    # the worker processes of one host).
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_DEFAULT = (10, 20)
+    RATE_LIMITS = {
+        'product_routes.list_products': (20, 40),
+        'product_routes.search_products_by_name': (20, 40),
+        'order_routes.create_order': (5, 10),
+        'order_routes.create_orders_bulk': (1, 2),
+        'customer_account_routes.login_customer_account': (1, 5),
+    }
+    # Password hashing (see app/passwords.py): "scrypt" or "pbkdf2_sha256" with its
+    # cost parameters. Hashes run on a pool of PASSWORD_HASH_WORKERS threads (default:
+    # one per CPU) with at most PASSWORD_HASH_QUEUE more waiting; a request that gets
+    # no slot within PASSWORD_HASH_TIMEOUT seconds is answered with 503. Passwords
+    # hashed with other parameters are rehashed at their owner's next login.
+    PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'scrypt')
+    PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+    PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+    # Access tokens issued at login (see app/auth.py) are signed with SECRET_KEY and
+    # valid for ACCESS_TOKEN_TTL seconds. Each worker keeps logged-out tokens in
+    # memory and reloads them from the database every TOKEN_REVOCATION_REFRESH seconds.
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    ACCESS_TOKEN_TTL = int(os.getenv('ACCESS_TOKEN_TTL', 3600))
+    TOKEN_REVOCATION_REFRESH = float(os.getenv('TOKEN_REVOCATION_REFRESH', 5))
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_DEBUG = True
+    SECRET_KEY = os.getenv('SECRET_KEY', 'development-secret-key')
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test_ecommerce.db'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Fail the test when a route goes over its declared query budget
+    QUERY_DEBUG = True
+    QUERY_BUDGET_ENFORCE = True
+    # Tests fire requests far faster than any client; test_rate_limit turns it on
+    RATE_LIMIT_ENABLED = False
+    # Cheap hashing parameters keep the suite fast
+    PASSWORD_SCRYPT_N = 2 ** 8
+    SECRET_KEY = 'testing-secret-key'
+
+class ProductionConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI, pool_size=20, max_overflow=40)
+
+# Configuration profiles selectable through the APP_CONFIG environment variable
+config_by_name = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
@@ -0,0 +1,64 @@
+"""product search index
+
+Revision ID: 443b3f80e25d
+Revises: d93ae96c19a7
+Create Date: 2026-10-18 12:02:47.721235
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '443b3f80e25d'
+down_revision = 'd93ae96c19a7'
+branch_labels = None
+depends_on = None
+
+
+# SQLite: case-insensitive name index for prefix lookups, and a trigram FTS5 table
+# over products.name kept in sync by triggers.
+# MySQL: FULLTEXT index on products.name. Other databases use the in-process index.
+FTS5_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, content='products', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name); END",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab USING fts5vocab(products_fts, 'row')",
+]
+
+
+def fts5_supported(bind):
+    import sqlite3
+    if bind.dialect.name != 'sqlite' or sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    return bool(bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('CREATE INDEX IF NOT EXISTS ix_products_name_nocase ON products (name COLLATE NOCASE)')
+    if fts5_supported(bind):
+        for statement in FTS5_DDL:
+            op.execute(statement)
+    elif bind.dialect.name == 'mysql':
+        op.execute('CREATE FULLTEXT INDEX ix_products_name_fulltext ON products (name)')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('products_fts_ai', 'products_fts_ad', 'products_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS products_fts_vocab')
+        op.execute('DROP TABLE IF EXISTS products_fts')
+        op.execute('DROP INDEX IF EXISTS ix_products_name_nocase')
+    elif bind.dialect.name == 'mysql':
+        op.execute('DROP INDEX ix_products_name_fulltext ON products')
@@ -0,0 +1,28 @@
+"""unique product names
+
+Revision ID: 9f4b2e61c3d8
+Revises: 5c1e8d07b2a4
+Create Date: 2026-10-18 11:52:31.702914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f4b2e61c3d8'
+down_revision = '5c1e8d07b2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bulk upserts match products by name. Existing duplicate names must be
+    # resolved before this runs.
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_products_name', ['name'])
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_products_name', type_='unique')
@@ -0,0 +1,36 @@
+"""row versions
+
+Revision ID: b38d6a95e17f
+Revises: 9f4b2e61c3d8
+Create Date: 2026-10-18 11:52:33.120587
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b38d6a95e17f'
+down_revision = '9f4b2e61c3d8'
+branch_labels = None
+depends_on = None
+
+# Tables that carry the version and updated_at columns of VersionedMixin
+VERSIONED_TABLES = ('customers', 'products', 'customer_accounts', 'orders')
+
+
+def upgrade():
+    # Existing rows start at version 1, last modified now. SQLite cannot add a
+    # column with a CURRENT_TIMESTAMP default in place, so batch mode rebuilds the table.
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(),
+                                          server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+
+
+def downgrade():
+    for table in reversed(VERSIONED_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('version')
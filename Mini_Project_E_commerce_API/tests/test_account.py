@@ -1,7 +1,16 @@
 # tests/test_account.py
 import unittest
-from app import app, db
+from app import create_app
+from app.database import db
+from config import TestingConfig
 from app.models import Customer, CustomerAccount
+from app.passwords import PasswordHasher
+
+app = create_app(TestingConfig)
+# Same app with stronger hashing parameters, as after a cost increase; metrics are
+# off so its requests do not show up in test_metrics' counters
+stronger_app = create_app(type('StrongerHashConfig', (TestingConfig,), {
+    'PASSWORD_SCRYPT_N': 2 ** 9, 'METRICS_ENABLED': False}))
 
 class CustomerAccountTestCase(unittest.TestCase):
     def setUp(self):
@@ -16,6 +25,7 @@ class CustomerAccountTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(self.customer)
             db.session.commit()
+            db.session.refresh(self.customer)
 
     def tearDown(self):
         # Clean up and drop the tables after each test
@@ -57,6 +67,7 @@ class CustomerAccountTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(account)
             db.session.commit()
+            db.session.refresh(account)
         
         # Test reading the customer account
         response = self.app.get(f'/customer_account/{account.id}')
@@ -69,6 +80,7 @@ class CustomerAccountTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(account)
             db.session.commit()
+            db.session.refresh(account)
         
         # Test updating the customer account
         response = self.app.put(f'/customer_account/{account.id}', json={
@@ -83,6 +95,7 @@ class CustomerAccountTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(account)
             db.session.commit()
+            db.session.refresh(account)
         
         # Test deleting the customer account
         response = self.app.delete(f'/customer_account/{account.id}')
@@ -95,5 +108,69 @@ class CustomerAccountTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn(b'Customer account not found', response.data)
 
+    def stored_password(self, username='testuser'):
+        with app.app_context():
+            return CustomerAccount.query.filter_by(username=username).one().password
+
+    def login(self, password, username='testuser', client=None):
+        return (client or self.app).post('/customer_account/login', json={'username': username, 'password': password})
+
+    def test_password_is_hashed_and_login(self):
+        # Test that the stored password is a salted hash, not the password itself
+        self.app.post('/customer_account', json={'username': 'testuser', 'password': 'testpassword', 'customer_id': self.customer.id})
+        stored = self.stored_password()
+        self.assertTrue(stored.startswith('scrypt$256$8$1$'))
+        self.assertNotIn('testpassword', stored)
+
+        # Test logging in with the right password, a wrong one and an unknown username
+        response = self.login('testpassword')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Login successful', response.data)
+        self.assertEqual(self.login('wrongpassword').status_code, 401)
+        self.assertEqual(self.login('testpassword', username='nobody').status_code, 401)
+        self.assertEqual(self.stored_password(), stored)
+
+        # Test that a password change is hashed too and takes effect
+        account_id = response.get_json()['account_id']
+        self.app.put(f'/customer_account/{account_id}', json={'password': 'newpassword'})
+        self.assertNotEqual(self.stored_password(), stored)
+        self.assertEqual(self.login('testpassword').status_code, 401)
+        self.assertEqual(self.login('newpassword').status_code, 200)
+
+        # Test that an empty password is rejected
+        response = self.app.put(f'/customer_account/{account_id}', json={'password': ''})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_rehashes_outdated_hashes(self):
+        # Test that a plain-text password from before hashing is upgraded at login
+        with app.app_context():
+            db.session.add(CustomerAccount(username="testuser", password="testpassword", customer_id=self.customer.id))
+            db.session.commit()
+        self.assertEqual(self.login('wrongpassword').status_code, 401)
+        self.assertEqual(self.stored_password(), 'testpassword')
+        self.assertEqual(self.login('testpassword').status_code, 200)
+        self.assertTrue(self.stored_password().startswith('scrypt$256$'))
+
+        # Test that raising the cost rehashes at the next login, and only once
+        client = stronger_app.test_client()
+        self.assertEqual(self.login('testpassword', client=client).status_code, 200)
+        stored = self.stored_password()
+        self.assertTrue(stored.startswith('scrypt$512$'))
+        self.assertEqual(self.login('testpassword', client=client).status_code, 200)
+        self.assertEqual(self.stored_password(), stored)
+
+    def test_busy_hasher(self):
+        # Test that a request gets 503 when every slot of the hashing pool is taken
+        hasher = PasswordHasher('scrypt', (2 ** 8, 8, 1), workers=1, queue_size=0, timeout=0)
+        default_hasher, app.extensions['password_hasher'] = app.extensions['password_hasher'], hasher
+        hasher._slots.acquire()
+        try:
+            response = self.app.post('/customer_account', json={'username': 'testuser', 'password': 'testpassword', 'customer_id': self.customer.id})
+        finally:
+            hasher._slots.release()
+            app.extensions['password_hasher'] = default_hasher
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
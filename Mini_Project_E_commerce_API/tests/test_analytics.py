@@ -0,0 +1,95 @@
+# tests/test_analytics.py
+import subprocess
+import sys
+import unittest
+import numpy as np
+from app import create_app
+from app.database import db
+from app.analytics import (ItemColumns, ProductColumns, load_item_columns, basket_size_distribution,
+                           co_purchase_counts, stock_turnover)
+from config import TestingConfig
+from app.models import Customer, Product, Order, OrderItem
+from datetime import datetime
+
+app = create_app(TestingConfig)
+
+# Three orders: {1: 2 units, 2: 1 unit}, {1: 1, 2: 1, 3: 4}, {3: 1}
+ITEMS = ItemColumns(order_id=np.array([10, 10, 11, 11, 11, 12]),
+                    product_id=np.array([1, 2, 2, 1, 3, 3]),
+                    quantity=np.array([2, 1, 1, 1, 4, 1]))
+
+class AnalyticsTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            app.extensions.pop('cache', None)
+
+    def test_basket_size_distribution(self):
+        # Test units per order and the summary statistics
+        result = basket_size_distribution(ITEMS)
+        self.assertEqual(result['orders'], 3)
+        self.assertEqual(result['distribution'], {1: 1, 3: 1, 6: 1})
+        self.assertEqual(result['median'], 3.0)
+        self.assertEqual(result['max'], 6)
+
+    def test_co_purchase_counts(self):
+        # Test that each pair is counted once per order, most frequent first
+        self.assertEqual(co_purchase_counts(ITEMS), [
+            {'product_ids': [1, 2], 'orders': 2},
+            {'product_ids': [1, 3], 'orders': 1},
+            {'product_ids': [2, 3], 'orders': 1},
+        ])
+        self.assertEqual(len(co_purchase_counts(ITEMS, top=1)), 1)
+
+    def test_stock_turnover(self):
+        # Test units sold against stock, including an out-of-stock product
+        products = ProductColumns(id=np.array([1, 2, 3, 4]), stock_level=np.array([6, 0, 5, 8]))
+        result = {row['product_id']: row for row in stock_turnover(ITEMS, products)}
+        self.assertEqual(result[1]['units_sold'], 3)
+        self.assertEqual(result[1]['turnover'], 0.5)
+        self.assertEqual(result[3]['sell_through'], 0.5)
+        self.assertIsNone(result[2]['turnover'])
+        self.assertEqual(result[4]['units_sold'], 0)
+
+    def test_load_item_columns_in_chunks(self):
+        # Test that chunked loading returns every item in id order
+        with app.app_context():
+            customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            product = Product(name="Test Product", price=10.0, stock_level=100)
+            db.session.add_all([customer, product])
+            db.session.flush()
+            for quantity in range(1, 6):
+                order = Order(order_date=datetime.utcnow(), customer_id=customer.id)
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=quantity))
+            db.session.commit()
+            items = load_item_columns(chunk_size=2)
+        self.assertEqual(items.quantity.tolist(), [1, 2, 3, 4, 5])
+
+        # Test the endpoints over the same data
+        response = self.app.get('/analytics/basket-sizes')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['orders'], 5)
+        response = self.app.get('/analytics/stock-turnover?top=1')
+        self.assertEqual(response.get_json()['products'][0]['units_sold'], 15)
+        self.assertEqual(self.app.get('/analytics/co-purchases?top=0').status_code, 400)
+
+    def test_numpy_not_loaded_at_startup(self):
+        # Test that building an app in a fresh interpreter leaves numpy unimported
+        script = 'import sys; from app import create_app; create_app(); print("numpy" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', script], cwd=app.root_path, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+if __name__ == '__main__':
+    unittest.main()
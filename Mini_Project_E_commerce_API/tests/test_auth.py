@@ -0,0 +1,96 @@
+# tests/test_auth.py
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app
+from app.auth import purge_revoked_tokens
+from app.database import db
+from config import TestingConfig
+from app.models import Customer, RevokedToken
+
+app = create_app(TestingConfig)
+# A second worker that reloads the revocation list on every check, and one whose
+# tokens are already expired when issued; metrics are off so their requests do
+# not show up in test_metrics' counters
+other_worker_app = create_app(type('OtherWorkerConfig', (TestingConfig,), {
+    'TOKEN_REVOCATION_REFRESH': 0, 'METRICS_ENABLED': False}))
+expired_app = create_app(type('ExpiredTokenConfig', (TestingConfig,), {
+    'ACCESS_TOKEN_TTL': -1, 'METRICS_ENABLED': False}))
+
+class AuthTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            db.session.add(customer)
+            db.session.commit()
+            db.session.refresh(customer)
+        self.app.post('/customer_account', json={'username': 'testuser', 'password': 'testpassword', 'customer_id': customer.id})
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, client=None):
+        response = (client or self.app).post('/customer_account/login', json={'username': 'testuser', 'password': 'testpassword'})
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    def test_token_authenticates_without_queries(self):
+        # Test that login issues a token that identifies the account
+        headers = self.login()
+        response = self.app.get('/customer_account/me', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['username'], 'testuser')
+
+        # Test that once the account is cached, a request costs no SQL at all
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                self.assertEqual(self.app.get('/customer_account/me', headers=headers).status_code, 200)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(statements, [])
+
+    def test_rejected_tokens(self):
+        # Test that missing, tampered, foreign and expired tokens are rejected
+        headers = self.login()
+        token = headers['Authorization'].split()[1]
+        response = self.app.get('/customer_account/me')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.headers['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(self.app.get('/customer_account/me', headers={'Authorization': f'Bearer {token[:-2]}xx'}).status_code, 401)
+        self.assertEqual(self.app.get('/customer_account/me', headers={'Authorization': f'Basic {token}'}).status_code, 401)
+        other_app = create_app(type('OtherSecretConfig', (TestingConfig,), {'SECRET_KEY': 'other', 'METRICS_ENABLED': False}))
+        self.assertEqual(other_app.test_client().get('/customer_account/me', headers=headers).status_code, 401)
+        expired = self.login(expired_app.test_client())
+        self.assertEqual(self.app.get('/customer_account/me', headers=expired).status_code, 200)
+        self.assertEqual(expired_app.test_client().get('/customer_account/me', headers=expired).status_code, 401)
+
+    def test_logout_revokes_token(self):
+        # Test that a logged-out token is rejected at once, while other tokens still work
+        headers, other_headers = self.login(), self.login()
+        other_worker = other_worker_app.test_client()
+        self.assertEqual(other_worker.get('/customer_account/me', headers=headers).status_code, 200)
+        self.assertEqual(self.app.post('/customer_account/logout', headers=headers).status_code, 200)
+        self.assertEqual(self.app.get('/customer_account/me', headers=headers).status_code, 401)
+        self.assertEqual(self.app.get('/customer_account/me', headers=other_headers).status_code, 200)
+
+        # Test that another worker picks the revocation up when it reloads the list
+        self.assertEqual(other_worker.get('/customer_account/me', headers=headers).status_code, 401)
+
+        # Test that revocations are purged once their tokens have expired
+        with app.app_context():
+            self.assertEqual(purge_revoked_tokens(), 0)
+            RevokedToken.query.update({RevokedToken.expires_at: datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+            self.assertEqual(purge_revoked_tokens(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# tests/test_cache.py
+import glob
+import os
+import unittest
+from sqlalchemy import event
+from app import create_app
+from app.cache import get_cache, get_shared_cache, read_through, CachedRow
+from app.database import db
+from app.metrics import CACHE_REQUESTS, render_prometheus
+from config import TestingConfig
+from app.models import Product
+
+SHARED_CACHE_FILE = 'test_cache_shared.db'
+
+# Two apps sharing a cache file stand in for two worker processes; metrics are off
+# so their requests do not show up in test_metrics' counters
+WorkerConfig = type('WorkerConfig', (TestingConfig,), {
+    'METRICS_ENABLED': False,
+    'CACHE_SHARED_STORAGE': f'sqlite:///{SHARED_CACHE_FILE}',
+    'CACHE_SYNC_INTERVAL': 0,
+})
+app = create_app(type('LocalCacheConfig', (TestingConfig,), {'METRICS_ENABLED': False}))
+worker_a = create_app(WorkerConfig)
+worker_b = create_app(WorkerConfig)
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            product = Product(name='Test Product', price=20.0, stock_level=50)
+            db.session.add(product)
+            db.session.commit()
+            self.product_id = product.id
+            get_cache().clear()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        for flask_app in (worker_a, worker_b):
+            flask_app.extensions.pop('cache', None)
+            flask_app.extensions.pop('shared_cache', None)
+        for path in glob.glob(os.path.join(app.root_path, f'{SHARED_CACHE_FILE}*')):
+            os.remove(path)
+
+    def test_stale_load_is_not_stored(self):
+        # Test that a row invalidated while it loads is returned but not cached
+        with app.app_context():
+            cache = get_cache()
+            def loader():
+                cache.delete('products', self.product_id)
+                return CachedRow({'price': 20.0}, 1, None)
+            self.assertEqual(read_through('products', self.product_id, loader).data, {'price': 20.0})
+            self.assertIsNone(cache.get('products', self.product_id))
+
+            # Test the same for a namespace dropped during the load
+            def namespace_loader():
+                cache.clear_namespace('products')
+                return CachedRow({'price': 20.0}, 1, None)
+            read_through('products', self.product_id, namespace_loader)
+            self.assertIsNone(cache.get('products', self.product_id))
+
+            # Test that an undisturbed load is cached
+            read_through('products', self.product_id, lambda: CachedRow({'price': 20.0}, 1, None))
+            self.assertIsNotNone(cache.get('products', self.product_id))
+
+    def test_hit_and_miss_counters(self):
+        # Test that lookups are counted by tier, namespace and result and exported
+        before = CACHE_REQUESTS.snapshot()
+        self.app.get(f'/product/{self.product_id}')
+        self.app.get(f'/product/{self.product_id}')
+        after = CACHE_REQUESTS.snapshot()
+        for result in ('hit', 'miss'):
+            key = (('namespace', 'products'), ('result', result), ('tier', 'local'))
+            self.assertEqual(after.get(key, 0) - before.get(key, 0), 1, result)
+        self.assertIn('cache_requests_total{namespace="products",result="hit",tier="local"}', render_prometheus())
+
+    def test_shared_tier_across_workers(self):
+        url = f'/product/{self.product_id}'
+        client_a, client_b = worker_a.test_client(), worker_b.test_client()
+        client_a.get(url)
+
+        # Test that another worker is served from the shared tier without SQL
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with worker_b.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                self.assertEqual(client_b.get(url).get_json()['price'], 20.0)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(statements, [])
+
+        # Test that an update in one worker drops the other worker's local copy
+        client_a.put(url, json={'price': 25.0})
+        self.assertEqual(client_b.get(url).get_json()['price'], 25.0)
+        client_a.post('/products/bulk', json=[{'name': 'Test Product', 'price': 30.0}])
+        self.assertEqual(client_b.get(url).get_json()['price'], 30.0)
+
+    def test_shared_tier_skips_stale_sets(self):
+        # Test that a value loaded before another worker's invalidation is not shared
+        with worker_a.app_context():
+            shared = get_shared_cache()
+            seen = shared.sync(get_cache())
+            shared.invalidate({('products', self.product_id)})
+            shared.set('products', self.product_id, CachedRow({'price': 20.0}, 1, None), seen)
+            self.assertIsNone(shared.get('products', self.product_id))
+            shared.set('products', self.product_id, CachedRow({'price': 20.0}, 1, None), shared.sync(get_cache()))
+            self.assertEqual(shared.get('products', self.product_id).data, {'price': 20.0})
+
+if __name__ == '__main__':
+    unittest.main()
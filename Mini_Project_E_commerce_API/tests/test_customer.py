@@ -1,8 +1,12 @@
 # tests/test_customer.py
 import unittest
-from app import app, db
+from app import create_app
+from app.database import db
+from config import TestingConfig
 from app.models import Customer
 
+app = create_app(TestingConfig)
+
 class CustomerTestCase(unittest.TestCase):
     def setUp(self):
         # Set up the test client and create the database tables
@@ -51,6 +55,7 @@ class CustomerTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(customer)
             db.session.commit()
+            db.session.refresh(customer)
 
         # Test reading the customer details
         response = self.app.get(f'/customer/{customer.id}')
@@ -63,6 +68,7 @@ class CustomerTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(customer)
             db.session.commit()
+            db.session.refresh(customer)
 
         # Test updating the customer details
         response = self.app.put(f'/customer/{customer.id}', json={
@@ -77,6 +83,7 @@ class CustomerTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(customer)
             db.session.commit()
+            db.session.refresh(customer)
 
         # Test deleting the customer
         response = self.app.delete(f'/customer/{customer.id}')
@@ -89,5 +96,27 @@ class CustomerTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn(b'Customer not found', response.data)
 
+    def test_upsert_customers_bulk(self):
+        # Add a customer that the batch will update
+        with app.app_context():
+            db.session.add(Customer(name='Old Name', email='existing@example.com', phone_number='+1234567890'))
+            db.session.commit()
+
+        # Test creating and updating customers in one request
+        response = self.app.post('/customers/bulk', json=[
+            {'name': 'New Name', 'email': 'existing@example.com', 'phone_number': '+1987654321'},
+            {'name': 'Jane Doe', 'email': 'janedoe@example.com', 'phone_number': '+1234567891'},
+            {'name': 'Bad Email', 'email': 'invalid-email', 'phone_number': '+1234567892'}
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual((body['created'], body['updated'], body['failed']), (1, 1, 1))
+        self.assertEqual([r['status'] for r in body['results']], [200, 201, 400])
+        with app.app_context():
+            customer = Customer.query.filter_by(email='existing@example.com').first()
+            self.assertEqual(customer.name, 'New Name')
+            self.assertEqual(customer.phone_number, '+1987654321')
+            self.assertEqual(Customer.query.count(), 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+# tests/test_fields.py
+import unittest
+from datetime import datetime
+from sqlalchemy import event
+from app import create_app
+from app.cache import get_cache
+from app.database import db
+from config import TestingConfig
+from app.models import Customer, CustomerAccount, Product, Order, OrderItem
+
+# Metrics are off so these requests do not show up in test_metrics' counters
+app = create_app(type('SparseFieldsConfig', (TestingConfig,), {'METRICS_ENABLED': False}))
+
+class SparseFieldsTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            products = [Product(name=f"Product {i}", price=10.0 + i, stock_level=100 - i) for i in range(3)]
+            db.session.add_all([customer, *products])
+            db.session.commit()
+            account = CustomerAccount(username="testuser", password="testpassword", customer_id=customer.id)
+            order = Order(order_date=datetime(2024, 1, 2), customer_id=customer.id)
+            db.session.add_all([account, order])
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, product_id=products[0].id, quantity=2))
+            db.session.commit()
+            self.customer_id, self.account_id, self.order_id = customer.id, account.id, order.id
+            self.product_id = products[0].id
+            get_cache().clear()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    # Function to send a GET and return the response with the SQL it ran
+    def get(self, url, **kwargs):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.app.get(url, **kwargs)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        return response, statements
+
+    def test_product_fields(self):
+        # Test that a cold read selects only the requested columns (plus the validators)
+        response, statements = self.get(f'/product/{self.product_id}?fields=name,id')
+        self.assertEqual(response.get_json(), {'id': self.product_id, 'name': 'Product 0'})
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn('price', statements[0])
+        self.assertNotIn('stock_level', statements[0])
+
+        # Test that each fieldset has its own ETag and answers 304 to it
+        etag = response.headers['ETag']
+        full = self.app.get(f'/product/{self.product_id}')
+        self.assertNotEqual(full.headers['ETag'], etag)
+        response = self.app.get(f'/product/{self.product_id}?fields=id,name', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Test that a cached full row is narrowed without a query
+        response, statements = self.get(f'/product/{self.product_id}?fields=price')
+        self.assertEqual(response.get_json(), {'price': 10.0})
+        self.assertEqual(statements, [])
+
+        # Test that unknown fields are rejected
+        response = self.app.get(f'/product/{self.product_id}?fields=id,cost')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'fields must be', response.data)
+
+    def test_list_products_fields(self):
+        # Test that pages carry only the requested fields, while sorting and cursors
+        # still work on columns left out of the output
+        response, statements = self.get('/products?fields=name&sort=-price&limit=2')
+        body = response.get_json()
+        self.assertEqual(body['products'], [{'name': 'Product 2'}, {'name': 'Product 1'}])
+        self.assertNotIn('stock_level', statements[0])
+        body = self.app.get(f"/products?fields=name&sort=-price&limit=2&cursor={body['next_cursor']}").get_json()
+        self.assertEqual(body, {'products': [{'name': 'Product 0'}], 'next_cursor': None})
+        self.assertEqual(self.app.get('/products?fields=').status_code, 400)
+
+    def test_customer_and_account_fields(self):
+        # Test sparse customer reads
+        response = self.app.get(f'/customer/{self.customer_id}?fields=email')
+        self.assertEqual(response.get_json(), {'email': 'testcustomer@example.com'})
+
+        # Test that an account read without customer fields never reads the customer
+        response, statements = self.get(f'/customer_account/{self.account_id}?fields=username')
+        self.assertEqual(response.get_json(), {'username': 'testuser'})
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn('customers', statements[0])
+
+        # Test that nested customer fields select only those columns
+        response, statements = self.get(f'/customer_account/{self.account_id}?fields=account_id,customer.name')
+        self.assertEqual(response.get_json(), {'account_id': self.account_id, 'customer': {'name': 'Test Customer'}})
+        self.assertNotIn('email', statements[-1])
+        response = self.app.get(f'/customer_account/{self.account_id}?fields=customer')
+        self.assertEqual(set(response.get_json()['customer']), {'name', 'email', 'phone_number'})
+
+    def test_order_fields(self):
+        # Test that an order read without items skips the items query
+        response, statements = self.get(f'/order/{self.order_id}?fields=order_id,order_date')
+        self.assertEqual(response.get_json(), {'order_id': self.order_id, 'order_date': '2024-01-02T00:00:00'})
+        self.assertEqual(len(statements), 1)
+
+        # Test items alone, and the total of an expanded read
+        response = self.app.get(f'/order/{self.order_id}?fields=order_items')
+        self.assertEqual(response.get_json(), {'order_items': [{'product_id': self.product_id, 'quantity': 2}]})
+        response = self.app.get(f'/order/{self.order_id}?expand=items.product&fields=order_total')
+        self.assertEqual(response.get_json(), {'order_total': 20.0})
+        self.assertEqual(self.app.get(f'/order/{self.order_id}?fields=order_total').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# tests/test_idempotency.py
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from app import create_app
+from app.database import db
+from app import idempotency
+from app.idempotency import purge_expired_keys, wait_for_key
+from config import TestingConfig
+from app.models import Customer, Product, Order, IdempotencyKey
+
+app = create_app(TestingConfig)
+
+class IdempotencyTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            self.customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            self.product = Product(name="Test Product", price=10.0, stock_level=100)
+            db.session.add_all([self.customer, self.product])
+            db.session.commit()
+            db.session.refresh(self.customer)
+            db.session.refresh(self.product)
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def order_body(self, quantity=2):
+        return {'customer_id': self.customer.id, 'order_items': [{'product_id': self.product.id, 'quantity': quantity}]}
+
+    def stock_level(self):
+        with app.app_context():
+            return Product.query.get(self.product.id).stock_level
+
+    def test_repeated_order_is_replayed(self):
+        # Test that a retry with the same key returns the first response without a second order
+        first = self.app.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-1'})
+        self.assertEqual(first.status_code, 201)
+        second = self.app.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-1'})
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.stock_level(), 98)
+        with app.app_context():
+            self.assertEqual(Order.query.count(), 1)
+
+        # Test that a new key and a request without a key both create orders
+        self.assertEqual(self.app.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-2'}).status_code, 201)
+        self.assertEqual(self.app.post('/order', json=self.order_body()).status_code, 201)
+        self.assertEqual(self.stock_level(), 94)
+
+    def test_key_reused_with_different_body(self):
+        # Test that a key cannot be replayed for a different request
+        self.app.post('/order', json=self.order_body(2), headers={'Idempotency-Key': 'order-1'})
+        response = self.app.post('/order', json=self.order_body(3), headers={'Idempotency-Key': 'order-1'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.stock_level(), 98)
+
+        # Test that keys are scoped to the route
+        response = self.app.post('/customer', json={'name': 'Other', 'email': 'other@example.com', 'phone_number': '+1234567891'},
+                                 headers={'Idempotency-Key': 'order-1'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_repeated_customer_is_replayed(self):
+        # Test that POST /customer replays its first response too
+        body = {'name': 'New Customer', 'email': 'new@example.com', 'phone_number': '+1234567891'}
+        first = self.app.post('/customer', json=body, headers={'Idempotency-Key': 'customer-1'})
+        second = self.app.post('/customer', json=body, headers={'Idempotency-Key': 'customer-1'})
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.get_json()['customer_id'], first.get_json()['customer_id'])
+
+        # Test that a key that is too long is rejected
+        response = self.app.post('/customer', json=body, headers={'Idempotency-Key': 'k' * 256})
+        self.assertEqual(response.status_code, 400)
+
+    def test_abandoned_and_expired_keys(self):
+        # Test that a claim whose request never finished can be taken over, and
+        # that expired keys run the handler again and are purged
+        now = datetime.utcnow()
+        first = self.app.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-1'})
+        with app.app_context():
+            key = IdempotencyKey.query.one()
+            key.status_code, key.response_body, key.locked_until = None, None, now - timedelta(seconds=1)
+            db.session.commit()
+        client = app.test_client()
+        second = client.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-1'})
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(second.get_json()['order_id'], first.get_json()['order_id'])
+
+        with app.app_context():
+            IdempotencyKey.query.update({IdempotencyKey.expires_at: now - timedelta(seconds=1)})
+            db.session.commit()
+            self.assertEqual(purge_expired_keys(), 1)
+            self.assertEqual(IdempotencyKey.query.count(), 0)
+
+    def test_concurrent_duplicates_run_once(self):
+        # Test that duplicates sent at the same time create one order and all get its response
+        responses = []
+
+        def send():
+            client = app.test_client()
+            response = client.post('/order', json=self.order_body(), headers={'Idempotency-Key': 'order-1'})
+            responses.append((response.status_code, response.get_json()))
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({status for status, _ in responses}, {201})
+        self.assertEqual(len({body['order_id'] for _, body in responses}), 1)
+        self.assertEqual(self.stock_level(), 98)
+
+    def test_same_worker_duplicate_waits_on_event(self):
+        # Test that a duplicate of a request running in this process wakes up when
+        # it finishes instead of sleeping out the poll interval
+        done = threading.Event()
+        idempotency._in_flight['key'] = done
+        threading.Timer(0.05, done.set).start()
+        try:
+            start = time.monotonic()
+            wait_for_key('key', 10, start + 5)
+            self.assertLess(time.monotonic() - start, 1)
+        finally:
+            idempotency._in_flight.pop('key', None)
+
+        # Test that a wait for another process never runs past the deadline
+        start = time.monotonic()
+        wait_for_key('other', 10, start + 0.05)
+        self.assertLess(time.monotonic() - start, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# tests/test_index_audit.py
+import subprocess
+import sys
+import unittest
+from app import create_app
+from app.database import db
+from app.index_audit import audit_indexes, is_covered
+from config import TestingConfig
+
+app = create_app(TestingConfig)
+
+class IndexAuditTestCase(unittest.TestCase):
+    def setUp(self):
+        # Create the database tables from the models
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_schema_has_no_gaps(self):
+        # Test that every foreign key and declared index is backed by an index
+        with app.app_context():
+            self.assertEqual(audit_indexes(db.engine, db.metadata), [])
+
+    def test_reports_missing_foreign_key_index(self):
+        # Test that dropping a foreign key index is reported
+        with app.app_context():
+            db.session.execute('DROP INDEX ix_order_items_order_id')
+            db.session.commit()
+            gaps = audit_indexes(db.engine, db.metadata)
+        self.assertIn(('order_items', ('order_id',), 'foreign key to orders'), gaps)
+
+    def test_leading_columns_cover_lookup(self):
+        # Test that a composite index serves lookups on its leading columns only
+        indexes = [('customer_id', 'order_date', 'id')]
+        self.assertTrue(is_covered(('customer_id',), indexes))
+        self.assertFalse(is_covered(('order_date',), indexes))
+
+    def test_cli_command(self):
+        # Test the flask index-audit command on a fully indexed schema
+        result = app.test_cli_runner().invoke(args=['index-audit'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('backed by an index', result.output)
+
+    def test_command_loaded_on_use(self):
+        # Test that building an app in a fresh interpreter leaves the command's module unimported
+        script = 'import sys; from app import create_app; create_app(); print("app.index_audit" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', script], cwd=app.root_path, check=True,
+                                capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+# tests/test_inventory.py
+import json
+import random
+import threading
+import unittest
+from app import create_app
+from app.database import db
+from app.inventory import diff_quantities, apply_stock_deltas, load_stock_levels, shard_stock, rebalance_stock
+from config import TestingConfig
+from app.models import Customer, Product, Order, OrderItem, StockShard
+from sqlalchemy import func
+
+app = create_app(TestingConfig)
+# Metrics are off so these requests do not show up in test_metrics' process-wide counters
+sharded_app = create_app(type('ShardedStockConfig', (TestingConfig,), {'STOCK_SHARDS': 4, 'METRICS_ENABLED': False}))
+
+class InventoryTests:
+    # Shared tests, run with stock in the product rows and in shard counters
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = self.flask_app.test_client()
+        self.app.testing = True
+        with self.flask_app.app_context():
+            db.create_all()
+            self.customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            self.products = [Product(name=f"Product {n}", price=10.0, stock_level=30) for n in range(3)]
+            db.session.add(self.customer)
+            db.session.add_all(self.products)
+            db.session.commit()
+            for instance in [self.customer] + self.products:
+                db.session.refresh(instance)
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with self.flask_app.app_context():
+            db.session.remove()
+            db.drop_all()
+            self.flask_app.extensions.pop('cache', None)
+
+    def stock_levels(self):
+        with self.flask_app.app_context():
+            return load_stock_levels(product.id for product in self.products)
+
+    def ordered_quantities(self):
+        with self.flask_app.app_context():
+            return dict(db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+                        .group_by(OrderItem.product_id).all())
+
+    def place_order(self, quantities):
+        response = self.app.post('/order', json={
+            'customer_id': self.customer.id,
+            'order_items': [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in quantities.items()]
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['order_id']
+
+    def test_diff_quantities(self):
+        # Test that only changed products appear, with positive deltas taking stock
+        self.assertEqual(diff_quantities({1: 2, 2: 5, 3: 1}, {1: 2, 2: 3, 4: 4}), {2: -2, 3: -1, 4: 4})
+        self.assertEqual(diff_quantities({1: 2}, {1: 2}), {})
+
+    def test_apply_stock_deltas_is_all_or_nothing(self):
+        # Test that a shortfall on one product is reported without touching the others
+        first, second = self.products[0].id, self.products[1].id
+        with self.flask_app.app_context():
+            self.assertFalse(apply_stock_deltas({first: 5, second: 31}))
+            db.session.rollback()
+            self.assertTrue(apply_stock_deltas({first: 5, second: -3}))
+            db.session.commit()
+        levels = self.stock_levels()
+        self.assertEqual(levels[first], 25)
+        self.assertEqual(levels[second], 33)
+
+    def test_update_order_applies_net_change(self):
+        # Test that shrinking, growing, adding and removing lines restock correctly
+        first, second, third = (product.id for product in self.products)
+        order_id = self.place_order({first: 5, second: 5})
+        response = self.app.put(f'/order/{order_id}', json={'order_items': [
+            {'product_id': first, 'quantity': 2},
+            {'product_id': third, 'quantity': 4},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock_levels(), {first: 28, second: 30, third: 26})
+        self.assertEqual(self.ordered_quantities(), {first: 2, third: 4})
+
+        # Test that an update needing more stock than is left changes nothing
+        response = self.app.put(f'/order/{order_id}', json={'order_items': [{'product_id': first, 'quantity': 31}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock_levels(), {first: 28, second: 30, third: 26})
+
+        # Test that an update can use the stock its own order already holds
+        response = self.app.put(f'/order/{order_id}', json={'order_items': [{'product_id': third, 'quantity': 30}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock_levels(), {first: 30, second: 30, third: 0})
+
+        # Test unknown products and orders
+        response = self.app.put(f'/order/{order_id}', json={'order_items': [{'product_id': 999, 'quantity': 1}]})
+        self.assertEqual(response.status_code, 404)
+        response = self.app.put('/order/999', json={'order_items': [{'product_id': first, 'quantity': 1}]})
+        self.assertEqual(response.status_code, 404)
+
+    def test_concurrent_updates_never_oversell_or_drift(self):
+        # Test that racing creates, updates and deletes keep stock plus ordered
+        # quantities equal to the starting stock, with no product below zero
+        product_ids = [product.id for product in self.products]
+        order_ids = [self.place_order({product_id: 1}) for product_id in product_ids * 4]
+        failures = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = self.flask_app.test_client()
+            try:
+                for _ in range(25):
+                    lines = [{'product_id': product_id, 'quantity': rng.randint(1, 6)}
+                             for product_id in rng.sample(product_ids, rng.randint(1, len(product_ids)))]
+                    action = rng.random()
+                    if action < 0.7:
+                        client.put(f'/order/{rng.choice(order_ids)}', json={'order_items': lines})
+                    elif action < 0.95:
+                        client.post('/order', json={'customer_id': self.customer.id, 'order_items': lines})
+                    else:
+                        client.delete(f'/order/{rng.choice(order_ids)}')
+            except Exception as e:
+                failures.append(e)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+        levels = self.stock_levels()
+        ordered = self.ordered_quantities()
+        for product_id in product_ids:
+            self.assertGreaterEqual(levels[product_id], 0)
+            self.assertEqual(levels[product_id] + ordered.get(product_id, 0), 30)
+        with self.flask_app.app_context():
+            # No item may outlive its order
+            orphans = OrderItem.query.filter(~OrderItem.order_id.in_(db.session.query(Order.id))).count()
+        self.assertEqual(orphans, 0)
+
+class InventoryTestCase(InventoryTests, unittest.TestCase):
+    flask_app = app
+
+class ShardedInventoryTestCase(InventoryTests, unittest.TestCase):
+    flask_app = sharded_app
+
+    def setUp(self):
+        # Spread every product's stock over four shard counters
+        super().setUp()
+        with self.flask_app.app_context():
+            for product in self.products:
+                self.assertTrue(shard_stock(product.id, 4))
+            db.session.commit()
+
+    def shard_quantities(self, product_id):
+        with self.flask_app.app_context():
+            return [quantity for (quantity,) in db.session.query(StockShard.quantity)
+                    .filter_by(product_id=product_id).order_by(StockShard.shard)]
+
+    def test_shard_and_rebalance(self):
+        # Test that sharding moves the stock out of the product row and that a
+        # rebalance spreads it evenly again
+        product_id = self.products[0].id
+        self.assertEqual(self.shard_quantities(product_id), [8, 8, 7, 7])
+        with self.flask_app.app_context():
+            self.assertEqual(Product.query.get(product_id).stock_level, 0)
+            StockShard.query.filter_by(product_id=product_id, shard=0).update({StockShard.quantity: 0})
+            self.assertTrue(rebalance_stock(product_id, take=2))
+            db.session.commit()
+        self.assertEqual(self.shard_quantities(product_id), [5, 5, 5, 5])
+
+    def test_reads_sum_the_shards(self):
+        # Test that product reads report the summed stock and that the ETag changes
+        # when only a shard moves
+        product_id = self.products[0].id
+        response = self.app.get(f'/product/{product_id}')
+        self.assertEqual(response.get_json()['stock_level'], 30)
+        etag = response.headers['ETag']
+        self.place_order({product_id: 3})
+        response = self.app.get(f'/product/{product_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['stock_level'], 27)
+        response = self.app.get('/products?sort=-stock_level&limit=1&min_stock=28')
+        self.assertEqual([product['stock_level'] for product in response.get_json()['products']], [30])
+
+        # Test that setting the stock level replaces the sharded stock
+        self.assertEqual(self.app.put(f'/product/{product_id}', json={'stock_level': 12}).status_code, 200)
+        self.assertEqual(self.stock_levels()[product_id], 12)
+
+    def test_checkout_within_query_budget(self):
+        # Test that a checkout of several sharded products, with an Idempotency-Key,
+        # stays within create_order's budget extended by the shard updates
+        response = self.app.post('/order', headers={'Idempotency-Key': 'sharded-checkout'}, json={
+            'customer_id': self.customer.id,
+            'order_items': [{'product_id': product.id, 'quantity': 1} for product in self.products]
+        })
+        self.assertEqual(response.status_code, 201)
+
+        # Test the same when a short shard falls back to a rebalance
+        product_id = self.products[0].id
+        with self.flask_app.app_context():
+            StockShard.query.filter_by(product_id=product_id).update({StockShard.quantity: 0})
+            Product.query.filter_by(id=product_id).update({Product.stock_level: 5})
+            db.session.commit()
+        self.place_order({product.id: 2 for product in self.products})
+        self.assertEqual(self.stock_levels()[product_id], 3)
+
+    def test_export_search_and_analytics_sum_the_shards(self):
+        # Test that the export reports the summed stock
+        expected = {product.id: 30 for product in self.products}
+        rows = [json.loads(line) for line in self.app.get('/products/export').data.decode().splitlines()]
+        self.assertEqual({row['id']: row['stock_level'] for row in rows}, expected)
+
+        # Test that every search backend and path (prefix, substring, fuzzy) does too
+        for backend in ('fts5', 'memory'):
+            self.flask_app.extensions['search_backend'] = backend
+            try:
+                for query in ('product', 'roduct', 'producs'):
+                    products = self.app.get(f'/products/search?q={query}').get_json()['products']
+                    self.assertEqual({product['id']: product['stock_level'] for product in products}, expected,
+                                     (backend, query))
+            finally:
+                self.flask_app.extensions.pop('search_backend', None)
+                self.flask_app.extensions.pop('search_index', None)
+
+        # Test that the stock turnover report does too
+        products = self.app.get('/analytics/stock-turnover').get_json()['products']
+        self.assertEqual({product['product_id']: product['stock_level'] for product in products}, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_metrics.py
+import unittest
+from app import create_app
+from app.database import db
+from config import TestingConfig
+from app.models import Product
+
+app = create_app(TestingConfig)
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            product = Product(name='Test Product', price=20.0, stock_level=50)
+            db.session.add(product)
+            db.session.commit()
+            db.session.refresh(product)
+            self.product_id = product.id
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_metrics_record_route_latency_and_sql(self):
+        # Make a request that issues SQL, then read the metrics
+        self.app.get(f'/product/{self.product_id}')
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.data.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/product/<int:id>"}', body)
+        self.assertIn('http_requests_total{method="GET",route="/product/<int:id>",status="200"}', body)
+        self.assertIn('sql_statements_per_request_bucket{route="/product/<int:id>",le="+Inf"} 1', body)
+
+    def test_metrics_exclude_metrics_endpoint(self):
+        # Test that scraping /metrics does not record itself
+        self.app.get('/metrics')
+        body = self.app.get('/metrics').data.decode()
+        self.assertNotIn('route="/metrics"', body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
 # tests/test_order.py
 import unittest
-from app import app, db
+from sqlalchemy import event
+from app import create_app
+from app.database import db
+from config import TestingConfig
 from app.models import Customer, Product, Order, OrderItem
 from datetime import datetime
 
+app = create_app(TestingConfig)
+
 class OrderTestCase(unittest.TestCase):
     def setUp(self):
         # Set up the test client and create the database tables
@@ -18,6 +23,8 @@ class OrderTestCase(unittest.TestCase):
             self.product = Product(name="Test Product", price=10.0, stock_level=100)
             db.session.add(self.product)
             db.session.commit()
+            db.session.refresh(self.customer)
+            db.session.refresh(self.product)
 
     def tearDown(self):
         # Clean up and drop the tables after each test
@@ -53,6 +60,101 @@ class OrderTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn(b'Insufficient stock', response.data)
 
+    def test_create_order_nonexistent_product(self):
+        # Test creating an order that references a product that does not exist
+        response = self.app.post('/order', json={
+            'customer_id': self.customer.id,
+            'order_items': [
+                {
+                    'product_id': 999,  # Nonexistent product ID
+                    'quantity': 1
+                }
+            ]
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'Product with ID 999 not found', response.data)
+
+    def test_create_order_takes_stock_once_per_product(self):
+        # Test that repeated lines for one product are checked and taken together
+        response = self.app.post('/order', json={
+            'customer_id': self.customer.id,
+            'order_items': [
+                {'product_id': self.product.id, 'quantity': 60},
+                {'product_id': self.product.id, 'quantity': 60}
+            ]
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'Insufficient stock', response.data)
+
+        response = self.app.post('/order', json={
+            'customer_id': self.customer.id,
+            'order_items': [
+                {'product_id': self.product.id, 'quantity': 30},
+                {'product_id': self.product.id, 'quantity': 20}
+            ]
+        })
+        self.assertEqual(response.status_code, 201)
+        with app.app_context():
+            self.assertEqual(Product.query.get(self.product.id).stock_level, 50)
+
+    def test_read_product_reflects_order_stock(self):
+        # Read the product once so it is cached, then place an order for it
+        self.assertEqual(self.app.get(f'/product/{self.product.id}').get_json()['stock_level'], 100)
+        self.app.post('/order', json={
+            'customer_id': self.customer.id,
+            'order_items': [{'product_id': self.product.id, 'quantity': 10}]
+        })
+
+        # Test that the stock taken by the order is visible immediately
+        self.assertEqual(self.app.get(f'/product/{self.product.id}').get_json()['stock_level'], 90)
+
+    def test_create_orders_bulk(self):
+        # Test creating several orders at once with partial success
+        response = self.app.post('/orders/bulk', json=[
+            {'customer_id': self.customer.id, 'order_items': [{'product_id': self.product.id, 'quantity': 60}]},
+            {'customer_id': self.customer.id, 'order_items': [{'product_id': self.product.id, 'quantity': 60}]},
+            {'customer_id': 999, 'order_items': [{'product_id': self.product.id, 'quantity': 1}]},
+            {'customer_id': self.customer.id, 'order_items': [{'product_id': 999, 'quantity': 1}]},
+            {'customer_id': self.customer.id},
+            {'customer_id': self.customer.id, 'order_items': [{'product_id': self.product.id, 'quantity': 40}]}
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual([r['status'] for r in body['results']], [201, 400, 404, 404, 400, 201])
+        with app.app_context():
+            self.assertEqual(Product.query.get(self.product.id).stock_level, 0)
+            self.assertEqual(Order.query.count(), 2)
+            self.assertEqual(OrderItem.query.filter_by(order_id=body['results'][5]['order_id']).first().quantity, 40)
+
+    def test_create_orders_bulk_batches_inserts(self):
+        # Test that a batch of orders is written with one INSERT statement, not one per order
+        inserts = []
+        def listener(conn, cursor, statement, params, context, executemany):
+            if statement.startswith('INSERT INTO orders'):
+                inserts.append(executemany)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.app.post('/orders/bulk', json=[
+                    {'customer_id': self.customer.id, 'order_items': [{'product_id': self.product.id, 'quantity': 1}]}
+                    for _ in range(5)
+                ])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(inserts, [True])
+
+        # Test that each result carries the id of its own order
+        with app.app_context():
+            for result in response.get_json()['results']:
+                self.assertEqual(Order.query.get(result['order_id']).customer_id, self.customer.id)
+            self.assertEqual(len({result['order_id'] for result in response.get_json()['results']}), 5)
+
+    def test_create_orders_bulk_invalid_body(self):
+        # Test bulk creation with a body that is not a list
+        response = self.app.post('/orders/bulk', json={'customer_id': self.customer.id})
+        self.assertEqual(response.status_code, 400)
+
     def test_read_order(self):
         # Add an order for the test
         order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
@@ -62,12 +164,80 @@ class OrderTestCase(unittest.TestCase):
             order_item = OrderItem(order_id=order.id, product_id=self.product.id, quantity=2)
             db.session.add(order_item)
             db.session.commit()
+            db.session.refresh(order)
         
         # Test reading the order details
         response = self.app.get(f'/order/{order.id}')
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['order_items'], [{'product_id': self.product.id, 'quantity': 2}])
+
+    def test_read_order_expanded(self):
+        # Add an order for the test
+        order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
+        with app.app_context():
+            db.session.add(order)
+            db.session.flush()
+            order_item = OrderItem(order_id=order.id, product_id=self.product.id, quantity=2)
+            db.session.add(order_item)
+            db.session.commit()
+            db.session.refresh(order)
+        
+        # Test reading the order details with embedded products
+        response = self.app.get(f'/order/{order.id}?expand=items.product')
+        self.assertEqual(response.status_code, 200)
         self.assertIn(b'Test Product', response.data)
 
+    def test_read_order_expanded_totals(self):
+        # Add an order with two lines for the test
+        with app.app_context():
+            other = Product(name="Other Product", price=2.5, stock_level=10)
+            db.session.add(other)
+            order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, product_id=self.product.id, quantity=2))
+            db.session.add(OrderItem(order_id=order.id, product_id=other.id, quantity=4))
+            db.session.commit()
+            order_id = order.id
+
+        # Test that line and order totals come back with the embedded products
+        response = self.app.get(f'/order/{order_id}?expand=items.product')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([item['line_total'] for item in body['order_items']], [20.0, 10.0])
+        self.assertEqual(body['order_items'][1]['product']['name'], 'Other Product')
+        self.assertEqual(body['order_total'], 30.0)
+
+        # Test that an unknown expansion is rejected
+        response = self.app.get(f'/order/{order_id}?expand=customer')
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_customer_orders(self):
+        # Add three orders on different days for the test
+        with app.app_context():
+            for day in (1, 3, 2):
+                order = Order(order_date=datetime(2024, 1, day), customer_id=self.customer.id)
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=self.product.id, quantity=day))
+            db.session.commit()
+
+        # Test that pages come back newest first and the cursor continues the walk
+        response = self.app.get(f'/customer/{self.customer.id}/orders?limit=2&expand=items.product')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([order['order_total'] for order in body['orders']], [30.0, 20.0])
+        self.assertIsNotNone(body['next_cursor'])
+        response = self.app.get(f'/customer/{self.customer.id}/orders?limit=2&cursor={body["next_cursor"]}')
+        body = response.get_json()
+        self.assertEqual(len(body['orders']), 1)
+        self.assertNotIn('order_items', body['orders'][0])
+        self.assertIsNone(body['next_cursor'])
+
+        # Test an unknown customer and a malformed cursor
+        self.assertEqual(self.app.get('/customer/999/orders').status_code, 404)
+        self.assertEqual(self.app.get(f'/customer/{self.customer.id}/orders?cursor=bogus').status_code, 400)
+
     def test_update_order(self):
         # Add an order for the test
         order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
@@ -77,6 +247,7 @@ class OrderTestCase(unittest.TestCase):
             order_item = OrderItem(order_id=order.id, product_id=self.product.id, quantity=2)
             db.session.add(order_item)
             db.session.commit()
+            db.session.refresh(order)
         
         # Test updating the order
         response = self.app.put(f'/order/{order.id}', json={
@@ -90,6 +261,26 @@ class OrderTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Order updated successfully', response.data)
 
+    def test_read_order_conditional_get(self):
+        # Add an order for the test
+        order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
+        with app.app_context():
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, product_id=self.product.id, quantity=2))
+            db.session.commit()
+            db.session.refresh(order)
+
+        # Test that an unchanged order returns 304
+        etag = self.app.get(f'/order/{order.id}').headers['ETag']
+        response = self.app.get(f'/order/{order.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Test that replacing the order items changes the ETag
+        self.app.put(f'/order/{order.id}', json={'order_items': [{'product_id': self.product.id, 'quantity': 1}]})
+        response = self.app.get(f'/order/{order.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
     def test_delete_order(self):
         # Add an order for the test
         order = Order(order_date=datetime.utcnow(), customer_id=self.customer.id)
@@ -99,6 +290,7 @@ class OrderTestCase(unittest.TestCase):
             order_item = OrderItem(order_id=order.id, product_id=self.product.id, quantity=2)
             db.session.add(order_item)
             db.session.commit()
+            db.session.refresh(order)
         
         # Test deleting the order
         response = self.app.delete(f'/order/{order.id}')
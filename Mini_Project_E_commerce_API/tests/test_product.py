@@ -1,8 +1,17 @@
 # tests/test_product.py
+import base64
+import json
 import unittest
-from app import app, db
+from unittest import mock
+from app import create_app
+from app.routes import product_routes
+from app.database import db
+from app.pagination import encode_cursor
+from config import TestingConfig
 from app.models import Product
 
+app = create_app(TestingConfig)
+
 class ProductTestCase(unittest.TestCase):
     def setUp(self):
         # Set up the test client and create the database tables
@@ -51,6 +60,7 @@ class ProductTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(product)
             db.session.commit()
+            db.session.refresh(product)
 
         # Test reading the product details
         response = self.app.get(f'/product/{product.id}')
@@ -63,6 +73,7 @@ class ProductTestCase(unittest.TestCase):
         with app.app_context():
             db.session.add(product)
             db.session.commit()
+            db.session.refresh(product)
 
         # Test updating the product details
         response = self.app.put(f'/product/{product.id}', json={
@@ -72,12 +83,82 @@ class ProductTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Product updated successfully', response.data)
 
+    def test_read_product_after_update(self):
+        # Add a product and read it once so it is cached
+        product = Product(name='Test Product', price=20.0, stock_level=50)
+        with app.app_context():
+            db.session.add(product)
+            db.session.commit()
+            db.session.refresh(product)
+        self.assertEqual(self.app.get(f'/product/{product.id}').get_json()['price'], 20.0)
+
+        # Test that updates invalidate the cached copy
+        self.app.put(f'/product/{product.id}', json={'price': 25.0})
+        self.assertEqual(self.app.get(f'/product/{product.id}').get_json()['price'], 25.0)
+
+        # Test that bulk upserts invalidate the cached copy
+        self.app.post('/products/bulk', json=[{'name': 'Test Product', 'price': 30.0}])
+        self.assertEqual(self.app.get(f'/product/{product.id}').get_json()['price'], 30.0)
+
+    def test_read_product_conditional_get(self):
+        # Add a product for the test
+        product = Product(name='Test Product', price=20.0, stock_level=50)
+        with app.app_context():
+            db.session.add(product)
+            db.session.commit()
+            db.session.refresh(product)
+
+        # Test that a matching If-None-Match returns 304 with no body
+        response = self.app.get(f'/product/{product.id}')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+        response = self.app.get(f'/product/{product.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        # Test that any change to the row produces a new ETag
+        self.app.put(f'/product/{product.id}', json={'stock_level': 10})
+        response = self.app.get(f'/product/{product.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_list_products_conditional_get(self):
+        # Add a product for the test
+        with app.app_context():
+            db.session.add(Product(name='Test Product', price=20.0, stock_level=50))
+            db.session.commit()
+
+        # Test that an unchanged page returns 304
+        etag = self.app.get('/products').headers['ETag']
+        response = self.app.get('/products', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Test that If-None-Match uses the weak comparison
+        response = self.app.get('/products', headers={'If-None-Match': f'W/{etag}'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_products_conditional_get_next_cursor(self):
+        # Add products that exactly fill a page
+        with app.app_context():
+            db.session.add_all([Product(name=f'Product {i}', price=20.0, stock_level=50) for i in range(2)])
+            db.session.commit()
+        response = self.app.get('/products?limit=2')
+        self.assertIsNone(response.get_json()['next_cursor'])
+
+        # Test that a product added after the full page makes it stale, so the
+        # client learns about the next page
+        self.app.post('/product', json={'name': 'Product 2', 'price': 20.0})
+        response = self.app.get('/products?limit=2', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.get_json()['next_cursor'])
+
     def test_delete_product(self):
         # Add a product for the test
         product = Product(name='Test Product', price=20.0, stock_level=50)
         with app.app_context():
             db.session.add(product)
             db.session.commit()
+            db.session.refresh(product)
 
         # Test deleting the product
         response = self.app.delete(f'/product/{product.id}')
@@ -90,5 +171,135 @@ class ProductTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn(b'Product not found', response.data)
 
+    def test_list_products_pagination(self):
+        # Add products for the test
+        with app.app_context():
+            for i in range(5):
+                db.session.add(Product(name=f'Product {i}', price=10.0 + i, stock_level=i))
+            db.session.commit()
+
+        # Walk the catalog two products at a time using the cursor
+        seen = []
+        cursor = None
+        while True:
+            url = '/products?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            response = self.app.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.get_json()
+            seen.extend(p['name'] for p in page['products'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, [f'Product {i}' for i in range(5)])
+
+    def test_list_products_filter_and_sort(self):
+        # Add products for the test
+        with app.app_context():
+            for i in range(5):
+                db.session.add(Product(name=f'Product {i}', price=10.0 + i, stock_level=i))
+            db.session.commit()
+
+        # Test filtering by price range and sorting by price descending
+        response = self.app.get('/products?min_price=11&max_price=13&sort=-price&limit=2')
+        self.assertEqual(response.status_code, 200)
+        page = response.get_json()
+        self.assertEqual([p['price'] for p in page['products']], [13.0, 12.0])
+
+        response = self.app.get(f"/products?min_price=11&max_price=13&sort=-price&limit=2&cursor={page['next_cursor']}")
+        page = response.get_json()
+        self.assertEqual([p['price'] for p in page['products']], [11.0])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_list_products_invalid_cursor(self):
+        # Test listing products with a malformed cursor
+        response = self.app.get('/products?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'Invalid cursor', response.data)
+
+        # Test that well-formed cursors with values of the wrong shape or count are rejected too
+        for values in ([{'a': 1}], [[1]], [True], [1, 2]):
+            response = self.app.get(f"/products?cursor={encode_cursor('id', values)}")
+            self.assertEqual(response.status_code, 400, values)
+            self.assertIn(b'Invalid cursor', response.data)
+        for payload in (b'[1]', b'{"s":"id","v":null}', b'{"s":"id","v":"1"}'):
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            self.assertEqual(self.app.get(f'/products?cursor={cursor}').status_code, 400, payload)
+
+    def test_export_products(self):
+        # Add products for the test
+        with app.app_context():
+            for i in range(3):
+                db.session.add(Product(name=f'Product {i}', price=10.0 + i, stock_level=i))
+            db.session.commit()
+
+        # Test exporting the catalog as NDJSON
+        response = self.app.get('/products/export')
+        self.assertEqual(response.status_code, 200)
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['name'], 'Product 0')
+
+        # Test exporting the catalog as CSV
+        response = self.app.get('/products/export?format=csv')
+        self.assertEqual(response.status_code, 200)
+        lines = response.data.decode().splitlines()
+        self.assertEqual(lines[0], 'id,name,price,stock_level')
+        self.assertEqual(len(lines), 4)
+
+    def test_export_products_streams_first_row(self):
+        # Add products for the test
+        with app.app_context():
+            for i in range(3):
+                db.session.add(Product(name=f'Product {i}', price=10.0 + i, stock_level=i))
+            db.session.commit()
+
+        # Test that the header and first row arrive in the first chunk, before a full batch
+        response = self.app.get('/products/export?format=csv', buffered=False)
+        first_chunk = next(response.response).decode()
+        self.assertEqual(first_chunk.splitlines(), ['id,name,price,stock_level', '1,Product 0,10.0,0'])
+        response.close()
+
+    def test_export_products_error_marker(self):
+        # Add products for the test
+        with app.app_context():
+            for i in range(3):
+                db.session.add(Product(name=f'Product {i}', price=10.0 + i, stock_level=i))
+            db.session.commit()
+
+        # Test that a failure mid-stream ends the export with an error line
+        failing = mock.Mock(side_effect=[product_routes.ndjson_line((1, 'Product 0', 10.0, 0)), RuntimeError('boom')])
+        with mock.patch.object(product_routes, 'ndjson_line', failing):
+            response = self.app.get('/products/export')
+        lines = response.data.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[-1]), {'error': 'Export failed'})
+
+    def test_export_products_invalid_format(self):
+        # Test exporting with an unsupported format
+        response = self.app.get('/products/export?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_upsert_products_bulk(self):
+        # Add a product that the batch will update
+        with app.app_context():
+            db.session.add(Product(name='Existing Product', price=5.0, stock_level=5))
+            db.session.commit()
+
+        # Test creating and updating products in one request
+        response = self.app.post('/products/bulk', json=[
+            {'name': 'Existing Product', 'price': 7.5, 'stock_level': 20},
+            {'name': 'New Product', 'price': 3.0},
+            {'name': 'New Product', 'price': 4.0},
+            {'name': 'Bad Product', 'price': -1.0}
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual((body['created'], body['updated'], body['failed']), (1, 1, 2))
+        self.assertEqual([r['status'] for r in body['results']], [200, 201, 400, 400])
+        with app.app_context():
+            product = Product.query.filter_by(name='Existing Product').first()
+            self.assertEqual((product.price, product.stock_level), (7.5, 20))
+            self.assertEqual(Product.query.filter_by(name='New Product').first().stock_level, 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,62 @@
+# tests/test_query_debug.py
+import unittest
+from flask import jsonify
+from app import create_app
+from app.database import db
+from app.models import Product
+from app.query_debug import query_budget, QueryBudgetExceeded
+from config import TestingConfig
+
+app = create_app(TestingConfig)
+
+# Route that loads products one at a time, the classic N+1 pattern
+@query_budget(3)
+def load_products_one_by_one():
+    names = [Product.query.get(product_id).name for product_id in range(1, 7)]
+    return jsonify(names)
+
+app.add_url_rule('/_test/products_one_by_one', view_func=load_products_one_by_one)
+
+class QueryDebugTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            for i in range(6):
+                db.session.add(Product(name=f'Product {i}', price=1.0, stock_level=1))
+            db.session.commit()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        app.config['QUERY_BUDGET_ENFORCE'] = True
+        app.config['SLOW_QUERY_THRESHOLD_MS'] = TestingConfig.SLOW_QUERY_THRESHOLD_MS
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_query_budget_exceeded_fails(self):
+        # Test that going over the declared budget raises under QUERY_BUDGET_ENFORCE
+        with self.assertRaises(QueryBudgetExceeded):
+            self.app.get('/_test/products_one_by_one')
+
+    def test_repeated_statement_logged_as_n_plus_one(self):
+        # Test that the repeated lookup is reported as a possible N+1
+        app.config['QUERY_BUDGET_ENFORCE'] = False
+        with self.assertLogs('app.query_debug', level='WARNING') as logs:
+            response = self.app.get('/_test/products_one_by_one')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('Possible N+1: statement ran 6 times' in line for line in logs.output))
+
+    def test_slow_query_logged_with_plan(self):
+        # Test that statements over the threshold are logged with their EXPLAIN plan
+        app.config['SLOW_QUERY_THRESHOLD_MS'] = 0
+        with self.assertLogs('app.query_debug', level='WARNING') as logs:
+            self.app.get('/products')
+        slow = [line for line in logs.output if 'Slow query' in line]
+        self.assertTrue(slow)
+        self.assertIn('plan=[', slow[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# tests/test_rate_limit.py
+import os
+import tempfile
+import unittest
+from app import create_app
+from app.auth import issue_access_token
+from app.database import db
+from app.rate_limit import MemoryStore, SQLiteStore, check_limit
+from config import TestingConfig
+
+app = create_app(type('RateLimitConfig', (TestingConfig,), {
+    'RATE_LIMIT_ENABLED': True, 'METRICS_ENABLED': False,
+    'RATE_LIMITS': {'product_routes.list_products': (1, 3)}}))
+
+class StoreTests:
+    # Shared tests, run against each token bucket store
+    def test_burst_then_refill(self):
+        # Test that a full bucket allows `burst` requests, then one per interval
+        results = [check_limit(self.store, 'client', 2, 3, now=100.0) for _ in range(4)]
+        self.assertEqual([result[0] for result in results], [True, True, True, False])
+        self.assertEqual([result[2] for result in results], [2, 1, 0, 0])
+        self.assertEqual(results[3][4], 1)
+        self.assertFalse(check_limit(self.store, 'client', 2, 3, now=100.4)[0])
+        self.assertTrue(check_limit(self.store, 'client', 2, 3, now=100.5)[0])
+
+        # Test that an idle bucket fills up again and other keys are independent
+        self.assertEqual(check_limit(self.store, 'client', 2, 3, now=200.0)[2], 2)
+        self.assertTrue(check_limit(self.store, 'other', 2, 3, now=100.5)[0])
+
+class MemoryStoreTestCase(StoreTests, unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryStore(max_keys=1)
+
+    def test_least_recently_used_bucket_is_evicted(self):
+        # Test that a new key beyond max_keys drops the bucket used longest ago
+        store = MemoryStore(max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            check_limit(store, key, 2, 3, now=100.0)
+        self.assertEqual(list(store._tats), ['a', 'c'])
+
+class SQLiteStoreTestCase(StoreTests, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.directory.name, 'rate_limits.db'))
+
+    def tearDown(self):
+        self.store._connection().close()
+        self.directory.cleanup()
+
+class RateLimitTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        app.extensions['rate_limit'] = MemoryStore()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_limit_and_headers(self):
+        # Test that responses carry RateLimit headers and the client is cut off after its burst
+        responses = [self.app.get('/products') for _ in range(4)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200, 429])
+        self.assertEqual(responses[0].headers['RateLimit-Limit'], '3')
+        self.assertEqual(responses[0].headers['RateLimit-Remaining'], '2')
+        self.assertEqual(responses[0].headers['RateLimit-Policy'], '3;w=3')
+        self.assertEqual(responses[3].headers['RateLimit-Remaining'], '0')
+        self.assertEqual(responses[3].headers['Retry-After'], '1')
+
+        # Test that made-up credentials do not get a fresh bucket, while a valid
+        # access token is limited per account
+        self.assertEqual(self.app.get('/products', headers={'X-API-Key': 'other'}).status_code, 429)
+        self.assertEqual(self.app.get('/products', headers={'Authorization': 'Bearer forged'}).status_code, 429)
+        with app.app_context():
+            token = issue_access_token(1)
+        self.assertEqual(self.app.get('/products', headers={'Authorization': f'Bearer {token}'}).status_code, 200)
+
+        # Test that other routes and /metrics are limited separately or not at all
+        self.assertEqual(self.app.get('/product/1').status_code, 404)
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('RateLimit-Limit', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
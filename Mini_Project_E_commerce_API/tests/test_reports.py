@@ -0,0 +1,115 @@
+# tests/test_reports.py
+import unittest
+from app import create_app
+from app.database import db
+from app.reporting import rebuild_reports
+from config import TestingConfig
+from app.models import Customer, Product, OrderItem, DailyProductSales, CustomerSales
+from datetime import datetime
+
+app = create_app(TestingConfig)
+
+class ReportsTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            self.customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            self.other_customer = Customer(name="Other Customer", email="other@example.com", phone_number="+1234567891")
+            self.product = Product(name="Test Product", price=10.0, stock_level=100)
+            db.session.add_all([self.customer, self.other_customer, self.product])
+            db.session.commit()
+            for instance in (self.customer, self.other_customer, self.product):
+                db.session.refresh(instance)
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def place_order(self, customer_id, quantity):
+        response = self.app.post('/order', json={
+            'customer_id': customer_id,
+            'order_items': [{'product_id': self.product.id, 'quantity': quantity}]
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['order_id']
+
+    def test_orders_update_summaries(self):
+        # Test that placing orders adds to both summary tables
+        self.place_order(self.customer.id, 2)
+        self.place_order(self.customer.id, 1)
+        response = self.app.get(f'/reports/product-sales?product_id={self.product.id}')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['rows'][0]['day'], datetime.utcnow().date().isoformat())
+        self.assertEqual(body['rows'][0]['quantity'], 3)
+        self.assertEqual(body['rows'][0]['order_count'], 2)
+        self.assertEqual(body['total_revenue'], 30.0)
+        customers = self.app.get('/reports/customer-value').get_json()['customers']
+        self.assertEqual(customers, [{'customer_id': self.customer.id, 'order_count': 2, 'item_count': 3, 'revenue': 30.0}])
+
+    def test_revenue_uses_price_at_order_time(self):
+        # Test that a later price change does not move revenue, including on delete
+        order_id = self.place_order(self.customer.id, 2)
+        with app.app_context():
+            self.assertEqual(OrderItem.query.filter_by(order_id=order_id).one().unit_price, 10.0)
+            Product.query.get(self.product.id).price = 99.0
+            db.session.commit()
+        self.assertEqual(self.app.get('/reports/product-sales').get_json()['total_revenue'], 20.0)
+        self.assertEqual(self.app.delete(f'/order/{order_id}').status_code, 200)
+        self.assertEqual(self.app.get('/reports/product-sales').get_json()['rows'], [])
+        self.assertEqual(self.app.get('/reports/customer-value').get_json()['customers'], [])
+
+    def test_update_order_replaces_sales(self):
+        # Test that replacing an order's items swaps its contribution
+        order_id = self.place_order(self.customer.id, 2)
+        response = self.app.put(f'/order/{order_id}', json={
+            'order_items': [{'product_id': self.product.id, 'quantity': 5}]
+        })
+        self.assertEqual(response.status_code, 200)
+        row = self.app.get('/reports/product-sales').get_json()['rows'][0]
+        self.assertEqual((row['quantity'], row['order_count'], row['revenue']), (5, 1, 50.0))
+
+    def test_rebuild_matches_inline(self):
+        # Test that the catch-up rebuild reproduces the incrementally maintained tables
+        self.place_order(self.customer.id, 2)
+        self.place_order(self.other_customer.id, 4)
+        with app.app_context():
+            inline = sorted((row.customer_id, row.order_count, row.item_count, row.revenue) for row in CustomerSales.query)
+            days = sorted((row.day, row.product_id, row.quantity, row.revenue) for row in DailyProductSales.query)
+            rebuild_reports()
+            self.assertEqual(sorted((row.customer_id, row.order_count, row.item_count, row.revenue) for row in CustomerSales.query), inline)
+            self.assertEqual(sorted((row.day, row.product_id, row.quantity, row.revenue) for row in DailyProductSales.query), days)
+
+    def test_customer_value_pagination(self):
+        # Test that customers come back by revenue, highest first, one page at a time
+        self.place_order(self.customer.id, 1)
+        self.place_order(self.other_customer.id, 3)
+        body = self.app.get('/reports/customer-value?limit=1').get_json()
+        self.assertEqual(body['customers'][0]['customer_id'], self.other_customer.id)
+        body = self.app.get(f'/reports/customer-value?limit=1&cursor={body["next_cursor"]}').get_json()
+        self.assertEqual(body['customers'][0]['customer_id'], self.customer.id)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_deletes_remove_summaries(self):
+        # Test that deleting a customer or product also deletes the summary rows
+        # that reference it, which MySQL's foreign keys would otherwise refuse
+        order_id = self.place_order(self.customer.id, 2)
+        self.assertEqual(self.app.delete(f'/order/{order_id}').status_code, 200)
+        self.assertEqual(self.app.delete(f'/customer/{self.customer.id}').status_code, 200)
+        self.assertEqual(self.app.delete(f'/product/{self.product.id}').status_code, 200)
+        with app.app_context():
+            self.assertEqual(CustomerSales.query.count(), 0)
+            self.assertEqual(DailyProductSales.query.count(), 0)
+
+    def test_invalid_report_range(self):
+        # Test malformed and reversed date ranges
+        self.assertEqual(self.app.get('/reports/product-sales?start=yesterday').status_code, 400)
+        self.assertEqual(self.app.get('/reports/product-sales?start=2024-02-01&end=2024-01-01').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# tests/test_search.py
+import unittest
+from app import create_app
+from app.database import db
+from app.search import search_backend
+from config import TestingConfig
+
+app = create_app(TestingConfig)
+memory_app = create_app(type('MemorySearchConfig', (TestingConfig,), {'SEARCH_BACKEND': 'memory'}))
+
+class SearchTests:
+    # Shared tests, run against each search backend
+    def setUp(self):
+        # Set up the test client, create the tables and add a few products
+        self.app = self.flask_app.test_client()
+        self.app.testing = True
+        # Detect the backend again, so each test also covers a worker's first search
+        self.flask_app.extensions.pop('search_backend', None)
+        with self.flask_app.app_context():
+            db.create_all()
+        response = self.app.post('/products/bulk', json=[
+            {'name': 'Red Running Shoes', 'price': 50.0, 'stock_level': 5},
+            {'name': 'Blue Shirt', 'price': 20.0, 'stock_level': 5},
+            {'name': 'Shoe Polish', 'price': 5.0, 'stock_level': 5},
+            {'name': 'Laptop Stand', 'price': 30.0, 'stock_level': 5},
+        ])
+        self.assertEqual(response.status_code, 200)
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with self.flask_app.app_context():
+            db.session.remove()
+            db.drop_all()
+            self.flask_app.extensions.pop('cache', None)
+            self.flask_app.extensions.pop('search_index', None)
+
+    def search(self, query, **params):
+        response = self.app.get('/products/search', query_string={'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.get_json()['products']]
+
+    def test_substring_and_prefix(self):
+        # Test that names containing the query match, prefix matches included
+        self.assertEqual(sorted(self.search('shoe', fuzzy=0)), ['Red Running Shoes', 'Shoe Polish'])
+        self.assertEqual(self.search('la'), ['Laptop Stand'])
+        self.assertEqual(self.search('running red'), ['Red Running Shoes'])
+
+    def test_fuzzy_match(self):
+        # Test that a typo still finds the product unless fuzzy matching is off
+        self.assertEqual(self.search('lapotp stand'), ['Laptop Stand'])
+        self.assertEqual(self.search('lapotp stand', fuzzy=0), [])
+
+    def test_index_follows_writes(self):
+        # Test that create, update and delete are reflected in search results
+        self.assertEqual(self.search('shirt'), ['Blue Shirt'])
+        response = self.app.post('/product', json={'name': 'Green Shirt', 'price': 25.0, 'stock_level': 3})
+        self.assertEqual(response.status_code, 201)
+        with self.flask_app.app_context():
+            from app.models import Product
+            green = Product.query.filter_by(name='Green Shirt').one().id
+            blue = Product.query.filter_by(name='Blue Shirt').one().id
+        self.assertEqual(sorted(self.search('shirt', fuzzy=0)), ['Blue Shirt', 'Green Shirt'])
+        self.assertEqual(self.app.put(f'/product/{green}', json={'name': 'Green Hoodie'}).status_code, 200)
+        self.assertEqual(self.app.delete(f'/product/{blue}').status_code, 200)
+        self.assertEqual(self.search('shirt', fuzzy=0), [])
+        self.assertEqual(self.search('hoodie'), ['Green Hoodie'])
+
+    def test_invalid_query(self):
+        # Test missing and overlong queries
+        self.assertEqual(self.app.get('/products/search').status_code, 400)
+        self.assertEqual(self.app.get('/products/search', query_string={'q': 'x' * 101}).status_code, 400)
+
+class FTS5SearchTestCase(SearchTests, unittest.TestCase):
+    flask_app = app
+
+    def test_backend(self):
+        # Test that SQLite databases use the FTS5 index
+        with app.app_context():
+            self.assertEqual(search_backend(), 'fts5')
+
+class MemorySearchTestCase(SearchTests, unittest.TestCase):
+    flask_app = memory_app
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# tests/test_serializers.py
+import json
+import unittest
+from datetime import datetime
+from app import create_app
+from app.database import db
+from app.serializers import ENCODERS, ModelSerializer
+from config import TestingConfig
+from app.models import Customer, Product, Order, OrderItem
+
+app = create_app(TestingConfig)
+# The same routes with the standard library encoder; metrics are off so its
+# requests do not show up in test_metrics' counters
+stdlib_app = create_app(type('StdlibJSONConfig', (TestingConfig,), {'JSON_ENCODER': 'json', 'METRICS_ENABLED': False}))
+
+class SerializerTestCase(unittest.TestCase):
+    def setUp(self):
+        # Set up the test client and create the database tables
+        self.app = app.test_client()
+        self.app.testing = True
+        with app.app_context():
+            db.create_all()
+            customer = Customer(name="Test Customer", email="testcustomer@example.com", phone_number="+1234567890")
+            product = Product(name="Test Product", price=10.5, stock_level=100)
+            db.session.add_all([customer, product])
+            db.session.commit()
+            order = Order(order_date=datetime(2024, 1, 2, 3, 4, 5, 123456), customer_id=customer.id)
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=2))
+            db.session.commit()
+            self.customer_id, self.order_id = customer.id, order.id
+
+    def tearDown(self):
+        # Clean up and drop the tables after each test
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_order_date_is_iso_8601(self):
+        # Test that order dates are ISO 8601 in single reads, expanded reads and history pages
+        self.assertEqual(self.app.get(f'/order/{self.order_id}').get_json()['order_date'], '2024-01-02T03:04:05.123456')
+        expanded = self.app.get(f'/order/{self.order_id}?expand=items.product').get_json()
+        self.assertEqual(expanded['order_date'], '2024-01-02T03:04:05.123456')
+        self.assertEqual(expanded['order_total'], 21.0)
+        history = self.app.get(f'/customer/{self.customer_id}/orders').get_json()
+        self.assertEqual(history['orders'][0]['order_date'], '2024-01-02T03:04:05.123456')
+
+    def test_encoders_agree(self):
+        # Test that every available encoder produces the same documents
+        for url in (f'/order/{self.order_id}', f'/order/{self.order_id}?expand=items.product',
+                    f'/customer/{self.customer_id}/orders', f'/customer/{self.customer_id}', '/products', '/product/1'):
+            response = self.app.get(url)
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.get_json(), stdlib_app.test_client().get(url).get_json(), url)
+
+        payload = {'when': datetime(2024, 1, 2), 'values': [1, 2.5, None, 'x']}
+        documents = {name: json.loads(dumps(payload)) for name, dumps in ENCODERS.items()}
+        self.assertEqual(documents['json'], {'when': '2024-01-02T00:00:00', 'values': [1, 2.5, None, 'x']})
+        self.assertEqual(len({json.dumps(document) for document in documents.values()}), 1)
+
+    def test_model_serializer(self):
+        # Test that rows become dicts by position, leaving trailing columns out
+        serializer = ModelSerializer(id=Product.id, name=Product.name)
+        self.assertEqual(serializer.columns(Product.version, name=Product.price), (Product.id, Product.price, Product.version))
+        self.assertEqual(serializer.dump_all([(1, 'a', 7), (2, 'b', 8)]), [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}])
+
+if __name__ == '__main__':
+    unittest.main()